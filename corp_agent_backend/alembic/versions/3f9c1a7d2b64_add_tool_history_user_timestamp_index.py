@@ -0,0 +1,28 @@
+"""add composite (user_id, timestamp) index to tool_history
+
+Revision ID: 3f9c1a7d2b64
+Revises: 000471e82dc9
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1a7d2b64'
+down_revision = '000471e82dc9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_tool_history_user_id_timestamp',
+        'tool_history',
+        ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tool_history_user_id_timestamp', table_name='tool_history')
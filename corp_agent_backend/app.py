@@ -1,23 +1,56 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, tools, history, chat, social_media
+from routers import admin, auth, debug, tools, tool_history, chat, social_media
+from routers.admin import require_admin
 # Temporarily disabled finance module due to missing LLM model
 # from routers import finance
 from config import settings
+from db.instrumentation import pool_stats
+from db.session import AsyncSessionLocal, async_engine, engine, write_queue
+from auth.hashing import password_hasher
+from auth.provisioning import shutdown_hash_pool
+from auth.refresh_tokens import purge_expired_refresh_tokens
+from auth.tokens import revocation_list, token_cache
+from auth.http_client import close_http_client
+from auth.state_store import oauth_state_store
+from auth.authorization import authorization
+from auth.principal import Principal, principal_cache
+from metrics import CONTENT_TYPE_LATEST, register_cache, render_metrics, setup_metrics
+from tracing import setup_tracing, tracer
+from logging_config import configure_logging
+from middleware import setup_middlewares
+from loop_monitor import loop_monitor, setup_loop_monitor
+from compression import setup_compression
+from serialization import FastJSONResponse
+from workers import worker_info
+from shutdown import ShutdownCoordinator, setup_shutdown
+from rate_limiter import rate_limiter
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+# Configure logging (queued, written from a background thread)
+configure_logging()
 logger = logging.getLogger("corp_ai")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One coordinator per run, handed to ShutdownMiddleware through the lifespan state
+    coordinator = ShutdownCoordinator()
+    await startup()
+    yield {"shutdown_coordinator": coordinator}
+    await shutdown(coordinator)
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="CORP AI Agent API provides authentication, subscription management, and various business tools.",
+    # orjson, with numpy/pandas values
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -31,10 +64,33 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
+# Response compression (innermost, so the timing and metrics middlewares include it)
+setup_compression(app)
+
+# Request metrics, by route template
+setup_metrics(app)
+register_cache("principal", principal_cache)
+register_cache("verified_token", token_cache)
+
+# Sampled request tracing (TRACE_EXPORTER)
+setup_tracing(app)
+
+# Turns new requests away once shutdown begins and tracks in-flight ones for the drain
+setup_shutdown(app)
+
+# Request id, access log and timing headers (added after the others, so it times them too)
+setup_middlewares(app)
+
+# Event loop blocking detection, attributed to routes
+setup_loop_monitor(app)
+
 # Register routers
 app.include_router(auth.router)
+app.include_router(admin.router)
+app.include_router(debug.router)
+# Tool history must be registered before tools so /tools/history isn't captured by /tools/{tool_id}
+app.include_router(tool_history.router)
 app.include_router(tools.router)
-app.include_router(history.router)
 app.include_router(chat.router)
 # Temporarily disabled finance router
 # app.include_router(finance.router)
@@ -50,12 +106,72 @@ async def root():
         "status": "running"
     }
 
-# Startup event
-@app.on_event("startup")
+# Connection pool health; pool internals, so admins only like /debug/*
+@app.get("/health/db", tags=["system"])
+async def db_pool_health(admin: Principal = Depends(require_admin)):
+    """Checkout wait time, checked-out count and overflow events for each DB pool."""
+    return pool_stats()
+
+# This worker's startup time and memory (shared with the other workers vs private)
+@app.get("/health/worker", tags=["system"])
+async def worker_health():
+    return worker_info.stats()
+
+# Prometheus scrape endpoint
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+# Startup, run by the lifespan
 async def startup():
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    if settings.LOOP_MONITOR_ENABLED:
+        await loop_monitor.start()
+    await write_queue.start()
+    await tool_history.tool_history_recorder.start()
+    await revocation_list.start()
+    await oauth_state_store.start()
+    try:
+        await authorization.start(AsyncSessionLocal)
+    except Exception as e:
+        logger.warning(f"Could not load roles and plans for authorization, using SUBSCRIPTION_TIERS: {str(e)}")
+    if settings.BCRYPT_CALIBRATION_TARGET_MS > 0:
+        await password_hasher.calibrate(settings.BCRYPT_CALIBRATION_TARGET_MS)
+    try:
+        async with AsyncSessionLocal() as db:
+            purged = await purge_expired_refresh_tokens(db)
+        logger.info(f"Purged {purged} expired refresh tokens")
+    except Exception as e:
+        logger.warning(f"Could not purge expired refresh tokens: {str(e)}")
+    worker_info.mark_ready()
 
-# Shutdown event for cleanup
-@app.on_event("shutdown")
-async def shutdown_event():
+# Graceful shutdown, run by the lifespan once the server stops (see shutdown.py)
+async def shutdown(coordinator: ShutdownCoordinator):
     logger.info(f"Shutting down {settings.APP_NAME}")
+    timeout = settings.SHUTDOWN_FLUSH_TIMEOUT
+
+    # Stop accepting requests; let in-flight requests, background tasks and generations finish or cancel them
+    report = await coordinator.drain(settings.SHUTDOWN_GRACE_PERIOD)
+
+    # Flush buffered tool usage before the write queue it flushes through
+    report["buffers"] = {
+        "tool_usage": await coordinator.flush_buffer("tool usage buffer", tool_history.tool_history_recorder, timeout),
+        "write_queue": await coordinator.drain_queue("write queue", write_queue, timeout),
+    }
+
+    # Stop background services, then close clients and connection pools
+    await coordinator.run_step("revocation list", revocation_list.stop, timeout)
+    await coordinator.run_step("OAuth state store", oauth_state_store.stop, timeout)
+    await coordinator.run_step("authorization reload", authorization.stop, timeout)
+    await coordinator.run_step("loop monitor", loop_monitor.stop, timeout)
+    await coordinator.run_step("OAuth HTTP client", close_http_client, timeout)
+    await coordinator.run_step("rate limiter", rate_limiter.close, timeout)
+    await coordinator.run_step("async DB pool", async_engine.dispose, timeout)
+    engine.dispose()
+    await coordinator.run_step("provisioning hash pool", shutdown_hash_pool, timeout)
+    password_hasher.shutdown()
+    # Export the spans still queued
+    tracer.shutdown()
+
+    coordinator.finish(report)
@@ -1,56 +1,33 @@
 """
 Authentication controller for handling user registration, login, and OAuth.
 """
-import os
+import asyncio
+import logging
 import secrets
-import datetime
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-import requests
+from jose import JWTError
+import httpx
 
-from db.session import get_db
+from db.session import get_async_db
 from db.models import User, Role
 from auth.oauth_config import GOOGLE_CONFIG, GITHUB_CONFIG
+from auth.hashing import get_password_hash, password_hasher
+from auth.http_client import get_with_retries
+from auth.state_store import oauth_state_store
+from auth.principal import Principal, get_principal, invalidate_principal
+from auth.tokens import create_access_token, verify_access_token
 
-# JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger("corp_ai.auth")
 
 # OAuth2 bearer token scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# Same, for endpoints where the token is optional
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
-# Session storage for OAuth state tokens
-oauth_states = {}
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    """Hash a password for storing."""
-    return pwd_context.hash(password)
-
-def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta] = None) -> str:
-    """Create a new JWT access token."""
-    to_encode = data.copy()
-    
-    if expires_delta:
-        expire = datetime.datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.datetime.utcnow() + datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    
-    return encoded_jwt
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get a user by email."""
@@ -89,20 +66,26 @@ def create_user(db: Session, email: str, password: Optional[str] = None, **kwarg
     
     return user
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     """Authenticate a user by email and password."""
     user = get_user_by_email(db, email)
     
     if not user or not user.hashed_password:
         return None
     
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     
     return user
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    """Get the current authenticated user from the JWT token."""
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Get the current authenticated user from the JWT token.
+
+    This is the one auth dependency for every router. Verified tokens and
+    principals are both cached, so a warm request does no signature check and
+    no database query.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -110,61 +93,54 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_access_token(token)
         email: str = payload.get("sub")
         
         if email is None:
+            logger.warning("Token missing 'sub' claim")
             raise credentials_exception
-    except JWTError:
+    except JWTError as e:
+        logger.warning(f"JWT validation error: {str(e)}")
         raise credentials_exception
     
-    user = get_user_by_email(db, email)
+    principal = await get_principal(db, email)
     
-    if user is None:
+    if principal is None:
+        logger.warning(f"User not found: {email}")
+        raise credentials_exception
+    if not principal.is_active:
+        logger.warning(f"Inactive user presented a token: {email}")
         raise credentials_exception
     
-    return user
+    return principal
 
 def generate_oauth_state() -> str:
     """Generate a secure state token for OAuth CSRF protection."""
     return secrets.token_urlsafe(32)
 
-def store_oauth_state(state: str, provider: str) -> None:
-    """Store an OAuth state token with its provider."""
-    # In a production app, use Redis or another distributed store with expiration
-    oauth_states[state] = {
-        "provider": provider,
-        "created_at": datetime.datetime.utcnow()
-    }
+async def store_oauth_state(state: str, provider: str) -> None:
+    """Store an OAuth state token with its provider; it expires after OAUTH_STATE_TTL_SECONDS."""
+    await oauth_state_store.put(state, {"provider": provider})
 
-def verify_oauth_state(state: str, provider: str) -> bool:
-    """Verify an OAuth state token."""
-    state_data = oauth_states.get(state)
+async def verify_oauth_state(state: str, provider: str) -> bool:
+    """Verify an OAuth state token. Each state can be used once, whatever the outcome."""
+    state_data = await oauth_state_store.pop(state)
     
     if not state_data:
         return False
     
-    if state_data["provider"] != provider:
-        return False
-    
-    # Check if the state is expired (30 minutes)
-    created_at = state_data["created_at"]
-    if (datetime.datetime.utcnow() - created_at).total_seconds() > 1800:
-        # Clean up expired state
-        del oauth_states[state]
-        return False
-    
-    # Clean up used state
-    del oauth_states[state]
-    
-    return True
+    return state_data["provider"] == provider
 
-def get_google_user_info(access_token: str) -> dict:
+async def get_google_user_info(access_token: str) -> dict:
     """Get user info from Google using an access token."""
     headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(GOOGLE_CONFIG["userinfo_uri"], headers=headers)
+    try:
+        response = await get_with_retries(GOOGLE_CONFIG["userinfo_uri"], headers=headers)
+    except httpx.HTTPError as e:
+        logger.error(f"Google user info request failed: {str(e)}")
+        response = None
     
-    if not response.ok:
+    if response is None or not response.is_success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to retrieve user info from Google"
@@ -172,17 +148,27 @@ def get_google_user_info(access_token: str) -> dict:
     
     return response.json()
 
-def get_github_user_info(access_token: str) -> dict:
+async def get_github_user_info(access_token: str) -> dict:
     """Get user info from GitHub using an access token."""
     headers = {
         "Authorization": f"token {access_token}",
         "Accept": "application/json"
     }
     
-    # Get user profile
-    response = requests.get(GITHUB_CONFIG["userinfo_uri"], headers=headers)
+    # Profile and emails are independent, so fetch both at once instead of
+    # waiting for the profile to find out whether its email is missing
+    response, email_response = await asyncio.gather(
+        get_with_retries(GITHUB_CONFIG["userinfo_uri"], headers=headers),
+        get_with_retries(GITHUB_CONFIG["email_uri"], headers=headers),
+        return_exceptions=True
+    )
+    if isinstance(response, httpx.HTTPError):
+        logger.error(f"GitHub user info request failed: {str(response)}")
+        response = None
+    elif isinstance(response, Exception):
+        raise response
     
-    if not response.ok:
+    if response is None or not response.is_success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to retrieve user info from GitHub"
@@ -190,11 +176,11 @@ def get_github_user_info(access_token: str) -> dict:
     
     user_data = response.json()
     
-    # GitHub may not provide email in the user profile, so get emails separately
+    # GitHub may not provide email in the user profile, so use the emails list
     if not user_data.get("email"):
-        email_response = requests.get(GITHUB_CONFIG["email_uri"], headers=headers)
-        
-        if email_response.ok:
+        if isinstance(email_response, httpx.HTTPError):
+            logger.warning(f"Failed to fetch GitHub emails: {str(email_response)}")
+        elif not isinstance(email_response, Exception) and email_response.is_success:
             emails = email_response.json()
             # Find primary email
             primary_email = next((e["email"] for e in emails if e.get("primary")), None)
@@ -233,6 +219,7 @@ def process_oauth_user(db: Session, provider: str, user_data: dict) -> User:
         user.profile_picture_url = picture
         user.full_name = name
         db.commit()
+        invalidate_principal(email=user.email)
         return user
     
     # Check if user exists by email
@@ -246,6 +233,7 @@ def process_oauth_user(db: Session, provider: str, user_data: dict) -> User:
         user.full_name = name
         user.is_verified = True  # OAuth providers verify emails
         db.commit()
+        invalidate_principal(email=user.email)
         return user
     
     # Create new user
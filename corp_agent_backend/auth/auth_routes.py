@@ -9,14 +9,15 @@ import datetime
 
 from db.session import get_db
 from db.models import User, Role
+from auth.principal import Principal
 from .auth_controller import (
     authenticate_user,
     create_user,
     create_access_token,
-    get_password_hash,
     get_user_by_email,
     get_current_user
 )
+from .hashing import password_hasher
 
 # Pydantic models for request validation
 class LoginRequest(BaseModel):
@@ -38,7 +39,7 @@ async def login(
     """
     Login with email and password
     """
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,7 +98,7 @@ async def register(
         )
     
     # Create the user
-    hashed_password = get_password_hash(register_data.password)
+    hashed_password = await password_hasher.hash(register_data.password)
     
     user = User(
         email=register_data.email,
@@ -131,7 +132,7 @@ async def register(
 
 @router.get("/me", response_model=dict)
 async def get_current_user_info(
-    user: User = Depends(get_current_user)
+    user: Principal = Depends(get_current_user)
 ):
     """
     Get current user information
@@ -0,0 +1,212 @@
+"""
+Central authorization - which tools and route groups each (role, plan) may use.
+
+Routers register their rules here (a route group's allowed roles and minimum
+plan, each tool's required plan). The rules are compiled into a decision table
+keyed by (role, plan) so a request check is a single dict lookup against the
+Principal's role and plan names. Plans are ranked by price from the database,
+falling back to SUBSCRIPTION_TIERS until it has been read, and the table is
+rebuilt whenever roles or plans change. Roles and plans are read through
+reference_data, which caches their details for the API in the same reload.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+
+from auth.auth_controller import get_current_user
+from auth.principal import Principal
+from config import settings
+from reference_data import reference_data
+
+logger = logging.getLogger("corp_ai.auth")
+
+ADMIN_ROLE = "admin"
+
+
+@dataclass(frozen=True)
+class RouteGroupPolicy:
+    """
+    Who may use a route group. Admins always may; otherwise the role must be
+    in `roles` or the plan at least `min_plan`. With neither set, any
+    authenticated user may.
+    """
+    roles: FrozenSet[str] = frozenset()
+    min_plan: Optional[str] = None
+    detail: str = "Access denied"
+
+
+@dataclass(frozen=True)
+class Decision:
+    tools: FrozenSet[str]
+    route_groups: FrozenSet[str]
+
+
+class AuthorizationTable:
+    """Registered rules plus the (role, plan) -> Decision table compiled from them."""
+
+    def __init__(self, default_tiers: Iterable[str]):
+        self.route_groups: Dict[str, RouteGroupPolicy] = {}
+        self.tool_plans: Dict[str, str] = {}
+        self.roles: Tuple[str, ...] = (ADMIN_ROLE,)
+        self.default_tiers: Tuple[str, ...] = tuple(default_tiers)
+        self.plans: Tuple[str, ...] = self.default_tiers
+        self.loaded_from_db = False
+        self.version = 0
+        self._decisions: Dict[Tuple[str, Optional[str]], Decision] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # Rules
+
+    def register_route_group(self, name: str, policy: RouteGroupPolicy) -> None:
+        self.route_groups[name] = policy
+        self._rebuild()
+
+    def register_tools(self, tools: Iterable[dict]) -> None:
+        """Record each tool's `requiredSubscription`."""
+        for tool in tools:
+            self.tool_plans[tool["id"]] = tool["requiredSubscription"]
+        self._rebuild()
+
+    # Decisions
+
+    def decide(self, role: Optional[str], plan: Optional[str]) -> Decision:
+        decision = self._decisions.get((role, plan))
+        if decision is None:
+            # A role or plan created since the last reload; compile it on demand
+            decision = self._decisions[(role, plan)] = self._compile(role, plan)
+        return decision
+
+    def can_access(self, principal: Principal, group: str) -> bool:
+        return group in self.decide(principal.role, principal.subscription_plan).route_groups
+
+    def can_use_tool(self, principal: Principal, tool_id: str) -> bool:
+        return tool_id in self.decide(principal.role, principal.subscription_plan).tools
+
+    def _rank(self, plan: Optional[str]) -> int:
+        # Unknown plans (and no plan) rank below every known one; unknown requirements above
+        try:
+            return self.plans.index(plan)
+        except ValueError:
+            return -1
+
+    def _compile(self, role: Optional[str], plan: Optional[str]) -> Decision:
+        rank = self._rank(plan)
+        is_admin = role == ADMIN_ROLE
+
+        def meets(required: Optional[str]) -> bool:
+            return required is None or (required in self.plans and rank >= self.plans.index(required))
+
+        groups = frozenset(
+            name for name, policy in self.route_groups.items()
+            if is_admin
+            or role in policy.roles
+            or (policy.min_plan is not None and meets(policy.min_plan))
+            or (not policy.roles and policy.min_plan is None)
+        )
+        tools = frozenset(tool_id for tool_id, required in self.tool_plans.items() if is_admin or meets(required))
+        return Decision(tools=tools, route_groups=groups)
+
+    def _rebuild(self) -> None:
+        self._decisions = {
+            (role, plan): self._compile(role, plan)
+            for role in self.roles
+            for plan in self.plans + (None,)
+        }
+        self.version += 1
+
+    # Reloading
+
+    def update(self, roles: List[str], plans: List[str]) -> bool:
+        """Swap in the current roles and plans (cheapest first); returns whether anything changed."""
+        roles, plans = tuple(roles), tuple(plans)
+        self.loaded_from_db = True
+        if roles == self.roles and plans == self.plans:
+            return False
+        self.roles, self.plans = roles, plans
+        self._rebuild()
+        return True
+
+    async def reload(self, db) -> bool:
+        # Roles and plans are read once for both this table and the cached reference data
+        await reference_data.reload(db)
+        roles = list(reference_data.roles_by_id.values())
+        plans = [plan["name"] for plan in sorted(reference_data.plans, key=lambda p: (p["price"], int(p["id"])))]
+        # An unseeded database keeps the configured tiers rather than locking every plan-gated route
+        changed = self.update(list(roles) or [ADMIN_ROLE], list(plans) or list(self.default_tiers))
+        if changed:
+            logger.info(f"Authorization table rebuilt: {len(self._decisions)} role/plan entries, plans {list(self.plans)}")
+        return changed
+
+    async def start(self, session_factory) -> None:
+        async with session_factory() as db:
+            await self.reload(db)
+        if settings.AUTHZ_RELOAD_INTERVAL_SECONDS > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._reload_forever(session_factory), name="authorization-reload")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reload_forever(self, session_factory) -> None:
+        while True:
+            await asyncio.sleep(settings.AUTHZ_RELOAD_INTERVAL_SECONDS)
+            try:
+                async with session_factory() as db:
+                    await self.reload(db)
+            except Exception as e:
+                logger.warning(f"Could not reload the authorization table: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_from_db": self.loaded_from_db,
+            "roles": list(self.roles),
+            "plans": list(self.plans),
+            "entries": len(self._decisions),
+            "route_groups": sorted(self.route_groups),
+            "tools": len(self.tool_plans),
+        }
+
+
+authorization = AuthorizationTable(
+    tier.strip() for tier in settings.SUBSCRIPTION_TIERS.split(",") if tier.strip()
+)
+
+
+def register_route_group(name: str, roles: Iterable[str] = (), min_plan: Optional[str] = None,
+                         detail: str = "Access denied") -> None:
+    authorization.register_route_group(name, RouteGroupPolicy(frozenset(roles), min_plan, detail))
+
+
+def require_route_group(group: str):
+    """Dependency: the current user, or 403 unless they may use the route group."""
+    def check_access(user: Principal = Depends(get_current_user)) -> Principal:
+        if not authorization.can_access(user, group):
+            policy = authorization.route_groups.get(group)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=policy.detail if policy else "Access denied"
+            )
+        return user
+    return check_access
+
+
+def require_tool(tool_id: str):
+    """Dependency: the current user, or 403 unless their plan includes the tool."""
+    def check_access(user: Principal = Depends(get_current_user)) -> Principal:
+        if not authorization.can_use_tool(user, tool_id):
+            required = authorization.tool_plans.get(tool_id, "a higher")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"This tool requires the {required} plan or above"
+            )
+        return user
+    return check_access
@@ -0,0 +1,138 @@
+"""
+Password hashing - one bcrypt context for the whole app, plus a bounded thread
+pool so async handlers never run bcrypt on the event loop.
+
+bcrypt releases the GIL while it hashes, so a thread pool gives real
+parallelism up to the core count without the pickling overhead of processes.
+"""
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from config import settings
+
+logger = logging.getLogger("corp_ai.auth")
+
+# bcrypt accepts cost factors 4-31; below 10 is too cheap to be worth storing
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash (blocking - use `password_hasher` from async code)."""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    """Hash a password for storing (blocking - use `password_hasher` from async code)."""
+    return pwd_context.hash(password)
+
+
+def time_hash(rounds: int) -> float:
+    """Seconds taken by one bcrypt hash at the given cost factor."""
+    started = time.perf_counter()
+    pwd_context.handler("bcrypt").using(rounds=rounds).hash("calibration-password")
+    return time.perf_counter() - started
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = MIN_BCRYPT_ROUNDS,
+                            max_rounds: int = MAX_BCRYPT_ROUNDS) -> int:
+    """
+    Highest cost factor whose hash time stays within `target_ms` on this machine.
+
+    Each extra round doubles the work, so timing `min_rounds` is enough to
+    extrapolate; the pick is then timed and stepped down while it overshoots.
+    """
+    baseline = min(time_hash(min_rounds) for _ in range(2))
+    budget = target_ms / 1000
+    rounds = min_rounds + max(0, int(math.floor(math.log2(budget / baseline)))) if baseline > 0 else max_rounds
+    rounds = max(min_rounds, min(rounds, max_rounds))
+    while rounds > min_rounds and time_hash(rounds) > budget * 1.5:
+        rounds -= 1
+    return rounds
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool with a cap on queued work.
+
+    When more than `max_pending` hash/verify calls are already waiting, new ones
+    are rejected with 503 instead of queueing unboundedly behind a login burst.
+    With `workers=0` bcrypt runs inline on the caller's thread.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def calibrate(self, target_ms: float) -> int:
+        """Pick the bcrypt cost factor for `target_ms` and use it for new hashes."""
+        rounds = await self._run(calibrate_bcrypt_rounds, target_ms)
+        pwd_context.update(bcrypt__default_rounds=rounds)
+        logger.info(f"bcrypt cost factor calibrated to {rounds} for a {target_ms:.0f} ms target")
+        return rounds
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        # Only touched from the event loop, so the counter needs no lock
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Password hashing queue full ({self._pending} pending), rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "rounds": pwd_context.to_dict().get("bcrypt__default_rounds", settings.BCRYPT_ROUNDS),
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
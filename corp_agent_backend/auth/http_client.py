@@ -0,0 +1,82 @@
+"""
+Shared async HTTP client for calls to OAuth providers.
+
+One pooled httpx.AsyncClient per event loop keeps connections to the providers
+alive between logins, so a callback doesn't pay a TCP + TLS handshake for each
+round trip, and never blocks the event loop while waiting on the provider.
+"""
+import asyncio
+import logging
+from typing import Dict
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger("corp_ai.auth")
+
+# Provider responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Pooled connections belong to the loop that opened them, so each loop (in practice the
+# server's one, plus any a test client runs) gets its own client
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The running loop's client, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # A closed loop's connections went with it; only its entry is left to drop
+        for stale in [other for other in _clients if other.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OAUTH_HTTP_TIMEOUT, connect=settings.OAUTH_HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OAUTH_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+            # Connection failures are retried by the transport for every method
+            transport=httpx.AsyncHTTPTransport(retries=settings.OAUTH_HTTP_RETRIES),
+            headers={"User-Agent": f"{settings.APP_NAME}/{settings.APP_VERSION}"},
+        )
+    return client
+
+
+async def close_http_client() -> None:
+    """Close every client: this loop's here, another running loop's on that loop."""
+    current = asyncio.get_running_loop()
+    for loop, client in list(_clients.items()):
+        del _clients[loop]
+        if client.is_closed:
+            continue
+        if loop is current:
+            await client.aclose()
+        elif loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+
+
+async def get_with_retries(url: str, **kwargs) -> httpx.Response:
+    """
+    GET that also retries 429/5xx responses and timeouts with exponential backoff.
+
+    Only for idempotent reads - authorization code exchanges are single-use and
+    must not be replayed.
+    """
+    client = get_http_client()
+    attempts = settings.OAUTH_HTTP_RETRIES + 1
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = await client.get(url, **kwargs)
+        except httpx.TimeoutException:
+            if last_attempt:
+                raise
+            logger.warning(f"Timed out fetching {url}, retrying ({attempt + 1}/{attempts - 1})")
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            logger.warning(f"{url} answered {response.status_code}, retrying ({attempt + 1}/{attempts - 1})")
+        await asyncio.sleep(settings.OAUTH_HTTP_BACKOFF * (2 ** attempt))
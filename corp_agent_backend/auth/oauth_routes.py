@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, Optional
-import requests
 import datetime
 
 from db.session import get_db
@@ -16,9 +16,18 @@ from auth.auth_controller import (
     process_oauth_user
 )
 from auth.oauth_config import GOOGLE_CONFIG, GITHUB_CONFIG
+from auth.http_client import get_http_client
 
 router = APIRouter(prefix="/auth", tags=["oauth"])
 
+def oauth_user_email(db: Session, provider: str, user_data: dict) -> str:
+    """
+    Create or update the OAuth user and return their email. Sync DB work, so the
+    async callbacks run it in the threadpool - including the email, which the
+    commit expired and reading it reloads the row.
+    """
+    return process_oauth_user(db, provider, user_data).email
+
 @router.get("/google/login")
 async def google_login():
     """
@@ -26,7 +35,7 @@ async def google_login():
     """
     # Generate state token for CSRF protection
     state = generate_oauth_state()
-    store_oauth_state(state, "google")
+    await store_oauth_state(state, "google")
     
     # Build authorization URL
     auth_url = (
@@ -51,7 +60,7 @@ async def google_callback(
     Handle Google OAuth callback
     """
     # Verify state to prevent CSRF
-    if not verify_oauth_state(state, "google"):
+    if not await verify_oauth_state(state, "google"):
         raise HTTPException(status_code=400, detail="Invalid state parameter")
     
     # Exchange code for tokens
@@ -63,23 +72,23 @@ async def google_callback(
         'grant_type': 'authorization_code'
     }
     
-    token_response = requests.post(GOOGLE_CONFIG['token_uri'], data=token_data)
-    if not token_response.ok:
+    token_response = await get_http_client().post(GOOGLE_CONFIG['token_uri'], data=token_data)
+    if not token_response.is_success:
         raise HTTPException(status_code=400, detail="Failed to retrieve token")
         
     token_json = token_response.json()
     access_token = token_json.get('access_token')
     
     # Get user info with access token
-    user_data = get_google_user_info(access_token)
+    user_data = await get_google_user_info(access_token)
     
     # Process the user (create or update)
-    user = process_oauth_user(db, "google", user_data)
+    email = await run_in_threadpool(oauth_user_email, db, "google", user_data)
     
     # Generate JWT token
     token_expires = datetime.timedelta(minutes=60)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": email},
         expires_delta=token_expires
     )
     
@@ -104,7 +113,7 @@ async def github_login():
     """
     # Generate state token for CSRF protection
     state = generate_oauth_state()
-    store_oauth_state(state, "github")
+    await store_oauth_state(state, "github")
     
     # Build authorization URL
     auth_url = (
@@ -128,7 +137,7 @@ async def github_callback(
     Handle GitHub OAuth callback
     """
     # Verify state to prevent CSRF
-    if not verify_oauth_state(state, "github"):
+    if not await verify_oauth_state(state, "github"):
         raise HTTPException(status_code=400, detail="Invalid state parameter")
     
     # Exchange code for tokens
@@ -140,23 +149,23 @@ async def github_callback(
         'redirect_uri': GITHUB_CONFIG['redirect_uri'],
     }
     
-    token_response = requests.post(GITHUB_CONFIG['token_uri'], headers=headers, data=token_data)
-    if not token_response.ok:
+    token_response = await get_http_client().post(GITHUB_CONFIG['token_uri'], headers=headers, data=token_data)
+    if not token_response.is_success:
         raise HTTPException(status_code=400, detail="Failed to retrieve token")
         
     token_json = token_response.json()
     access_token = token_json.get('access_token')
     
     # Get user info with access token
-    user_data = get_github_user_info(access_token)
+    user_data = await get_github_user_info(access_token)
     
     # Process the user (create or update)
-    user = process_oauth_user(db, "github", user_data)
+    email = await run_in_threadpool(oauth_user_email, db, "github", user_data)
     
     # Generate JWT token
     token_expires = datetime.timedelta(minutes=60)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": email},
         expires_delta=token_expires
     )
     
@@ -0,0 +1,191 @@
+"""
+Authenticated principal - the user, their role name and active plan, loaded in
+one joined query and cached in-process for a short TTL.
+
+Anything that changes a user's role, subscription or active status must call
+`invalidate_principal` so this worker stops serving the old principal; other
+workers pick the change up when their cached entry expires.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.models import Role, SubscriptionPlan, User, UserSubscription
+
+logger = logging.getLogger("corp_ai.auth")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only snapshot of an authenticated user, safe to share between requests."""
+    id: int
+    email: str
+    role_id: Optional[int]
+    role: Optional[str]
+    subscription_plan: Optional[str]
+    subscription_end_date: Optional[datetime]
+    is_active: bool
+    is_verified: bool
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    full_name: Optional[str] = None
+    company_name: Optional[str] = None
+    profile_picture_url: Optional[str] = None
+    oauth_provider: Optional[str] = None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+def auth_context_query(email: str):
+    """
+    User, role name, active plan name and plan end date as a single SELECT.
+
+    Users without an active subscription still come back (the outer joins leave
+    the plan columns NULL); with several active ones the latest-ending wins.
+    """
+    active_subscription = and_(
+        UserSubscription.user_id == User.id,
+        UserSubscription.active == True,
+        UserSubscription.end_date > datetime.utcnow()
+    )
+    return (
+        select(User, Role.name, SubscriptionPlan.name, UserSubscription.end_date)
+        .outerjoin(Role, Role.id == User.role_id)
+        .outerjoin(UserSubscription, active_subscription)
+        .outerjoin(SubscriptionPlan, SubscriptionPlan.id == UserSubscription.plan_id)
+        .where(User.email == email)
+        .order_by(UserSubscription.end_date.desc())
+        .limit(1)
+    )
+
+
+def to_principal(user: User, role_name: Optional[str], plan_name: Optional[str],
+                 plan_end_date: Optional[datetime]) -> Principal:
+    return Principal(
+        id=user.id,
+        email=user.email,
+        role_id=user.role_id,
+        role=role_name,
+        subscription_plan=plan_name,
+        subscription_end_date=plan_end_date,
+        is_active=bool(user.is_active),
+        is_verified=bool(user.is_verified),
+        first_name=user.first_name,
+        last_name=user.last_name,
+        full_name=user.full_name,
+        company_name=user.company_name,
+        profile_picture_url=user.profile_picture_url,
+        oauth_provider=user.oauth_provider,
+    )
+
+
+async def load_auth_context(db: AsyncSession, email: str) -> Optional[Tuple[User, Principal]]:
+    """Load the user row and its principal with one query (login needs the password hash)."""
+    row = (await db.execute(auth_context_query(email))).first()
+    if row is None:
+        return None
+    user, role_name, plan_name, plan_end_date = row
+    principal = to_principal(user, role_name, plan_name, plan_end_date)
+    principal_cache.put(principal)
+    return user, principal
+
+
+class PrincipalCache:
+    """
+    Bounded TTL cache of principals keyed by email, with a user id index so
+    callers that only know the id can invalidate. A TTL of 0 disables caching.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._email_by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(email)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._remove(principal.email)
+            self._entries[principal.email] = (principal, time.monotonic() + self.ttl)
+            self._email_by_id[principal.id] = principal.email
+            while len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._forget_id(evicted)
+
+    def invalidate(self, email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if email is None and user_id is not None:
+                email = self._email_by_id.get(user_id)
+            if email is not None:
+                self._remove(email)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._email_by_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, email: str) -> None:
+        entry = self._entries.pop(email, None)
+        if entry is not None:
+            self._forget_id(entry[0])
+
+    def _forget_id(self, principal: Principal) -> None:
+        if self._email_by_id.get(principal.id) == principal.email:
+            del self._email_by_id[principal.id]
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_PRINCIPAL_CACHE_SIZE,
+)
+
+
+async def get_principal(db: AsyncSession, email: str) -> Optional[Principal]:
+    """Cached principal for `email`, loading it with one query on a miss."""
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+    context = await load_auth_context(db, email)
+    return context[1] if context else None
+
+
+def invalidate_principal(email: Optional[str] = None, user_id: Optional[int] = None) -> None:
+    """Drop a cached principal after its role, subscription or active status changed."""
+    principal_cache.invalidate(email=email, user_id=user_id)
+    logger.debug(f"Invalidated cached principal - Email: {email} - User ID: {user_id}")
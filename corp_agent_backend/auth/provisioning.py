@@ -0,0 +1,231 @@
+"""
+Bulk user provisioning - create many users (and their subscriptions) from a
+CSV or JSON file in one pass.
+
+Rows are validated up front, passwords are hashed in parallel on a process
+pool (created on the first bulk request and kept until shutdown), roles and
+plans are looked up once, and users are inserted in batched transactions. A
+bad row is reported with its row number and never aborts the rest of the file.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.hashing import pwd_context
+from config import settings
+from db.models import Role, SubscriptionPlan, User, UserSubscription
+from db.session import write_queue
+from schemas.auth import BulkProvisionError, BulkProvisionReport, BulkUserCreate
+
+logger = logging.getLogger("corp_ai.auth")
+
+class ProvisioningInputError(ValueError):
+    """The file as a whole can't be read."""
+
+
+class TooManyRowsError(ProvisioningInputError):
+    """The file has more than PROVISIONING_MAX_ROWS users."""
+
+
+def parse_rows(content: str, content_type: str) -> List[dict]:
+    """Raw rows from a CSV (header row required) or JSON (a list, or {"users": [...]}) document."""
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or "email" not in reader.fieldnames:
+            raise ProvisioningInputError("CSV needs a header row with at least an 'email' column")
+        # Empty cells mean "use the default", not an empty string
+        rows = [{k: v for k, v in row.items() if k and v not in (None, "")} for row in reader]
+    else:
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise ProvisioningInputError(f"Invalid JSON: {e.msg}")
+        rows = data.get("users") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ProvisioningInputError('JSON must be a list of users or {"users": [...]}')
+    if len(rows) > settings.PROVISIONING_MAX_ROWS:
+        raise TooManyRowsError(f"At most {settings.PROVISIONING_MAX_ROWS} users per request")
+    return rows
+
+
+def _hash_batch(passwords: List[str], rounds: int) -> List[str]:
+    # Runs in a pool process, which has its own CryptContext; pass the
+    # parent's (possibly calibrated) cost so every hash matches
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    return [handler.hash(password) for password in passwords]
+
+
+# Hashing processes, shared by every bulk request; shut down by the app's lifespan
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn rather than fork: the server process has threads (DB pools, bcrypt pool).
+        # Processes start on demand and are then reused, so each child imports this module once
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=max(1, settings.PROVISIONING_HASH_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+async def shutdown_hash_pool() -> None:
+    """Stop the hashing processes, off the event loop (shutdown waits for them)."""
+    global _hash_pool
+    pool, _hash_pool = _hash_pool, None
+    if pool is not None:
+        await asyncio.to_thread(pool.shutdown, wait=True)
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash passwords across the process pool; order is preserved."""
+    if not passwords:
+        return []
+    workers = max(1, min(settings.PROVISIONING_HASH_WORKERS, len(passwords)))
+    rounds = pwd_context.to_dict().get("bcrypt__default_rounds", settings.BCRYPT_ROUNDS)
+    chunk = -(-len(passwords) // (workers * 4))  # ~4 chunks per worker keeps them all busy
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _hash_batch, passwords[i:i + chunk], rounds)
+        for i in range(0, len(passwords), chunk)
+    ))
+    return [hashed for part in parts for hashed in part]
+
+
+def validate_rows(rows: List[dict], roles: Dict[str, int], plans: Dict[str, SubscriptionPlan],
+                  existing_emails: set) -> Tuple[List[Tuple[int, BulkUserCreate]], List[BulkProvisionError]]:
+    """Split rows into (row number, user) pairs ready to insert and per-row errors."""
+    valid, errors = [], []
+    seen = set(existing_emails)
+    for number, raw in enumerate(rows, start=1):
+        if not isinstance(raw, dict):
+            errors.append(BulkProvisionError(row=number, error="Row must be an object"))
+            continue
+        email = raw.get("email")
+        try:
+            user = BulkUserCreate(**raw)
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            errors.append(BulkProvisionError(row=number, email=email, error=problems))
+            continue
+        if user.email.lower() in seen:
+            errors.append(BulkProvisionError(row=number, email=user.email, error="Email already registered"))
+        elif user.role not in roles:
+            errors.append(BulkProvisionError(row=number, email=user.email, error=f"Unknown role '{user.role}'"))
+        elif user.plan is not None and user.plan not in plans:
+            errors.append(BulkProvisionError(row=number, email=user.email, error=f"Unknown plan '{user.plan}'"))
+        else:
+            seen.add(user.email.lower())
+            valid.append((number, user))
+    return valid, errors
+
+
+async def find_existing_emails(db: AsyncSession, emails: List[str]) -> set:
+    """The (lowercased) emails already registered, compared case-insensitively like validate_rows."""
+    emails = sorted({email.lower() for email in emails})
+    existing = set()
+    for i in range(0, len(emails), 500):
+        result = await db.execute(select(User.email).where(func.lower(User.email).in_(emails[i:i + 500])))
+        existing.update(email.lower() for email in result.scalars())
+    return existing
+
+
+async def insert_batch(db: AsyncSession, batch: List[Tuple[int, dict, Optional[SubscriptionPlan]]]) -> None:
+    """Insert one batch of users and their subscriptions in a single transaction."""
+    async def write():
+        try:
+            result = await db.execute(
+                insert(User).returning(User.id, User.email),
+                [user_row for _, user_row, _ in batch]
+            )
+            ids = {email: user_id for user_id, email in result.all()}
+            now = datetime.utcnow()
+            subscriptions = [
+                {
+                    "user_id": ids[user_row["email"]],
+                    "plan_id": plan.id,
+                    "start_date": now,
+                    "end_date": now + timedelta(days=plan.duration_days),
+                    "active": True,
+                }
+                for _, user_row, plan in batch if plan is not None
+            ]
+            if subscriptions:
+                await db.execute(insert(UserSubscription), subscriptions)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    await write_queue.submit(write)
+
+
+async def provision_users(db: AsyncSession, rows: List[dict]) -> BulkProvisionReport:
+    """Create every valid row; report the rest. Never raises for a bad row."""
+    roles = {role.name: role.id for role in (await db.execute(select(Role))).scalars()}
+    plans = {plan.name: plan for plan in (await db.execute(select(SubscriptionPlan))).scalars()}
+    emails = [row["email"] for row in rows if isinstance(row, dict) and isinstance(row.get("email"), str)]
+    existing = await find_existing_emails(db, emails)
+
+    valid, errors = validate_rows(rows, roles, plans, existing)
+
+    with_password = [(i, user.password) for i, (_, user) in enumerate(valid) if user.password]
+    hashes = dict(zip((i for i, _ in with_password), await hash_passwords([p for _, p in with_password])))
+
+    prepared = [
+        (
+            number,
+            {
+                "email": user.email,
+                "hashed_password": hashes.get(i),
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "company_name": user.company_name,
+                "role_id": roles[user.role],
+                "is_active": True,
+                "is_verified": False,
+            },
+            plans.get(user.plan) if user.plan else None,
+        )
+        for i, (number, user) in enumerate(valid)
+    ]
+
+    created = 0
+    batch_size = settings.PROVISIONING_BATCH_SIZE
+    for start in range(0, len(prepared), batch_size):
+        batch = prepared[start:start + batch_size]
+        try:
+            await insert_batch(db, batch)
+            created += len(batch)
+        except IntegrityError:
+            # Someone registered one of these emails meanwhile; retry row by row to isolate it
+            for item in batch:
+                try:
+                    await insert_batch(db, [item])
+                    created += 1
+                except IntegrityError:
+                    errors.append(BulkProvisionError(row=item[0], email=item[1]["email"], error="Email already registered"))
+        except Exception as e:
+            logger.error(f"Bulk provisioning batch at row {batch[0][0]} failed: {str(e)}")
+            errors.extend(
+                BulkProvisionError(row=number, email=user_row["email"], error="Database error")
+                for number, user_row, _ in batch
+            )
+
+    errors.sort(key=lambda error: error.row)
+    logger.info(f"Bulk provisioning finished - {created} created, {len(errors)} failed of {len(rows)}")
+    return BulkProvisionReport(total=len(rows), created=created, failed=len(errors), errors=errors)
@@ -0,0 +1,158 @@
+"""
+Refresh tokens - opaque, rotating, revocable tokens that let a client get a new
+access token without sending (and the server re-verifying) the password.
+
+Refresh tokens are 256-bit random strings, so a single SHA-256 digest is enough
+to store them safely and they are looked up by that digest through a unique
+index - no bcrypt. Every refresh revokes the presented token and issues its
+successor in the same family. The session slides forward by
+JWT_REFRESH_TOKEN_EXPIRE_DAYS on each use, up to JWT_REFRESH_SESSION_MAX_DAYS
+after the original login. Presenting an already-rotated token means it was
+copied, so the whole family is revoked.
+"""
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db.models import RefreshToken, User
+from db.session import write_queue
+
+logger = logging.getLogger("corp_ai.auth")
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def new_refresh_token(user_id: int, family_id: Optional[str] = None,
+                      session_started_at: Optional[datetime] = None) -> Tuple[str, RefreshToken]:
+    """Create a token and its (unsaved) row; callers add the row to their own transaction."""
+    now = datetime.utcnow()
+    session_started_at = session_started_at or now
+    token = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        user_id=user_id,
+        session_started_at=session_started_at,
+        expires_at=min(
+            now + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS),
+            session_started_at + timedelta(days=settings.JWT_REFRESH_SESSION_MAX_DAYS),
+        ),
+        created_at=now,
+    )
+    return token, row
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """Start a new refresh-token family for a fresh login."""
+    token, row = new_refresh_token(user_id)
+
+    async def save():
+        db.add(row)
+        await db.commit()
+
+    await write_queue.submit(save)
+    return token
+
+
+async def revoke_family(db: AsyncSession, family_id: str, now: Optional[datetime] = None) -> None:
+    async def revoke():
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now or datetime.utcnow())
+        )
+        await db.commit()
+
+    await write_queue.submit(revoke)
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[str, str]:
+    """
+    Exchange a refresh token for its successor. Returns (user email, new token).
+
+    The presented token is found with one indexed lookup (joined to the user's
+    email and active flag) and revoked in the same commit that stores its
+    successor. The revoke is conditional, so of two concurrent refreshes with
+    the same token only one wins.
+    """
+    now = datetime.utcnow()
+    row = (
+        await db.execute(
+            select(RefreshToken, User.email, User.is_active)
+            .join(User, User.id == RefreshToken.user_id)
+            .where(RefreshToken.token_hash == hash_refresh_token(token))
+        )
+    ).first()
+    if row is None:
+        raise invalid_refresh_token()
+    current, email, is_active = row
+
+    if current.revoked_at is not None:
+        logger.warning(f"Rotated refresh token reused, revoking session - User: {email} - Family: {current.family_id}")
+        await revoke_family(db, current.family_id, now)
+        raise invalid_refresh_token()
+    if current.expires_at <= now or not is_active:
+        raise invalid_refresh_token()
+
+    successor_token, successor = new_refresh_token(current.user_id, current.family_id, current.session_started_at)
+    if successor.expires_at <= now:
+        # The session reached its absolute lifetime; the user has to log in again
+        raise invalid_refresh_token()
+
+    async def rotate():
+        result = await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == current.id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        if result.rowcount != 1:
+            await db.rollback()
+            return False
+        db.add(successor)
+        await db.commit()
+        return True
+
+    if not await write_queue.submit(rotate):
+        raise invalid_refresh_token()
+    return email, successor_token
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> bool:
+    """Log out: revoke the token's whole family. Returns False for unknown tokens."""
+    family_id = (
+        await db.execute(
+            select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(token))
+        )
+    ).scalar()
+    if family_id is None:
+        return False
+    await revoke_family(db, family_id)
+    return True
+
+
+async def purge_expired_refresh_tokens(db: AsyncSession) -> int:
+    """Delete expired tokens; once expired they can't be used or replayed anyway."""
+    async def purge():
+        result = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return result.rowcount
+
+    return await write_queue.submit(purge)
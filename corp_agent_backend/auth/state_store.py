@@ -0,0 +1,152 @@
+"""
+OAuth state store - remembers the CSRF `state` issued for each login redirect
+until the provider calls back, for at most OAUTH_STATE_TTL_SECONDS.
+
+States are single-use: `pop` returns and removes them in one step. The memory
+backend is bounded and swept in the background, so abandoned logins can't grow
+it without limit; the Redis backend lets any worker finish a login another
+worker started.
+"""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import settings
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger("corp_ai.auth")
+
+
+class StateStore(ABC):
+    """Interface shared by the state store backends."""
+
+    @abstractmethod
+    async def put(self, state: str, data: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def pop(self, state: str) -> Optional[dict]:
+        """Remove and return the state's data, or None if it's unknown or expired."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """
+    Per-process store with TTL expiry and a size cap.
+
+    Expired entries are removed by a periodic sweeper (and skipped on lookup);
+    when the store is full, the oldest state is evicted to make room.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, max_entries: int = 10000, sweep_interval: float = 60):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def put(self, state: str, data: dict) -> None:
+        self._entries.pop(state, None)
+        self._entries[state] = (data, time.monotonic() + self.ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    async def pop(self, state: str) -> Optional[dict]:
+        entry = self._entries.pop(state, None)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.expired += 1
+            return None
+        return data
+
+    def sweep(self) -> int:
+        """Drop expired states. Entries are in insertion order, so stop at the first live one."""
+        now = time.monotonic()
+        removed = 0
+        while self._entries:
+            state, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[state]
+            removed += 1
+        self.expired += removed
+        return removed
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sweep_forever(), name="oauth-state-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.debug(f"Swept {removed} expired OAuth states")
+
+
+class RedisStateStore(StateStore):
+    """Shared store: one key per state, expired by Redis and consumed atomically with GETDEL."""
+
+    def __init__(self, client, ttl_seconds: float = 1800, prefix: str = "corp_ai:oauth_state"):
+        self.client = client
+        self.ttl = ttl_seconds
+        self.prefix = prefix
+
+    async def put(self, state: str, data: dict) -> None:
+        await self.client.set(f"{self.prefix}:{state}", json.dumps(data), ex=int(self.ttl))
+
+    async def pop(self, state: str) -> Optional[dict]:
+        raw = await self.client.getdel(f"{self.prefix}:{state}")
+        return json.loads(raw) if raw is not None else None
+
+    async def stop(self) -> None:
+        await self.client.aclose()
+
+
+def build_state_store() -> StateStore:
+    if settings.OAUTH_STATE_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return RedisStateStore(
+                redis.from_url(settings.OAUTH_STATE_REDIS_URL, decode_responses=True),
+                ttl_seconds=settings.OAUTH_STATE_TTL_SECONDS,
+            )
+        logger.warning("OAUTH_STATE_BACKEND is redis but redis.asyncio is not available; using the in-memory store")
+    return MemoryStateStore(
+        ttl_seconds=settings.OAUTH_STATE_TTL_SECONDS,
+        max_entries=settings.OAUTH_STATE_MAX_ENTRIES,
+        sweep_interval=settings.OAUTH_STATE_SWEEP_INTERVAL_SECONDS,
+    )
+
+
+oauth_state_store = build_state_store()
@@ -0,0 +1,240 @@
+"""
+Access tokens - issuing, verifying and revoking JWTs.
+
+Verified tokens are remembered in a bounded LRU keyed by the token's SHA-256
+digest, so a token's signature is checked once rather than on every request.
+Entries expire with the token's `exp`. Every token carries a `jti`; revoked
+jtis live in a small in-memory set that is consulted on every request, and a
+pluggable backend (Redis pub/sub when configured) fans revocations out to the
+other workers.
+"""
+import asyncio
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from config import settings
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger("corp_ai.auth")
+
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Sign a JWT for `data` with a fresh jti and an `exp` claim."""
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(8)})
+    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    logger.debug(f"Created access token for user: {data.get('sub')}")
+    return encoded_jwt
+
+
+class VerifiedTokenCache:
+    """LRU of token digest -> decoded claims, each entry valid until the token's exp."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if self.max_entries <= 0 or exp is None:
+            return
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[key] = (claims, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class RevocationBackend:
+    """Shares revocations between workers. The base class keeps them in this process only."""
+
+    async def start(self, on_revoked) -> None:
+        pass
+
+    async def publish(self, jti: str, exp: float) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisRevocationBackend(RevocationBackend):
+    """
+    Stores each revoked jti as a Redis key that expires with the token, and
+    publishes it so running workers pick it up immediately. Workers that start
+    later load the still-live keys on startup.
+    """
+
+    def __init__(self, url: str, prefix: str = "corp_ai:revoked_jti"):
+        self.url = url
+        self.prefix = prefix
+        self._redis = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, on_revoked) -> None:
+        self._redis = redis.from_url(self.url, decode_responses=True)
+        async for key in self._redis.scan_iter(match=f"{self.prefix}:*"):
+            exp = await self._redis.get(key)
+            if exp is not None:
+                on_revoked(key.rsplit(":", 1)[1], float(exp))
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.prefix)
+        self._task = asyncio.create_task(self._listen(on_revoked), name="jti-revocations")
+
+    async def publish(self, jti: str, exp: float) -> None:
+        ttl = max(int(exp - time.time()) + 1, 1)
+        await self._redis.set(f"{self.prefix}:{jti}", exp, ex=ttl)
+        await self._redis.publish(self.prefix, f"{jti}:{exp}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    async def _listen(self, on_revoked) -> None:
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                jti, exp = message["data"].rsplit(":", 1)
+                on_revoked(jti, float(exp))
+            except ValueError:
+                logger.warning(f"Ignoring malformed revocation message: {message['data']!r}")
+
+
+class RevocationList:
+    """
+    Revoked jti -> token exp, checked on every authenticated request.
+
+    A revoked jti only matters until its token expires, so entries are pruned
+    once they pass their exp; the set stays as small as the number of revoked,
+    still-valid tokens.
+    """
+
+    def __init__(self, backend: Optional[RevocationBackend] = None):
+        self.backend = backend or RevocationBackend()
+        self._revoked: Dict[str, float] = {}
+        self._prune_at = 1024
+
+    def is_revoked(self, jti: str) -> bool:
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def add(self, jti: str, exp: float) -> None:
+        self._revoked[jti] = exp
+        if len(self._revoked) >= self._prune_at:
+            now = time.time()
+            self._revoked = {j: e for j, e in self._revoked.items() if e > now}
+            self._prune_at = max(1024, len(self._revoked) * 2)
+
+    async def revoke(self, jti: str, exp: float) -> None:
+        self.add(jti, exp)
+        try:
+            await self.backend.publish(jti, exp)
+        except Exception as e:
+            logger.error(f"Failed to publish revocation of {jti}: {str(e)}")
+
+    async def start(self) -> None:
+        await self.backend.start(self.add)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+def build_revocation_backend() -> RevocationBackend:
+    if settings.AUTH_REVOCATION_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return RedisRevocationBackend(settings.AUTH_REVOCATION_REDIS_URL)
+        logger.warning("AUTH_REVOCATION_BACKEND is redis but redis.asyncio is not available; revocations stay per-process")
+    return RevocationBackend()
+
+
+token_cache = VerifiedTokenCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE)
+revocation_list = RevocationList(build_revocation_backend())
+
+
+def verify_access_token(token: str) -> dict:
+    """
+    Claims of a valid, unrevoked token. Raises JWTError otherwise.
+
+    Only the first sighting of a token pays for the signature check; later ones
+    are a digest plus a dict lookup.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        token_cache.put(token, claims)
+    jti = claims.get("jti")
+    if jti is not None and revocation_list.is_revoked(jti):
+        raise JWTError("Token has been revoked")
+    return claims
+
+
+async def revoke_access_token(token: str) -> bool:
+    """Revoke a token by its jti, everywhere. Returns False if it can't be revoked."""
+    try:
+        claims = verify_access_token(token)
+    except JWTError:
+        return False
+    jti, exp = claims.get("jti"), claims.get("exp")
+    if jti is None or exp is None:
+        return False
+    await revocation_list.revoke(jti, float(exp))
+    return True
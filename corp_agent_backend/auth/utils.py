@@ -1,10 +1,6 @@
 """
 Authentication utilities for CORP AI - Password hashing and verification
 """
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from jose import jwt
-import os
 from dotenv import load_dotenv
 import secrets
 import string
@@ -12,13 +8,11 @@ import string
 # Load environment variables
 load_dotenv()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing (shared context, so the configured cost factor applies here too)
+from auth.hashing import pwd_context
 
-# JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# JWT issuing lives in auth.tokens so every token is signed with the configured key
+from auth.tokens import create_access_token
 
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash"""
@@ -28,20 +22,6 @@ def get_password_hash(password):
     """Hash a password for storing"""
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    """Create a new JWT token"""
-    to_encode = data.copy()
-    
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    
-    return encoded_jwt
-
 def generate_reset_token(length=32):
     """Generate a secure random token for password reset"""
     alphabet = string.ascii_letters + string.digits
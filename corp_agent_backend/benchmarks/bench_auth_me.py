@@ -0,0 +1,99 @@
+"""
+Concurrency benchmark for GET /auth/me.
+
+Fires N concurrent clients at /auth/me and reports latency percentiles and
+throughput. By default the app runs in-process against a throwaway SQLite
+database; pass --url to benchmark a running server instead.
+
+    python benchmarks/bench_auth_me.py --clients 500 --requests 4
+    python benchmarks/bench_auth_me.py --url http://localhost:8000 --email admin@corpai.com --password Admin@123
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def build_in_process_client(tmp_dir: str) -> httpx.AsyncClient:
+    """Point the app at a fresh SQLite database, seed it, and wrap it in an ASGI client."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+
+    from app import app
+    from db.session import Base, SessionLocal, engine
+    from scripts.seed_db import seed_admin_user, seed_roles, seed_subscription_plans
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.url:
+            limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+            client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60.0)
+        else:
+            client = build_in_process_client(tmp_dir)
+
+        async with client:
+            response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            latencies = []
+            errors = 0
+
+            async def worker():
+                nonlocal errors
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    reply = await client.get("/auth/me", headers=headers)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if reply.status_code != 200:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.clients)))
+            elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"clients={args.clients} requests={len(latencies)} errors={errors} wall={elapsed:.2f}s")
+    print(f"throughput={len(latencies) / elapsed:.1f} req/s")
+    print(
+        f"latency ms: p50={percentile(latencies, 50):.1f} p90={percentile(latencies, 90):.1f} "
+        f"p99={percentile(latencies, 99):.1f} max={latencies[-1]:.1f} mean={statistics.mean(latencies):.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500, help="number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=4, help="requests issued by each client")
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--email", default="admin@corpai.com")
+    parser.add_argument("--password", default="Admin@123")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Per-request cost of the auth dependency.
+
+Calls `get_current_user` directly (no HTTP) with a real token and session,
+against a throwaway SQLite database, under three configurations:
+
+* no caches       - JWT signature check and a principal query every call
+* principal cache - signature check every call, principal from memory
+* both caches     - verified-claims LRU hit plus revocation check, no crypto or SQL
+
+A microbenchmark of just the token step (jwt.decode vs cached verify) follows.
+
+    python benchmarks/bench_auth_overhead.py --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def prepare(tmp_dir: str) -> None:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+
+    from db.session import Base, SessionLocal, engine
+    from scripts.seed_db import seed_admin_user, seed_roles, seed_subscription_plans
+    import app  # noqa: F401 - configures every mapper
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
+
+
+async def measure(label: str, token: str, iterations: int, principal_ttl: float, token_cache_size: int) -> None:
+    from auth.auth_controller import get_current_user
+    from auth.principal import principal_cache
+    from auth.tokens import token_cache
+    from db.session import AsyncSessionLocal
+
+    principal_cache.clear()
+    principal_cache.ttl = principal_ttl
+    token_cache.clear()
+    token_cache.max_entries = token_cache_size
+
+    async with AsyncSessionLocal() as db:
+        await get_current_user(db=db, token=token)  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await get_current_user(db=db, token=token)
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<16} {elapsed / iterations * 1e6:>9.1f} us/request")
+
+
+async def run(args) -> None:
+    from auth.tokens import create_access_token, verify_access_token
+    from config import settings
+    from jose import jwt
+
+    token = create_access_token({"sub": "admin@corpai.com", "role": "admin", "is_admin": True, "plan": None})
+    print(f"get_current_user, {args.iterations} calls each:")
+    await measure("no caches", token, args.iterations, principal_ttl=0, token_cache_size=0)
+    await measure("principal cache", token, args.iterations, principal_ttl=60, token_cache_size=0)
+    await measure("both caches", token, args.iterations, principal_ttl=60, token_cache_size=10000)
+
+    number = args.iterations * 4
+    decode = timeit.timeit(
+        lambda: jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]), number=number
+    )
+    cached = timeit.timeit(lambda: verify_access_token(token), number=number)
+    print("token step only:")
+    print(f"  jwt.decode       {decode / number * 1e6:>9.2f} us")
+    print(f"  cached verify    {cached / number * 1e6:>9.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="calls per configuration")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        prepare(tmp_dir)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
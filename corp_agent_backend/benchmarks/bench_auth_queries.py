@@ -0,0 +1,105 @@
+"""
+Database statements per authenticated request.
+
+Logs in once, then issues GET /auth/me and GET /tools/history repeatedly and
+counts the SQL statements each request sends to the database. Runs twice: with
+the principal cache disabled (every request loads the principal with its one
+joined query) and enabled (only the first request after login, or after the
+entry expires, touches the database).
+
+    python benchmarks/bench_auth_queries.py --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def prepare(tmp_dir: str):
+    """Point the app at a fresh SQLite database, seed it, and return the app."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    # routers.auth signs with JWT_SECRET_KEY while auth_controller verifies with SECRET_KEY
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("SECRET_KEY", os.environ["JWT_SECRET_KEY"])
+
+    from app import app
+    from db.session import Base, SessionLocal, engine
+    from models.tool_history import ToolHistory
+    from scripts.seed_db import seed_admin_user, seed_roles, seed_subscription_plans
+
+    Base.metadata.create_all(bind=engine)
+    ToolHistory.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
+    return app
+
+
+async def measure(app, args, cache_ttl: float) -> None:
+    from sqlalchemy import event
+
+    from auth.principal import principal_cache
+    from db.session import async_engine
+
+    principal_cache.clear()
+    principal_cache.ttl = cache_ttl
+    statements = 0
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        statements += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            statements = 0
+            response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            response.raise_for_status()
+            login_statements = statements
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            label = "cache on" if cache_ttl > 0 else "cache off"
+            print(f"{label} (ttl={cache_ttl:g}s): login={login_statements} statements")
+            for path in ("/auth/me", "/tools/history"):
+                statements = 0
+                started = time.perf_counter()
+                for _ in range(args.requests):
+                    reply = await client.get(path, headers=headers)
+                    reply.raise_for_status()
+                elapsed = time.perf_counter() - started
+                print(
+                    f"  GET {path:<15} {statements / args.requests:>5.2f} statements/request  "
+                    f"{elapsed / args.requests * 1000:>6.2f} ms/request"
+                )
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = prepare(tmp_dir)
+        await measure(app, args, cache_ttl=0)
+        await measure(app, args, cache_ttl=args.ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--ttl", type=float, default=30.0, help="principal cache TTL for the cached run")
+    parser.add_argument("--email", default="admin@corpai.com")
+    parser.add_argument("--password", default="Admin@123")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Serialization time and wire size of a large analysis response.
+
+Builds the result FinanceTool.analyze_spreadsheet returns for a spreadsheet of
+--rows daily rows and --columns numeric columns: summary, per-column metrics
+(numpy scalars) and per-column monthly totals and averages. With pandas
+installed it is computed the way the tool does it, with pandas Period month
+keys; without pandas an equivalent result is built with numpy, with "YYYY-MM"
+keys. Columns are float64, since jsonable_encoder rejects the numpy integers
+an int64 column produces, so the previous path could not serialize those at
+all.
+
+Compares:
+
+* stdlib: jsonable_encoder + json.dumps, the previous default JSONResponse path
+* default class: jsonable_encoder + orjson, what a route returning the dict
+  gets with FastJSONResponse as the default response class
+* direct: FastJSONResponse(analysis) returned by the route, orjson only
+
+then the body size and compression time with gzip and brotli, and the whole
+request through the ASGI stack (httpx.ASGITransport) with CompressionMiddleware
+for each Accept-Encoding.
+
+    python benchmarks/bench_json_compression.py --rows 50000 --columns 8
+"""
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+
+def build_analysis(rows: int, columns: int) -> dict:
+    rng = np.random.default_rng(42)
+    names = [f"account_{i}" for i in range(columns)]
+    values = {name: rng.normal(10000, 2500, rows).round(2) for name in names}
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+
+    if pd is not None:
+        df = pd.DataFrame({"date": pd.date_range("1900-01-01", periods=rows, freq="D"), **values})
+        months = df["date"].dt.to_period("M")
+        return {
+            "summary": {
+                "total_rows": len(df),
+                "columns": list(df.columns),
+                "numeric_columns": list(df.select_dtypes(include=["float64", "int64"]).columns),
+            },
+            "metrics": {
+                col: {
+                    "sum": df[col].sum(), "mean": df[col].mean(), "median": df[col].median(),
+                    "std": df[col].std(), "min": df[col].min(), "max": df[col].max(),
+                }
+                for col in names
+            },
+            "trends": {
+                col: {
+                    "monthly_totals": monthly["sum"].to_dict(),
+                    "monthly_averages": monthly["mean"].to_dict(),
+                }
+                for col in names
+                for monthly in [df.groupby(months)[col].agg(["mean", "sum"])]
+            },
+        }
+
+    dates = np.datetime64("1900-01-01") + np.arange(rows)
+    months = dates.astype("datetime64[M]")
+    keys, starts = np.unique(months, return_index=True)
+    labels = [str(key) for key in keys]
+    trends = {}
+    for col in names:
+        totals = np.add.reduceat(values[col], starts)
+        counts = np.diff(np.append(starts, rows))
+        trends[col] = {
+            "monthly_totals": dict(zip(labels, totals.tolist())),
+            "monthly_averages": dict(zip(labels, (totals / counts).tolist())),
+        }
+    return {
+        "summary": {"total_rows": rows, "columns": ["date"] + names, "numeric_columns": names},
+        "metrics": {
+            col: {
+                "sum": values[col].sum(), "mean": values[col].mean(), "median": np.median(values[col]),
+                "std": values[col].std(ddof=1), "min": values[col].min(), "max": values[col].max(),
+            }
+            for col in names
+        },
+        "trends": trends,
+    }
+
+
+def best_of(rounds: int, func) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_serialization(analysis: dict, rounds: int) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    from serialization import FastJSONResponse
+
+    cases = {
+        "stdlib": lambda: JSONResponse(jsonable_encoder(analysis)).body,
+        "default class": lambda: FastJSONResponse(jsonable_encoder(analysis)).body,
+        "direct": lambda: FastJSONResponse(analysis).body,
+    }
+    results = {name: float("inf") for name in cases}
+    for _ in range(rounds):
+        for name, case in cases.items():
+            results[name] = min(results[name], best_of(1, case))
+
+    body = cases["direct"]()
+    print(f"serialization (best of {rounds} interleaved rounds):")
+    for name, case in cases.items():
+        print(f"  {name:<14} {results[name] * 1000:>8.1f} ms   {len(case()):>9,} bytes")
+    return body
+
+
+def bench_compression(body: bytes, rounds: int) -> None:
+    from compression import BROTLI_AVAILABLE
+    from config import settings
+
+    cases = {"identity": lambda: body}
+    for level in (1, settings.COMPRESSION_GZIP_LEVEL, 9):
+        cases[f"gzip -{level}"] = lambda level=level: gzip.compress(body, compresslevel=level)
+    if BROTLI_AVAILABLE:
+        import brotli
+        for quality in (settings.COMPRESSION_BROTLI_QUALITY, 11):
+            cases[f"br q{quality}"] = lambda quality=quality: brotli.compress(body, quality=quality)
+
+    print(f"\nwire size (best of {rounds}):")
+    for name, case in cases.items():
+        elapsed = best_of(rounds, case)
+        size = len(case())
+        print(f"  {name:<14} {elapsed * 1000:>8.1f} ms   {size:>9,} bytes   {size / len(body):>6.1%}")
+
+
+async def bench_requests(analysis: dict, rounds: int) -> None:
+    import httpx
+    from fastapi import FastAPI
+
+    from compression import BROTLI_AVAILABLE, CompressionMiddleware
+    from serialization import FastJSONResponse
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/analysis")
+    async def get_analysis():
+        return FastJSONResponse(analysis)
+
+    encodings = ["identity", "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        results = {encoding: float("inf") for encoding in encodings}
+        sizes = {}
+        for _ in range(rounds):
+            for encoding in encodings:
+                started = time.perf_counter()
+                response = await client.get("/analysis", headers={"accept-encoding": encoding})
+                results[encoding] = min(results[encoding], time.perf_counter() - started)
+                sizes[encoding] = int(response.headers["content-length"])
+
+    print(f"\nthrough the ASGI stack, direct FastJSONResponse + CompressionMiddleware (best of {rounds}):")
+    for encoding in encodings:
+        print(f"  {encoding:<14} {results[encoding] * 1000:>8.1f} ms   {sizes[encoding]:>9,} bytes on the wire")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--columns", type=int, default=8, help="numeric columns")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        analysis = build_analysis(args.rows, args.columns)
+        months = len(next(iter(analysis["trends"].values()))["monthly_totals"])
+        print(f"{args.rows:,} rows x {args.columns} columns -> {months:,} months per column\n")
+        body = bench_serialization(analysis, args.rounds)
+        bench_compression(body, args.rounds)
+        asyncio.run(bench_requests(analysis, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
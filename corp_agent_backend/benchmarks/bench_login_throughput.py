@@ -0,0 +1,113 @@
+"""
+Login throughput, and event-loop responsiveness while logins are running.
+
+Concurrent clients log in repeatedly while a probe requests GET / every 10 ms;
+the probe's latency shows how long the event loop is held up by bcrypt. Each
+run is repeated with bcrypt inline on the loop (--workers 0 behaviour) and on
+the bounded hashing pool.
+
+    python benchmarks/bench_login_throughput.py --clients 32 --seconds 5
+    python benchmarks/bench_login_throughput.py --clients 64 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def prepare(tmp_dir: str):
+    """Point the app at a fresh SQLite database, seed it, and return the app and the admin's bcrypt cost."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+
+    from app import app
+    from db.models import User
+    from db.session import Base, SessionLocal, engine
+    from scripts.seed_db import seed_admin_user, seed_roles, seed_subscription_plans
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+        admin_hash = db.query(User.hashed_password).filter(User.email == "admin@corpai.com").scalar()
+    finally:
+        db.close()
+    return app, int(admin_hash.split("$")[2])
+
+
+async def measure(app, args, workers: int) -> None:
+    from auth.hashing import password_hasher
+
+    password_hasher.shutdown()
+    password_hasher.workers = workers
+    password_hasher.max_pending = max(args.clients, 1)
+    logins = errors = 0
+    probes = []
+    deadline = time.perf_counter() + args.seconds
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login_client():
+            nonlocal logins, errors
+            while time.perf_counter() < deadline:
+                reply = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+                if reply.status_code == 200:
+                    logins += 1
+                else:
+                    errors += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/")
+                probes.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *(login_client() for _ in range(args.clients)))
+
+    probes.sort()
+    label = "inline" if workers <= 0 else f"pool({workers})"
+    print(
+        f"  {label:<9} {logins / args.seconds:>7.1f} logins/s  errors={errors:<4} "
+        f"probe ms p50={percentile(probes, 50):.1f} p99={percentile(probes, 99):.1f} max={probes[-1]:.1f}"
+    )
+
+
+async def run(args) -> None:
+    from auth.hashing import time_hash
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Verification cost is set by the stored hash, not the current default
+        app, rounds = prepare(tmp_dir)
+        print(
+            f"bcrypt cost {rounds} ({time_hash(rounds) * 1000:.0f} ms/hash), "
+            f"{args.clients} clients, {args.seconds:.0f}s per run"
+        )
+        await measure(app, args, workers=0)
+        await measure(app, args, workers=args.workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing pool threads")
+    parser.add_argument("--email", default="admin@corpai.com")
+    parser.add_argument("--password", default="Admin@123")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Per-request overhead of the request context middleware and queued logging,
+compared with the middleware stack it replaced.
+
+Serves a trivial route through the ASGI stack (httpx.ASGITransport) with:
+
+* no middleware (the baseline the overheads are measured against)
+* the previous stack: RequestLoggingMiddleware + ErrorHandlerMiddleware, each
+  generating its own UUID and logging two lines per request synchronously
+  through a StreamHandler (as logging.basicConfig set up)
+* RequestContextMiddleware, one JSON access line per request through the
+  queue handler and batching listener from logging_config, with the
+  LogRecord options configure_logging() turns off
+
+Logs go to a temporary file in every case so the terminal doesn't skew the
+numbers.
+
+    python benchmarks/bench_middleware.py --iterations 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DEFAULT_SRCFILE = logging._srcfile
+
+
+# The previous middlewares' request path (their exception branches never run here)
+
+class PreviousRequestLoggingMiddleware:
+    def __init__(self, app, logger):
+        self.app = app
+        self.logger = logger
+
+    async def __call__(self, scope, receive, send):
+        from starlette.requests import Request
+
+        request = Request(scope)
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        path = scope.get("path", "")
+        method = scope.get("method", "")
+        self.logger.info(f"Request {request_id} started: {method} {path}")
+        start_time = time.time()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+                self.logger.info(
+                    f"Request {request_id} completed: {method} {path} "
+                    f"- Status: {message['status']} - Time: {process_time:.4f}s"
+                )
+                headers = message.get("headers", [])
+                headers.append((b"X-Process-Time", str(process_time).encode()))
+                headers.append((b"X-Request-ID", request_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PreviousErrorHandlerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        request_id = str(uuid.uuid4())
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                scope["request_id"] = request_id
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                headers.append((b"X-Request-ID", request_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive_wrapper, send_wrapper)
+
+
+def use_logging_options(stack: str) -> None:
+    """LogRecord collection as logging.basicConfig left it, or as configure_logging() sets it."""
+    unified = stack == "unified"
+    logging._srcfile = None if unified else DEFAULT_SRCFILE
+    logging.logThreads = not unified
+    logging.logMultiprocessing = not unified
+
+
+def build_app(stack: str, log_dir: str):
+    from fastapi import FastAPI
+
+    from logging_config import BatchingQueueListener, JsonFormatter, RequestContextQueueHandler
+    from middleware import RequestContextMiddleware
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"item_id": item_id}
+
+    output = logging.FileHandler(os.path.join(log_dir, f"{stack}.log"))
+    listener = None
+    if stack == "previous":
+        output.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        logger = logging.getLogger("bench.previous")
+        logger.addHandler(output)
+        app.add_middleware(PreviousRequestLoggingMiddleware, logger=logger)
+        app.add_middleware(PreviousErrorHandlerMiddleware)
+    elif stack == "unified":
+        output.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        listener = BatchingQueueListener(log_queue, output)
+        listener.start()
+        logging.getLogger("corp_ai.access").addHandler(RequestContextQueueHandler(log_queue, maxsize=100000))
+        app.add_middleware(RequestContextMiddleware)
+    return app, listener
+
+
+async def bench(iterations: int, rounds: int, log_dir: str) -> None:
+    import httpx
+
+    stacks = ("none", "previous", "unified")
+    clients = {}
+    listeners = []
+    for stack in stacks:
+        app, listener = build_app(stack, log_dir)
+        if listener is not None:
+            listeners.append(listener)
+        clients[stack] = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    for client in clients.values():
+        for _ in range(200):
+            await client.get("/items/1")
+
+    results = {stack: float("inf") for stack in stacks}
+    for _ in range(rounds):
+        for stack, client in clients.items():
+            use_logging_options(stack)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await client.get("/items/1")
+            results[stack] = min(results[stack], time.perf_counter() - started)
+
+    print(f"through the ASGI stack (best of {rounds} interleaved rounds):")
+    for stack in stacks:
+        per_request = results[stack] / iterations * 1e6
+        overhead = (results[stack] - results["none"]) / iterations * 1e6
+        print(f"  {stack:<10} {per_request:>8.1f} us/request   overhead {overhead:>6.1f} us")
+
+    for client in clients.values():
+        await client.aclose()
+    for listener in listeners:
+        listener.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+        logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request would dominate
+        logging.getLogger().setLevel(logging.INFO)
+        asyncio.run(bench(args.iterations, args.rounds, tmp_dir))
+
+
+if __name__ == "__main__":
+    main()
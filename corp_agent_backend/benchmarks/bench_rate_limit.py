@@ -0,0 +1,116 @@
+"""
+Per-request cost of the built-in rate limiter.
+
+Measures, with RATE_LIMIT_ENABLED on and limits high enough never to reject:
+
+* the GCRA check alone, with a single hot client and with 50k distinct clients
+* the full `rate_limit` dependency (token claims lookup + policy + check),
+  called directly for an authenticated and an anonymous request
+* the same trivial route served through the ASGI stack with and without the
+  dependency, so the difference is the overhead a real request pays
+
+    python benchmarks/bench_rate_limit.py --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def report(label: str, seconds: float, number: int) -> None:
+    print(f"  {label:<28} {seconds / number * 1e6:>8.2f} us/request")
+
+
+def bench_check(iterations: int) -> None:
+    from rate_limiter import MemoryRateLimiter, RateLimit
+
+    limit = RateLimit(times=10 ** 9, seconds=60)
+    limiter = MemoryRateLimiter(max_keys=100000)
+    print("GCRA check:")
+    report("one client", timeit.timeit(lambda: limiter.check("chat:user", limit), number=iterations), iterations)
+
+    keys = [f"chat:user-{i}" for i in range(50000)]
+    limiter = MemoryRateLimiter(max_keys=100000)
+    position = iter(range(10 ** 12))
+    elapsed = timeit.timeit(lambda: limiter.check(keys[next(position) % 50000], limit), number=iterations)
+    report("50k clients", elapsed, iterations)
+
+
+async def bench_dependency(iterations: int) -> None:
+    from starlette.requests import Request
+
+    import middleware
+    from auth.tokens import create_access_token
+
+    dependency = middleware.rate_limit(group="bench")
+    token = create_access_token({"sub": "bench@example.com", "role": "user", "is_admin": False, "plan": "basic"})
+
+    print("rate_limit dependency:")
+    for label, headers in (("authenticated", [(b"authorization", f"Bearer {token}".encode())]), ("anonymous", [])):
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": ("10.0.0.1", 1234)})
+        await dependency(request)  # warm up the token cache and policy memo
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await dependency(request)
+        report(label, time.perf_counter() - started, iterations)
+
+
+async def bench_http(iterations: int) -> None:
+    import logging
+
+    import httpx
+    from fastapi import Depends, FastAPI
+
+    import middleware
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request would dominate
+    app = FastAPI()
+
+    @app.get("/plain")
+    async def plain():
+        return {"ok": True}
+
+    @app.get("/limited", dependencies=[Depends(middleware.rate_limit(group="bench"))])
+    async def limited():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print("through the ASGI stack (best of 5 interleaved rounds):")
+        for path in ("/plain", "/limited"):
+            for _ in range(200):
+                await client.get(path)
+        results = {"/plain": float("inf"), "/limited": float("inf")}
+        for _ in range(5):
+            for path in results:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    await client.get(path)
+                results[path] = min(results[path], time.perf_counter() - started)
+        for path, elapsed in results.items():
+            report(path, elapsed, iterations)
+        report("overhead", results["/limited"] - results["/plain"], iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="calls per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+        os.environ["RATE_LIMIT_ENABLED"] = "true"
+        os.environ["RATE_LIMIT_BACKEND"] = "memory"
+        os.environ["RATE_LIMIT_RULES"] = "bench:*=1000000000/60"
+        bench_check(args.iterations * 5)
+        asyncio.run(bench_dependency(args.iterations))
+        asyncio.run(bench_http(args.iterations // 10))
+
+
+if __name__ == "__main__":
+    main()
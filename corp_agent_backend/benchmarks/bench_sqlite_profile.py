@@ -0,0 +1,153 @@
+"""
+Mixed read/write throughput on SQLite, with and without the SQLite profile.
+
+Two scenarios are measured against a throwaway database file:
+
+* multi-process: N worker processes (like uvicorn workers) each run a sync
+  engine and issue a read/write mix for a fixed duration.
+* async: one process with N concurrent tasks on the aiosqlite engine; with the
+  profile enabled, writes go through the single-writer queue.
+
+Each run reports completed operations per second and "database is locked" errors.
+
+    python benchmarks/bench_sqlite_profile.py --workers 4 --tasks 64 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.sqlite import apply_sqlite_profile
+from db.write_queue import WriteQueue
+
+metadata = MetaData()
+events = Table(
+    "bench_events",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("payload", String, nullable=False),
+)
+
+SEED_ROWS = 1000
+
+
+def prepare(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(events), [{"payload": f"seed-{i}"} for i in range(SEED_ROWS)])
+    engine.dispose()
+
+
+def run_worker(path: str, profile: bool, seconds: float, write_ratio: float, results) -> None:
+    # The profile sets its own busy_timeout; without it use the driver's default 5s wait
+    engine = create_engine(f"sqlite:///{path}")
+    if profile:
+        apply_sqlite_profile(engine)
+    ops = locked = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if random.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(insert(events).values(payload="w"))
+            else:
+                with engine.connect() as conn:
+                    conn.execute(select(events).where(events.c.id == random.randint(1, SEED_ROWS))).first()
+            ops += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((ops, locked))
+
+
+def bench_processes(path: str, profile: bool, args) -> None:
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(path, profile, args.seconds, args.write_ratio, results))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    totals = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    ops = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    label = "profile" if profile else "default"
+    print(f"  processes={args.workers:<3} {label:<8} {ops / args.seconds:>10.1f} ops/s  locked_errors={locked}")
+
+
+async def bench_async(path: str, profile: bool, args) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.tasks, max_overflow=0)
+    if profile:
+        apply_sqlite_profile(engine.sync_engine)
+    queue = WriteQueue(serialize=profile)
+    await queue.start()
+    ops = locked = 0
+    deadline = time.perf_counter() + args.seconds
+
+    async def write():
+        async with engine.begin() as conn:
+            await conn.execute(insert(events).values(payload="w"))
+
+    async def task():
+        nonlocal ops, locked
+        while time.perf_counter() < deadline:
+            try:
+                if random.random() < args.write_ratio:
+                    await queue.submit(write)
+                else:
+                    async with engine.connect() as conn:
+                        await conn.execute(select(events).where(events.c.id == random.randint(1, SEED_ROWS)))
+                ops += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                locked += 1
+
+    await asyncio.gather(*(task() for _ in range(args.tasks)))
+    await queue.stop()
+    await engine.dispose()
+    label = "profile" if profile else "default"
+    print(f"  tasks={args.tasks:<7} {label:<8} {ops / args.seconds:>10.1f} ops/s  locked_errors={locked}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes for the multi-process run")
+    parser.add_argument("--tasks", type=int, default=64, help="concurrent tasks for the async run")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of operations that write")
+    args = parser.parse_args()
+
+    print(f"write ratio {args.write_ratio:.0%}, {args.seconds:.0f}s per run")
+    print("multi-process (sync engine):")
+    for profile in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.db")
+            prepare(path)
+            bench_processes(path, profile, args)
+
+    print("single process (async engine):")
+    for profile in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "bench.db")
+            prepare(path)
+            asyncio.run(bench_async(path, profile, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Response compression - brotli (when the brotli package is installed) or gzip,
+negotiated from Accept-Encoding.
+
+Bodies smaller than COMPRESSION_MINIMUM_SIZE go out as they are. A response
+sent in one message is compressed in one go and gets a new Content-Length; a
+streamed one (StreamingResponse, more_body=True) is compressed chunk by chunk
+with each chunk flushed, so the client receives data as it is produced rather
+than when the stream ends. Bodies and chunks of OFFLOAD_SIZE or more are
+compressed in the threadpool (zlib and brotli release the GIL), so a large
+report doesn't stall the event loop for tens of milliseconds.
+
+Responses that already carry a Content-Encoding, and content types that are
+already compressed (images, PDFs, archives) or must reach the client
+unbuffered (server-sent events), pass through untouched.
+"""
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Content types (prefixes) never worth compressing
+SKIPPED_CONTENT_TYPES = (
+    b"image/", b"video/", b"audio/", b"application/pdf", b"application/zip",
+    b"application/gzip", b"application/x-gzip", b"text/event-stream",
+)
+
+# Compressing this much takes about a millisecond or more, worth a thread hop
+OFFLOAD_SIZE = 64 * 1024
+
+
+class GzipEncoder:
+    encoding = b"gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    encoding = b"br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _encode(encoder, data: bytes, last: bool) -> bytes:
+    return encoder.compress(data) + (encoder.finish() if last else encoder.flush())
+
+
+async def encode(encoder, data: bytes, last: bool) -> bytes:
+    """Compress a chunk and flush it (or end the stream when `last`), off the loop when large."""
+    if len(data) >= OFFLOAD_SIZE:
+        return await run_in_threadpool(_encode, encoder, data, last)
+    return _encode(encoder, data, last)
+
+
+def compress_once(body: bytes, encoding: bytes) -> bytes:
+    """Compress at the highest setting, for bodies compressed once and served many times."""
+    encoder = BrotliEncoder(11) if encoding == b"br" else GzipEncoder(9)
+    return encoder.compress(body) + encoder.finish()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[bytes]:
+    """b"br", b"gzip" or None for an Accept-Encoding value; brotli wins when both are accepted."""
+    accepted = set()
+    for entry in accept_encoding.lower().split(","):
+        coding, _, params = entry.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding.strip())
+    if BROTLI_AVAILABLE and ("br" in accepted or "*" in accepted):
+        return b"br"
+    if "gzip" in accepted or "*" in accepted:
+        return b"gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing response bodies of at least
+    `minimum_size` bytes with the best encoding the client accepts.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 4, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoder(self, encoding: bytes):
+        if encoding == b"br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", ())
+                for key, value in headers:
+                    if key == b"content-encoding" or (
+                        key == b"content-type" and value.lower().startswith(SKIPPED_CONTENT_TYPES)
+                    ):
+                        passthrough = True
+                        break
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether to compress
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = [
+                    (key, value) for key, value in start.get("headers", ())
+                    if key not in (b"content-length", b"vary")
+                ]
+                vary = [value for key, value in start.get("headers", ()) if key == b"vary"]
+                headers.append((b"content-encoding", encoding))
+                headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+                encoder = self._encoder(encoding)
+                if not more_body:
+                    body = await encode(encoder, body, last=True)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers})
+
+            await send({
+                "type": "http.response.body",
+                "body": await encode(encoder, body, last=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def setup_compression(app) -> None:
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        )
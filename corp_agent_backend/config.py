@@ -16,28 +16,166 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-replace-in-production")
     JWT_ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Refresh sessions slide forward by this much on every refresh...
+    JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+    # ...but never outlive the original login by more than this
+    JWT_REFRESH_SESSION_MAX_DAYS: int = int(os.getenv("REFRESH_SESSION_MAX_DAYS", "90"))
     
+    # Authenticated principal cache (per process); 0 disables it
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    AUTH_PRINCIPAL_CACHE_SIZE: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # When > 0, the cost factor is recalibrated at startup to hash in about this long; 0 keeps BCRYPT_ROUNDS.
+    # Off by default: calibrating runs several full-cost hashes in every worker on every start
+    BCRYPT_CALIBRATION_TARGET_MS: float = float(os.getenv("BCRYPT_CALIBRATION_TARGET_MS", "0"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))  # 0 = inline
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+    # Authorization: plan order used until plans are read from the database (cheapest first),
+    # and how often roles and plans are re-read to rebuild the decision table (0 = only on demand)
+    SUBSCRIPTION_TIERS: str = os.getenv("SUBSCRIPTION_TIERS", "basic,professional,enterprise")
+    AUTHZ_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("AUTHZ_RELOAD_INTERVAL_SECONDS", "60"))
+
+    # Bulk user provisioning (admin endpoint and scripts/bulk_provision_users.py)
+    PROVISIONING_HASH_WORKERS: int = int(os.getenv("PROVISIONING_HASH_WORKERS", str(os.cpu_count() or 1)))  # processes
+    PROVISIONING_BATCH_SIZE: int = int(os.getenv("PROVISIONING_BATCH_SIZE", "500"))  # users per transaction
+    PROVISIONING_MAX_ROWS: int = int(os.getenv("PROVISIONING_MAX_ROWS", "10000"))
+
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./corp_ai.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables recycling
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    # When disabled, stale connections are invalidated on the first disconnect error instead of
+    # being pinged on every checkout
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    
+    # SQLite performance profile (applied automatically for sqlite:// URLs)
+    SQLITE_PROFILE_ENABLED: bool = os.getenv("SQLITE_PROFILE_ENABLED", "True").lower() == "true"
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative = KiB, positive = pages
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_WRITE_QUEUE_SIZE: int = int(os.getenv("SQLITE_WRITE_QUEUE_SIZE", "1000"))
+    
+    # Tool usage write-behind buffer
+    TOOL_HISTORY_FLUSH_INTERVAL_MS: int = int(os.getenv("TOOL_HISTORY_FLUSH_INTERVAL_MS", "250"))
+    TOOL_HISTORY_FLUSH_BATCH_SIZE: int = int(os.getenv("TOOL_HISTORY_FLUSH_BATCH_SIZE", "200"))
+    TOOL_HISTORY_BUFFER_LIMIT: int = int(os.getenv("TOOL_HISTORY_BUFFER_LIMIT", "10000"))
+    
+    # Outbound HTTP to OAuth providers (shared pooled client)
+    OAUTH_HTTP_TIMEOUT: float = float(os.getenv("OAUTH_HTTP_TIMEOUT", "10"))  # seconds per read/write/pool wait
+    OAUTH_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("OAUTH_HTTP_CONNECT_TIMEOUT", "5"))
+    OAUTH_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OAUTH_HTTP_MAX_CONNECTIONS", "100"))
+    OAUTH_HTTP_MAX_KEEPALIVE: int = int(os.getenv("OAUTH_HTTP_MAX_KEEPALIVE", "20"))
+    OAUTH_HTTP_RETRIES: int = int(os.getenv("OAUTH_HTTP_RETRIES", "2"))
+    OAUTH_HTTP_BACKOFF: float = float(os.getenv("OAUTH_HTTP_BACKOFF", "0.2"))  # seconds, doubled per retry
+    
+    # OAuth CSRF state store ("memory" = this process only, or "redis" to share between workers)
+    OAUTH_STATE_BACKEND: str = os.getenv("OAUTH_STATE_BACKEND", "memory")
+    OAUTH_STATE_TTL_SECONDS: int = int(os.getenv("OAUTH_STATE_TTL_SECONDS", "1800"))
+    OAUTH_STATE_MAX_ENTRIES: int = int(os.getenv("OAUTH_STATE_MAX_ENTRIES", "10000"))
+    OAUTH_STATE_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("OAUTH_STATE_SWEEP_INTERVAL_SECONDS", "60"))
+    OAUTH_STATE_REDIS_URL: str = os.getenv(
+        "OAUTH_STATE_REDIS_URL",
+        f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/{os.getenv('REDIS_DB', '0')}"
+    )
     
     # Rate limiting
     RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "False").lower() == "true"
     RATE_LIMIT_REDIS_URL: Optional[str] = os.getenv("RATE_LIMIT_REDIS_URL")
     RATE_LIMIT_DEFAULT_LIMIT: int = int(os.getenv("RATE_LIMIT_DEFAULT_LIMIT", "100"))
     RATE_LIMIT_DEFAULT_PERIOD: int = int(os.getenv("RATE_LIMIT_DEFAULT_PERIOD", "3600"))  # 1 hour in seconds
+    # "memory" = this process only, or "redis" to share counts between workers (uses RATE_LIMIT_REDIS_URL)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # clients tracked in memory
+    # Per route group and subscription tier: "group:tier=times/seconds", "*" matches any;
+    # unmatched requests get RATE_LIMIT_DEFAULT_LIMIT per RATE_LIMIT_DEFAULT_PERIOD
+    RATE_LIMIT_RULES: str = os.getenv(
+        "RATE_LIMIT_RULES",
+        "auth:*=20/60,"
+        "chat:anonymous=10/60,chat:basic=20/60,chat:professional=60/60,chat:enterprise=240/60,"
+        "tools:basic=60/60,tools:professional=300/60,tools:enterprise=1200/60"
+    )
     
     # Redis settings
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     
+    # Verified access token cache and jti revocation sharing ("memory" = this process only, or "redis")
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_REVOCATION_BACKEND: str = os.getenv("AUTH_REVOCATION_BACKEND", "memory")
+    AUTH_REVOCATION_REDIS_URL: str = os.getenv(
+        "AUTH_REVOCATION_REDIS_URL",
+        f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/{os.getenv('REDIS_DB', '0')}"
+    )
+    
     # AI model settings
     CORP_LLM_PATH: str = os.getenv("CORP_LLM_PATH", "./models/corp-llm-loRA")
     CHROMA_PERSIST_DIR: str = os.getenv("CHROMA_PERSIST_DIR", "db/chroma")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     
-    # Logging
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+
+    # Request tracing: "none", "jsonl" (TRACE_JSONL_PATH) or "otlp" (OTLP/HTTP JSON to TRACE_OTLP_ENDPOINT)
+    TRACE_EXPORTER: str = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))  # fraction of requests traced
+    TRACE_JSONL_PATH: str = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+    TRACE_OTLP_ENDPOINT: str = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACE_EXPORT_BATCH_SIZE: int = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "512"))
+    TRACE_EXPORT_QUEUE_SIZE: int = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "2048"))  # spans beyond this are dropped
+
+    # Event loop lag monitor: heartbeat period, how long a stall counts as a block, and (for tests)
+    # the block length that makes a request fail with EventLoopBlockedError (0 = never)
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+    LOOP_LAG_INTERVAL_MS: float = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+    LOOP_BLOCK_THRESHOLD_MS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+    LOOP_BLOCK_STRICT_MS: float = float(os.getenv("LOOP_BLOCK_STRICT_MS", "0"))
+
+    # Admin sampling profiler at /debug/profile
+    PROFILER_ENABLED: bool = os.getenv("PROFILER_ENABLED", "True").lower() == "true"
+    PROFILER_SAMPLE_HZ: float = float(os.getenv("PROFILER_SAMPLE_HZ", "100"))
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+    # Server-Timing response header (db, llm, retrieval, render and total time per request); it
+    # reveals backend timings to clients, so turn it off if that matters more than the devtools view
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "True").lower() == "true"
+
+    # Response compression (brotli when installed, else gzip) for bodies of at least COMPRESSION_MINIMUM_SIZE bytes
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "4"))  # 1-9; 6+ costs 3x for ~2% smaller JSON
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 0-11; 4 suits on-the-fly compression
+
+    # Production server (gunicorn.conf.py, `python run.py --workers N`): worker processes, when they
+    # are recycled, and the read-only assets loaded once in the master and shared by the forked workers.
+    # PRELOAD_ASSETS is comma-separated: "modules" (LangChain, torch, transformers, pandas...),
+    # "llm", "support_kb", "qa_chain"; only preload "llm" for CPU models, CUDA doesn't survive fork()
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))  # worker processes
+    WORKER_MAX_REQUESTS: int = int(os.getenv("WORKER_MAX_REQUESTS", "10000"))  # then the worker is replaced (0 = never)
+    WORKER_MAX_REQUESTS_JITTER: int = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "1000"))  # so workers don't all restart at once
+    WORKER_TIMEOUT: int = int(os.getenv("WORKER_TIMEOUT", "120"))  # seconds without a heartbeat before a worker is killed
+    WORKER_GRACEFUL_TIMEOUT: int = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))  # seconds to finish requests on reload/stop
+    PRELOAD_ASSETS: str = os.getenv("PRELOAD_ASSETS", "modules")
+
+    # Graceful shutdown (shutdown.py): seconds in-flight requests, background tasks and LLM generations
+    # get to finish before they're cancelled, then seconds each flush/close step may take. uvicorn
+    # waits for open requests first, so keep the total under WORKER_GRACEFUL_TIMEOUT
+    SHUTDOWN_GRACE_PERIOD: float = float(os.getenv("SHUTDOWN_GRACE_PERIOD", "15"))
+    SHUTDOWN_FLUSH_TIMEOUT: float = float(os.getenv("SHUTDOWN_FLUSH_TIMEOUT", "5"))
+
+    # Logging ("json" = one JSON object per line with the request id, or "text")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped
+    LOG_FLUSH_INTERVAL_MS: int = int(os.getenv("LOG_FLUSH_INTERVAL_MS", "50"))  # how often queued records are written
     
     class Config:
         env_file = ".env"
@@ -1,6 +1,15 @@
+"""
+CORP AI agent - the LLM, the LangChain tools, the knowledge base QA chain and
+the agent built from them.
+
+Each is built on first use (PEP 562 module __getattr__) rather than at import:
+loading the model pulls in torch and transformers and can take a minute, and
+most processes that import this module never need all four.
+"""
 import os
 import logging
 import importlib.util
+import threading
 from config import settings
 
 # Configure logging
@@ -78,35 +87,68 @@ def load_llm():
         # Return dummy LLM if everything fails
         return DummyLLM()
 
-# Initialize the LLM
-llm = load_llm()
-
-# Import tools based on available dependencies
-tools = []
-
-# Import tools
-from tools.crm import create_lead
-from tools.sales_forecast import forecast_sales
-from tools.chat_support import handle_customer_query
-from tools.marketing import send_campaign
-from tools.social_media import post_social
-from tools.analytics import generate_report
-from tools.hr_assistant import create_job_post
-from tools.contract_review import review_contract
-from tools.finance_planner import plan_budget
-from tools.supply_chain import optimize_inventory
-from tools.scheduler import schedule_appointment
-from tools.review_management import respond_review
-from tools.accounting import generate_invoice
-from tools.inventory import update_stock
-from tools.legal_crm import create_case
-from tools.notification import send_notification
-from tools.reservation import make_reservation
-
-# Only create tools if LangChain is available
-if HAS_LANGCHAIN:
+# Custom prompt template for the agent
+AGENT_TEMPLATE = """You are CORP AI, a comprehensive business assistant designed to streamline operations.
+You have access to various business tools and a knowledge base to help answer questions.
+
+TOOLS:
+------
+You have access to the following tools:
+{tools}
+
+To use a tool, please use the following format:
+```
+Thought: I need to use a tool to help with this query.
+Action: tool_name
+Action Input: the input to the tool
+```
+
+When you have a response to say to the Human, you MUST use the format:
+```
+Thought: I know the answer to this.
+Final Answer: the final answer to the human
+```
+
+CHAT HISTORY:
+-------------
+{chat_history}
+
+QUESTION:
+---------
+{input}
+
+Begin!
+Thought: """
+
+# The objects built on first use, in dependency order
+_LAZY_NAMES = ("llm", "tools", "qa_chain", "agent")
+_lock = threading.RLock()  # building the agent builds the llm and tools under the same lock
+
+
+def build_tools():
+    """The LangChain tools for the agent (empty without LangChain)."""
+    if not HAS_LANGCHAIN:
+        return []
+
     from langchain.agents import Tool # type: ignore
-    
+    from tools.crm import create_lead
+    from tools.sales_forecast import forecast_sales
+    from tools.chat_support import handle_customer_query
+    from tools.marketing import send_campaign
+    from tools.social_media import post_social
+    from tools.analytics import generate_report
+    from tools.hr_assistant import create_job_post
+    from tools.contract_review import review_contract
+    from tools.finance_planner import plan_budget
+    from tools.supply_chain import optimize_inventory
+    from tools.scheduler import schedule_appointment
+    from tools.review_management import respond_review
+    from tools.accounting import generate_invoice
+    from tools.inventory import update_stock
+    from tools.legal_crm import create_case
+    from tools.notification import send_notification
+    from tools.reservation import make_reservation
+
     tools = [
         Tool(name="CRM", func=create_lead, description="Manage leads and follow-ups."),
         Tool(name="SalesForecast", func=forecast_sales, description="Generate sales forecasts."),
@@ -127,9 +169,24 @@ if HAS_LANGCHAIN:
         Tool(name="Reservation", func=make_reservation, description="Handle reservations for services."),
     ]
 
-# Initialize knowledge base and retrieval QA if dependencies are available
-qa_chain = None
-if HAS_LANGCHAIN and importlib.util.find_spec("sentence_transformers") is not None:
+    # register the knowledge base as a tool
+    qa_chain = _get("qa_chain")
+    if qa_chain:
+        tools.append(
+            Tool(
+                name="KnowledgeBaseQA",
+                func=lambda q: qa_chain.run(q),
+                description="Answer questions from company documents."
+            )
+        )
+        logger.info("Knowledge base QA tool added successfully")
+    return tools
+
+
+def build_qa_chain():
+    """Retrieval QA over the company documents, or None if its dependencies are missing."""
+    if not (HAS_LANGCHAIN and importlib.util.find_spec("sentence_transformers") is not None):
+        return None
     try:
         from langchain_chroma import Chroma # type: ignore
         from langchain_community.embeddings import HuggingFaceEmbeddings # type: ignore
@@ -140,91 +197,80 @@ if HAS_LANGCHAIN and importlib.util.find_spec("sentence_transformers") is not No
         embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
         vectordb = Chroma(persist_directory="db/chroma", embedding_function=embeddings)
         retriever = vectordb.as_retriever(search_kwargs={"k": 5})
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
+        return RetrievalQA.from_chain_type(
+            llm=_get("llm"),
             chain_type="stuff",
             retriever=retriever
         )
-
-        # register as a tool
-        if qa_chain:
-            tools.append(
-                Tool(
-                    name="KnowledgeBaseQA",
-                    func=lambda q: qa_chain.run(q),
-                    description="Answer questions from company documents."
-                )
-            )
-            logger.info("Knowledge base QA tool added successfully")
     except Exception as e:
         logger.error(f"Error initializing knowledge base: {str(e)}")
+        return None
 
-# Initialize the agent with the LLM and tools
-agent = None
-if HAS_LANGCHAIN and tools:
-    try:
-        from langchain.agents import initialize_agent
-        from langchain.memory import ConversationBufferMemory
-        from langchain.prompts import PromptTemplate
 
-        # Create a memory for the agent to maintain conversation context
-        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+def _fallback_agent(query):
+    return "I'm sorry, but I'm experiencing technical difficulties. The agent could not be initialized properly."
 
-        # Custom prompt template for the agent
-        template = """You are CORP AI, a comprehensive business assistant designed to streamline operations.
-You have access to various business tools and a knowledge base to help answer questions.
 
-TOOLS:
-------
-You have access to the following tools:
-{tools}
+def build_agent():
+    """The conversational agent over the LLM and tools, or a fallback function."""
+    tools = _get("tools")
+    if HAS_LANGCHAIN and tools:
+        try:
+            from langchain.agents import initialize_agent
+            from langchain.memory import ConversationBufferMemory
+            from langchain.prompts import PromptTemplate
 
-To use a tool, please use the following format:
-```
-Thought: I need to use a tool to help with this query.
-Action: tool_name
-Action Input: the input to the tool
-```
+            # Create a memory for the agent to maintain conversation context
+            memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
 
-When you have a response to say to the Human, you MUST use the format:
-```
-Thought: I know the answer to this.
-Final Answer: the final answer to the human
-```
+            # Initialize the agent
+            agent = initialize_agent(
+                tools=tools,
+                llm=_get("llm"),
+                agent="chat-conversational-react-description",
+                verbose=True,
+                memory=memory,
+                prompt=PromptTemplate(
+                    input_variables=["tools", "chat_history", "input"],
+                    template=AGENT_TEMPLATE
+                ),
+                handle_parsing_errors=True
+            )
+            logger.info("Agent initialized successfully")
+            return agent
+        except Exception as e:
+            logger.error(f"Error initializing agent: {str(e)}")
 
-CHAT HISTORY:
--------------
-{chat_history}
+    # Fallback agent function if initialization failed
+    logger.warning("Using fallback agent function")
+    return _fallback_agent
 
-QUESTION:
----------
-{input}
 
-Begin!
-Thought: """
+_BUILDERS = {
+    "llm": load_llm,
+    "tools": build_tools,
+    "qa_chain": build_qa_chain,
+    "agent": build_agent,
+}
 
-        # Initialize the agent
-        agent = initialize_agent(
-            tools=tools,
-            llm=llm,
-            agent="chat-conversational-react-description",
-            verbose=True,
-            memory=memory,
-            prompt=PromptTemplate(
-                input_variables=["tools", "chat_history", "input"],
-                template=template
-            ),
-            handle_parsing_errors=True
-        )
-        logger.info("Agent initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing agent: {str(e)}")
 
-# Create fallback agent function if initialization failed
-if agent is None:
-    def agent(query):
-        return "I'm sorry, but I'm experiencing technical difficulties. The agent could not be initialized properly."
-    logger.warning("Using fallback agent function")
+def _get(name):
+    """Return the named object, building it (once) if this is its first use."""
+    try:
+        return globals()[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in globals():
+            globals()[name] = _BUILDERS[name]()
+        return globals()[name]
+
+
+def __getattr__(name):
+    if name in _BUILDERS:
+        return _get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Export the agent for use in the API
-__all__ = ["agent", "llm", "tools"]
\ No newline at end of file
+__all__ = ["agent", "llm", "tools"]
@@ -0,0 +1,139 @@
+"""
+Connection pool instrumentation - checkout wait time, checked-out count,
+overflow and invalidation events for the sync and async engines.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger("corp_ai.db")
+
+
+class PoolMetrics:
+    """Counters for a single engine's connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.disconnects = 0
+
+    def record_checkout(self, wait: float, overflowed: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            if wait > self.checkout_wait_max:
+                self.checkout_wait_max = wait
+            if overflowed:
+                self.overflow_events += 1
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.checkout_wait_total += wait
+            if wait > self.checkout_wait_max:
+                self.checkout_wait_max = wait
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a point-in-time view of the pool and its counters."""
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_wait_avg_ms": (self.checkout_wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "checkout_wait_max_ms": self.checkout_wait_max * 1000,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "disconnects": self.disconnects,
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+
+class _TimedCheckoutMixin:
+    """Times every checkout from the pool's internal queue."""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        if self.metrics is not None:
+            overflowed = self._overflow > max(overflow_before, 0)
+            self.metrics.record_checkout(time.perf_counter() - start, overflowed)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# One metrics object per engine in db/session.py
+pool_metrics: Dict[str, PoolMetrics] = {
+    "sync": PoolMetrics("sync"),
+    "async": PoolMetrics("async"),
+}
+
+
+def instrument_engine(engine, metrics: PoolMetrics) -> None:
+    """Attach pool metrics and disconnect handling to a (sync) Engine."""
+    pool = engine.pool
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool.metrics = metrics
+    metrics.pool = pool
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics._lock:
+            metrics.invalidations += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            # Only counted and logged: SQLAlchemy already invalidates the whole pool on a
+            # disconnect (invalidate_pool_on_disconnect defaults to True), which is what
+            # replaces stale connections when pre-ping is off
+            with metrics._lock:
+                metrics.disconnects += 1
+            logger.warning(f"Database disconnect detected on {metrics.name} engine, invalidating pool")
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every instrumented engine's pool."""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
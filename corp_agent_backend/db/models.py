@@ -117,3 +117,20 @@ class UserSubscription(Base):
     active = Column(Boolean, default=True)
     user = relationship("User", back_populates="subscriptions")
     plan = relationship("SubscriptionPlan", back_populates="subscriptions")
+
+class RefreshToken(Base):
+    """
+    One refresh token in a login session. Only the SHA-256 digest of the token is
+    stored; every rotation revokes the presented row and adds its successor to
+    the same family, so a replayed token can revoke the whole session.
+    """
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    session_started_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+    user = relationship("User")
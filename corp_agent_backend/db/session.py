@@ -1,17 +1,79 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from config import settings
+from db.instrumentation import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    instrument_engine,
+    pool_metrics,
+)
+from db.sqlite import apply_sqlite_profile, is_sqlite
+from db.write_queue import WriteQueue
+from server_timing import instrument_engine_timing
+from tracing import instrument_engine_tracing
 
-load_dotenv()  # load DATABASE_URL, etc.
+DATABASE_URL = settings.DATABASE_URL
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Async drivers for each sync URL scheme we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+def make_async_url(url: str) -> str:
+    """Translate a sync database URL into its async-driver equivalent."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool options from settings. In-memory SQLite keeps the dialect's default single-connection pool."""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+# Sync engine - used by scripts, migrations and the remaining sync routes
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine - used by the async routers so DB round trips don't block the event loop
+ASYNC_DATABASE_URL = make_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # attribute access after commit would need a lazy (sync) refresh
+)
+
+instrument_engine(engine, pool_metrics["sync"])
+instrument_engine(async_engine.sync_engine, pool_metrics["async"])
+instrument_engine_tracing(engine)
+instrument_engine_tracing(async_engine.sync_engine)
+instrument_engine_timing(engine)
+instrument_engine_timing(async_engine.sync_engine)
+
+SQLITE_PROFILE = is_sqlite(DATABASE_URL) and settings.SQLITE_PROFILE_ENABLED
+if SQLITE_PROFILE:
+    apply_sqlite_profile(engine)
+    apply_sqlite_profile(async_engine.sync_engine)
+
+# Async writes go through here; only SQLite needs them serialized
+write_queue = WriteQueue(serialize=SQLITE_PROFILE, maxsize=settings.SQLITE_WRITE_QUEUE_SIZE)
+
 def get_db():
     """
     Dependency for FastAPI routes. Yields a SQLAlchemy Session,
@@ -22,3 +84,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """
+    Async dependency for FastAPI routes. Yields an AsyncSession,
+    and ensures the session is closed after the request.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,44 @@
+"""
+SQLite performance profile - WAL journaling, relaxed fsync, mmap I/O, a larger
+page cache and a busy timeout, applied to every new connection.
+"""
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from config import settings
+
+logger = logging.getLogger("corp_ai.db")
+
+
+def is_sqlite(url: str) -> bool:
+    """True for any SQLite URL, whatever the driver."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def sqlite_pragmas() -> dict:
+    """PRAGMAs issued on every connection, in order."""
+    return {
+        "journal_mode": "WAL",  # readers no longer block the writer (and vice versa)
+        "synchronous": settings.SQLITE_SYNCHRONOUS,  # NORMAL is durable in WAL mode except on power loss
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,  # wait on a locked database instead of failing
+    }
+
+
+def apply_sqlite_profile(engine) -> None:
+    """Register a connect hook that sets the profile PRAGMAs on a (sync) Engine."""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    logger.info(f"SQLite profile enabled for {engine.url.render_as_string(hide_password=True)}")
@@ -0,0 +1,148 @@
+"""
+Write-behind buffer - collects rows in memory and bulk-inserts them on a timer
+or once a batch fills, instead of committing once per event.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from db.write_queue import WriteQueue
+
+logger = logging.getLogger("corp_ai.db")
+
+
+class BufferFullError(Exception):
+    """Raised when the buffer is at capacity and can't accept more rows."""
+
+
+class WriteBehindBuffer:
+    """
+    Buffers rows for one table and flushes them with a single executemany INSERT.
+
+    A flush happens every `flush_interval_ms`, or as soon as `batch_size` rows are
+    waiting. Rows from a failed flush are put back (up to `max_buffered`) and
+    retried on the next cycle. `stop()` lets a flush in progress finish rather than
+    cancelling it mid-insert, then drains everything still buffered. When the
+    flusher isn't running on the caller's loop, `add` inserts immediately instead.
+    """
+
+    def __init__(
+        self,
+        model,
+        session_factory,
+        write_queue: Optional[WriteQueue] = None,
+        flush_interval_ms: int = 250,
+        batch_size: int = 200,
+        max_buffered: int = 10000,
+    ):
+        self.model = model
+        self.session_factory = session_factory
+        self.write_queue = write_queue
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._rows: List[Dict[str, Any]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.flushed = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    async def start(self) -> None:
+        """Start the periodic flusher on the running loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name=f"write-behind-{self.model.__tablename__}")
+        logger.info(f"Write-behind buffer for {self.model.__tablename__} started")
+
+    async def stop(self) -> None:
+        """Stop the flusher and drain whatever is still buffered."""
+        if self.running:
+            # Ask the flusher to exit after its current flush; shielded, so a caller's timeout
+            # doesn't cancel an insert halfway
+            self._stopping = True
+            self._wake.set()
+            await asyncio.shield(self._task)
+        self._task = None
+        while self._rows:
+            if not await self.flush():
+                break
+        if self._rows:
+            self.dropped += len(self._rows)
+            logger.error(f"Dropped {len(self._rows)} buffered {self.model.__tablename__} rows at shutdown")
+            self._rows.clear()
+        logger.info(f"Write-behind buffer for {self.model.__tablename__} stopped")
+
+    async def add(self, rows: List[Dict[str, Any]]) -> None:
+        """Buffer rows for the next flush (or insert them now if the flusher isn't running)."""
+        if not self.running or self._loop is not asyncio.get_running_loop():
+            await self._insert(rows)
+            return
+        if len(self._rows) + len(rows) > self.max_buffered:
+            raise BufferFullError(f"{self.model.__tablename__} write-behind buffer is full")
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> bool:
+        """Insert everything buffered so far. Returns False if the insert failed."""
+        if self._flush_lock is None:  # never started, so nothing can be buffered
+            return True
+        async with self._flush_lock:
+            if not self._rows:
+                return True
+            rows, self._rows = self._rows, []
+            try:
+                await self._insert(rows)
+            except asyncio.CancelledError:
+                # Keep them for the next flush or stop(); if the insert had already committed they
+                # are written twice, which beats losing them
+                self._rows[:0] = rows
+                raise
+            except Exception as e:
+                logger.error(f"Flushing {len(rows)} {self.model.__tablename__} rows failed: {str(e)}")
+                # Put them back ahead of anything that arrived meanwhile, within capacity
+                keep = rows[: max(self.max_buffered - len(self._rows), 0)]
+                self.dropped += len(rows) - len(keep)
+                self._rows[:0] = keep
+                return False
+            self.flushed += len(rows)
+            self.flushes += 1
+            return True
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        async def bulk_insert():
+            async with self.session_factory() as session:
+                await session.execute(insert(self.model), rows)
+                await session.commit()
+
+        if self.write_queue is not None:
+            await self.write_queue.submit(bulk_insert)
+        else:
+            await bulk_insert()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
@@ -0,0 +1,81 @@
+"""
+Single-writer queue - funnels write transactions through one consumer task so
+SQLite writers in this process never contend for the database lock.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger("corp_ai.db")
+
+T = TypeVar("T")
+
+
+class WriteQueue:
+    """
+    Runs submitted write callables one at a time, in submission order.
+
+    Each callable does its own session work (add/flush/commit) and is awaited by
+    the single consumer task; the submitter gets the callable's result or
+    exception back. When serialization is disabled (non-SQLite backends) or the
+    consumer isn't running on the caller's loop, work runs inline instead.
+    """
+
+    def __init__(self, serialize: bool = True, maxsize: int = 1000):
+        self.serialize = serialize
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the consumer task on the running loop."""
+        if not self.serialize or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._consume(), name="sqlite-write-queue")
+        logger.info("SQLite write queue started")
+
+    async def stop(self) -> None:
+        """Drain pending writes, then stop the consumer task."""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("SQLite write queue stopped")
+
+    async def submit(self, work: Callable[[], Awaitable[T]]) -> T:
+        """Queue a write and wait for it to complete."""
+        if not self.running or self._loop is not asyncio.get_running_loop():
+            return await work()
+        future = self._loop.create_future()
+        await self._queue.put((work, future))
+        return await future
+
+    async def _consume(self) -> None:
+        while True:
+            work, future = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    result = await work()
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
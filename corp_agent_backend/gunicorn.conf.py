@@ -0,0 +1,79 @@
+"""
+gunicorn configuration for production - N uvicorn workers forked from a
+master that has already loaded the app and PRELOAD_ASSETS (see workers.py).
+
+    gunicorn app:app -c gunicorn.conf.py        (or: python run.py --workers N)
+
+Signals to the master:
+    HUP     graceful reload: new workers are forked, old ones finish their
+            requests (up to WORKER_GRACEFUL_TIMEOUT) and exit. The app isn't
+            re-imported (it's preloaded), so this picks up settings, not code.
+    USR2    re-exec the master with the new code next to the old one; then
+            WINCH the old master to stop its workers and QUIT it once the new
+            workers are serving. This is how to deploy code without downtime.
+    TTIN / TTOU   one worker more / fewer.
+    TERM    graceful shutdown; QUIT / INT stop immediately.
+
+Workers are recycled after WORKER_MAX_REQUESTS requests (plus up to
+WORKER_MAX_REQUESTS_JITTER, so they don't all restart together), which caps
+how far a slow leak can grow; the replacement is forked from the master and
+starts with its preloaded pages shared.
+"""
+import importlib.util
+import logging
+import os
+import tempfile
+
+from config import settings
+
+# /metrics has to aggregate every worker's samples, which prometheus_client does through files
+# in this directory. Always on under gunicorn: the worker count can come from -w/--workers, which
+# this file can't see, and the directory has to be set before the preloaded app imports prometheus_client
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="corp_ai_metrics_")
+
+bind = f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+workers = settings.WEB_CONCURRENCY
+worker_class = (
+    "uvicorn_worker.UvicornWorker" if importlib.util.find_spec("uvicorn_worker") is not None
+    else "uvicorn.workers.UvicornWorker"
+)
+preload_app = True
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+timeout = settings.WORKER_TIMEOUT
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT
+keepalive = 5
+# The app's own access log (middleware.py) already covers every request
+accesslog = None
+errorlog = "-"
+loglevel = settings.LOG_LEVEL.lower()
+
+logger = logging.getLogger("corp_ai.workers")
+
+
+def when_ready(server):
+    """In the master, after the app is imported and before the first fork."""
+    from workers import freeze_for_fork, preload_assets
+
+    preload_assets(settings.PRELOAD_ASSETS)
+    freeze_for_fork()
+
+
+def post_fork(server, worker):
+    """In a new worker: don't reuse DB connections the master may have opened."""
+    from db.session import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """In the master, after a worker has exited (recycled, reloaded, stopped or crashed)."""
+    logger.info(f"Worker {worker.pid} exited")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,221 @@
+"""
+Logging setup - one configuration for the whole app, applied by app.py.
+
+Records are put on an in-memory queue by a QueueHandler on the root logger and
+formatted and written by a listener thread, so logging from a request never
+blocks the event loop on stderr or a slow log shipper. The listener wakes every
+LOG_FLUSH_INTERVAL_MS and writes everything queued in one go rather than being
+woken for each record; when the queue is full records are dropped and counted
+instead of waiting.
+
+LOG_FORMAT=json writes one JSON object per line with the request id of the
+request being served (see RequestContextMiddleware) and any `extra=` fields;
+LOG_FORMAT=text keeps the classic human-readable format.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Set by RequestContextMiddleware for the duration of each request
+request_id_var: ContextVar[Optional[str]] = ContextVar("corp_ai_request_id", default=None)
+
+# LogRecord attributes that aren't `extra=` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, request id and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without blocking, tagged with the current request id.
+
+    Only what depends on the moment of logging (the message arguments and the
+    request id) is resolved in the logging thread; formatting, tracebacks
+    included, happens in the listener. The queue is in-process, so records
+    don't need to be made picklable.
+    """
+
+    def __init__(self, log_queue, maxsize: int = 0):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.maxsize and self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class BatchingQueueListener:
+    """
+    Drains the queue every `interval` seconds and writes the batch to a
+    stream handler with a single write and flush.
+    """
+
+    def __init__(self, log_queue, handler: logging.StreamHandler, interval: float = 0.05):
+        self.queue = log_queue
+        self.handler = handler
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write out whatever is queued and stop the thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.drain()
+
+    def drain(self) -> None:
+        records: List[logging.LogRecord] = []
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not records:
+            return
+        handler = self.handler
+        lines = []
+        for record in records:
+            if record.levelno < handler.level:
+                continue
+            try:
+                lines.append(handler.format(record))
+            except Exception:
+                handler.handleError(record)
+        if not lines:
+            return
+        handler.acquire()
+        try:
+            handler.stream.write(handler.terminator.join(lines) + handler.terminator)
+            handler.flush()
+        except Exception:
+            handler.handleError(records[-1])
+        finally:
+            handler.release()
+
+
+_listener: Optional[BatchingQueueListener] = None
+queue_handler: Optional[RequestContextQueueHandler] = None
+# The direct handler stop_logging() leaves on the root logger, replaced on the next configure_logging()
+_fallback: Optional[logging.Handler] = None
+
+
+def build_formatter(log_format: str) -> logging.Formatter:
+    return JsonFormatter() if log_format.lower() == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def configure_logging() -> None:
+    """Route all logging through the queue to stderr. Safe to call more than once."""
+    global _listener, queue_handler, _fallback
+    if _listener is not None:
+        return
+
+    # Neither format uses the caller's file/line, thread or process, so skip collecting them
+    # for every record (the savings the logging docs' "Optimization" section lists)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(build_formatter(settings.LOG_FORMAT))
+    log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+    queue_handler = RequestContextQueueHandler(log_queue, maxsize=settings.LOG_QUEUE_SIZE)
+
+    root = logging.getLogger()
+    if _fallback is not None:
+        root.removeHandler(_fallback)
+        _fallback = None
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    _listener = BatchingQueueListener(log_queue, output, interval=settings.LOG_FLUSH_INTERVAL_MS / 1000)
+    _listener.start()
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Write out whatever is still queued and stop the listener thread; anything
+    logged afterwards (late shutdown messages) is written directly.
+    """
+    global _listener, queue_handler, _fallback
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(queue_handler)
+    _fallback = _listener.handler
+    root.addHandler(_fallback)
+    _listener.stop()
+    _listener = None
+    queue_handler = None
+
+
+def _before_fork() -> None:
+    # Write out what's queued, or the forked child would write it again
+    if _listener is not None:
+        _listener.drain()
+
+
+def _after_fork_in_child() -> None:
+    # Threads don't survive fork(), so a forked worker (gunicorn) starts its own listener
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
@@ -0,0 +1,248 @@
+"""
+Event loop lag monitor - finds blocking calls in async code and the routes
+they come from.
+
+A heartbeat task sleeps for LOOP_LAG_INTERVAL_MS at a time and records how
+late it wakes up (the loop's scheduling delay). A watchdog thread notices when
+the heartbeat has stalled for longer than LOOP_BLOCK_THRESHOLD_MS, which means
+something is running on the loop without yielding, and captures the loop
+thread's stack while it is still blocked, together with the request the
+running task is serving. When the loop recovers the block is counted per
+route template, logged with its stack and kept for /debug/loop.
+
+With LOOP_BLOCK_STRICT_MS set (for tests), a request that blocked the loop for
+longer raises EventLoopBlockedError once it completes, so the test fails.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Deque, List, Optional
+from weakref import WeakKeyDictionary
+
+from config import settings
+from metrics import LOOP_BLOCKS, LOOP_BLOCK_DURATION, LOOP_LAG, UNMATCHED_ROUTE
+
+logger = logging.getLogger("corp_ai.loop")
+
+# Blocks outside any request (startup work, background tasks)
+BACKGROUND_ROUTE = "background"
+
+
+class EventLoopBlockedError(RuntimeError):
+    """Raised in strict mode when a request blocked the event loop for too long."""
+
+
+@dataclass
+class BlockEvent:
+    route: str
+    method: Optional[str]
+    path: Optional[str]
+    task: Optional[str]
+    started_at: float
+    duration_ms: float
+    stack: List[str] = field(default_factory=list)
+    task_id: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        event = asdict(self)
+        event.pop("task_id")
+        return event
+
+
+class LoopLagMonitor:
+    """Heartbeat on the loop plus a watchdog thread that catches it blocked."""
+
+    def __init__(self, interval_ms: float = 100, threshold_ms: float = 100, strict_ms: float = 0,
+                 max_events: int = 100, stack_depth: int = 30):
+        self.interval = interval_ms / 1000
+        # Strict mode needs blocks at least that short captured
+        self.threshold = (min(threshold_ms, strict_ms) if strict_ms else threshold_ms) / 1000
+        self.strict = strict_ms / 1000
+        self.stack_depth = stack_depth
+        self.events: Deque[BlockEvent] = deque(maxlen=max_events)
+        self.blocks = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._requests: "WeakKeyDictionary[asyncio.Task, dict]" = WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._beat = 0.0
+        self._pending: Optional[BlockEvent] = None
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat is not None and not self._heartbeat.done()
+
+    async def start(self) -> None:
+        """Start monitoring the running loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat(), name="loop-lag-heartbeat")
+        self._watchdog = threading.Thread(target=self._run_watchdog, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    # Request attribution
+
+    def track_request(self, task: Optional[asyncio.Task], scope: dict) -> None:
+        if task is not None:
+            self._requests[task] = scope
+
+    def events_for(self, task: asyncio.Task) -> List[BlockEvent]:
+        """Blocks caught while `task` was running, including one still being measured."""
+        with self._lock:
+            events = [e for e in self.events if e.task_id == id(task)]
+            if self._pending is not None and self._pending.task_id == id(task):
+                events.append(self._pending)
+        return events
+
+    def check_request(self, task: asyncio.Task) -> None:
+        """Strict mode: raise if `task` blocked the loop for longer than LOOP_BLOCK_STRICT_MS."""
+        if not self.strict:
+            return
+        worst = max(self.events_for(task), key=lambda e: e.duration_ms, default=None)
+        if worst is not None and worst.duration_ms >= self.strict * 1000:
+            raise EventLoopBlockedError(
+                f"{worst.method} {worst.route} blocked the event loop for {worst.duration_ms:.0f}ms "
+                f"(limit {self.strict * 1000:.0f}ms) at:\n{''.join(worst.stack)}"
+            )
+
+    # Heartbeat (on the loop)
+
+    async def _run_heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - before - self.interval, 0.0)
+            self._beat = time.monotonic()
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+            if lag >= self.threshold:
+                self._finish_block(lag)
+
+    def _finish_block(self, lag: float) -> None:
+        with self._lock:
+            event, self._pending = self._pending, None
+        if event is None:
+            # Too short for the watchdog to catch in the act
+            event = BlockEvent(BACKGROUND_ROUTE, None, None, None, time.time() - lag, 0.0)
+        event.duration_ms = lag * 1000
+        with self._lock:
+            self.events.append(event)
+            self.blocks += 1
+        LOOP_BLOCKS.labels(event.route).inc()
+        LOOP_BLOCK_DURATION.labels(event.route).observe(lag)
+        logger.warning(
+            f"Event loop blocked for {event.duration_ms:.0f}ms"
+            + (f" by {event.method} {event.route}" if event.method else "")
+            + (f" at:\n{''.join(event.stack)}" if event.stack else ""),
+            extra={"route": event.route, "blocked_ms": round(event.duration_ms, 1)}
+        )
+
+    # Watchdog (own thread)
+
+    def _run_watchdog(self) -> None:
+        check_every = max(self.threshold / 4, 0.005)
+        while not self._stop.wait(check_every):
+            stalled = time.monotonic() - self._beat - self.interval
+            if stalled < self.threshold:
+                continue
+            with self._lock:
+                if self._pending is None:
+                    self._pending = self._capture(stalled)
+                else:
+                    self._pending.duration_ms = stalled * 1000
+
+    def _capture(self, stalled: float) -> BlockEvent:
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.format_stack(frame)[-self.stack_depth:] if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        scope = self._requests.get(task) if task is not None else None
+        if scope is None:
+            route, method, path = BACKGROUND_ROUTE, None, None
+        else:
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method, path = scope.get("method"), scope.get("path")
+        return BlockEvent(
+            route=route,
+            method=method,
+            path=path,
+            task=task.get_name() if task is not None else None,
+            started_at=time.time() - stalled,
+            duration_ms=stalled * 1000,
+            stack=stack,
+            task_id=id(task) if task is not None else None,
+        )
+
+    def stats(self, events: int = 20) -> dict:
+        with self._lock:
+            recent = [e.to_dict() for e in list(self.events)[-events:]]
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "strict_ms": self.strict * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "blocks": self.blocks,
+            "recent": recent,
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval_ms=settings.LOOP_LAG_INTERVAL_MS,
+    threshold_ms=settings.LOOP_BLOCK_THRESHOLD_MS,
+    strict_ms=settings.LOOP_BLOCK_STRICT_MS,
+)
+
+
+class LoopMonitorMiddleware:
+    """
+    Pure ASGI middleware recording which request each task serves, so blocks
+    can be attributed to a route; in strict mode it raises for requests that
+    blocked the loop. Added outermost so the error reaches the test client.
+    """
+
+    def __init__(self, app, monitor: LoopLagMonitor = loop_monitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        task = asyncio.current_task()
+        self.monitor.track_request(task, scope)
+        await self.app(scope, receive, send)
+        self.monitor.check_request(task)
+
+
+def setup_loop_monitor(app) -> None:
+    if settings.LOOP_MONITOR_ENABLED:
+        app.add_middleware(LoopMonitorMiddleware)
@@ -0,0 +1,363 @@
+"""
+Prometheus metrics - HTTP, database pool, LLM, tool and cache instrumentation
+served at /metrics.
+
+Every label comes from a closed set (route templates rather than raw paths,
+status classes, tool function names, LLM model names, cache names), so series
+counts stay bounded however the API is called. Pool and cache figures are read
+from their existing stats at scrape time rather than updated per request.
+
+With PROMETHEUS_MULTIPROC_DIR set (multi-worker servers), counters and
+histograms are aggregated across workers; pool and cache gauges describe the
+worker that answered the scrape.
+"""
+import functools
+import inspect
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from config import settings
+from db.instrumentation import pool_stats
+import server_timing
+from tracing import tracer
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    )
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    Counter = Gauge = Histogram = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("corp_ai.metrics")
+
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+UNMATCHED_ROUTE = "unmatched"
+
+# Latency buckets: HTTP spans sub-millisecond cache hits to multi-second LLM calls
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500)
+
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus_client isn't installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+
+def _metric(kind, *args, **kwargs):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    return kind(*args, **kwargs)
+
+
+# HTTP
+HTTP_REQUESTS = _metric(
+    Counter, "corp_ai_http_requests_total", "HTTP requests by route template and status class",
+    ["method", "route", "status"]
+)
+HTTP_DURATION = _metric(
+    Histogram, "corp_ai_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"], buckets=HTTP_BUCKETS
+)
+HTTP_IN_PROGRESS = _metric(
+    Gauge, "corp_ai_http_requests_in_progress", "HTTP requests currently being served",
+    ["method"], multiprocess_mode="livesum"
+)
+
+# LLM
+LLM_QUEUE_DEPTH = _metric(
+    Gauge, "corp_ai_llm_queue_depth", "LLM generations waiting or running", ["model"], multiprocess_mode="livesum"
+)
+LLM_REQUESTS = _metric(Counter, "corp_ai_llm_requests_total", "LLM generations by outcome", ["model", "outcome"])
+LLM_TOKENS = _metric(Counter, "corp_ai_llm_tokens_total", "LLM tokens in (prompt) and out (completion)", ["model", "direction"])
+LLM_TTFT = _metric(
+    Histogram, "corp_ai_llm_time_to_first_token_seconds", "Time from submitting a prompt to its first output token",
+    ["model"], buckets=LLM_BUCKETS
+)
+LLM_DURATION = _metric(
+    Histogram, "corp_ai_llm_generation_seconds", "Total LLM generation time", ["model"], buckets=LLM_BUCKETS
+)
+LLM_TOKENS_PER_SECOND = _metric(
+    Histogram, "corp_ai_llm_tokens_per_second", "LLM decode throughput per generation",
+    ["model"], buckets=TOKENS_PER_SECOND_BUCKETS
+)
+
+# Event loop (loop_monitor.py)
+LOOP_LAG = _metric(
+    Histogram, "corp_ai_event_loop_lag_seconds", "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LOOP_BLOCKS = _metric(
+    Counter, "corp_ai_event_loop_blocks_total", "Times the event loop was blocked past the threshold, by route", ["route"]
+)
+LOOP_BLOCK_DURATION = _metric(
+    Histogram, "corp_ai_event_loop_block_seconds", "How long the event loop stayed blocked, by route",
+    ["route"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+# Worker processes (workers.py); one series per process under gunicorn
+WORKER_STARTUP = _metric(
+    Gauge, "corp_ai_worker_startup_seconds", "Time from process start (or fork) to ready to serve",
+    multiprocess_mode="all"
+)
+WORKER_MEMORY = _metric(
+    Gauge, "corp_ai_worker_memory_bytes", "Worker memory when it became ready: rss, pss, shared and private",
+    ["kind"], multiprocess_mode="all"
+)
+
+# Tools
+TOOL_DURATION = _metric(
+    Histogram, "corp_ai_tool_duration_seconds", "Tool function execution time", ["tool"], buckets=HTTP_BUCKETS
+)
+TOOL_ERRORS = _metric(Counter, "corp_ai_tool_errors_total", "Tool functions that raised", ["tool"])
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency and status per route template
+    (taken from the matched route, so /tools/{tool_id} is one series however
+    many ids are requested) and requests in flight per method.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            # The router records the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_DURATION.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, f"{status_code // 100}xx").inc()
+
+
+# Generations running now (read by the graceful shutdown); set add/discard are atomic, so threads can use it
+_in_flight_calls: set = set()
+
+
+def in_flight_generations() -> int:
+    return len(_in_flight_calls)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for models without a tokenizer at hand."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class LLMCall:
+    """
+    Context manager around one LLM generation:
+
+        with llm_call("social_media", prompt) as call:
+            text = await chain.arun(...)
+            call.completed(text)
+
+    Streaming callers call `first_token()` when the first chunk arrives; otherwise
+    time to first token is the whole generation. Works in sync and async code,
+    records an "llm.generate" span when the request is traced and adds the
+    time to the request's Server-Timing (split into prefill and decode when
+    the first token is known).
+    """
+
+    def __init__(self, model: str, prompt: str = "", prompt_tokens: Optional[int] = None,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        self.model = model
+        self.count_tokens = count_tokens
+        self.prompt_tokens = prompt_tokens if prompt_tokens is not None else count_tokens(prompt)
+        self.completion_tokens: Optional[int] = None
+        self.started = 0.0
+        self.first_token_at: Optional[float] = None
+        self.span = None
+
+    def __enter__(self) -> "LLMCall":
+        self.span = tracer.span("llm.generate", attributes={"llm.model": self.model, "llm.prompt_tokens": self.prompt_tokens})
+        self.span.__enter__()
+        self.started = time.perf_counter()
+        LLM_QUEUE_DEPTH.labels(self.model).inc()
+        _in_flight_calls.add(self)
+        return self
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def completed(self, text: str = "", completion_tokens: Optional[int] = None) -> None:
+        self.completion_tokens = completion_tokens if completion_tokens is not None else self.count_tokens(text)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        finished = time.perf_counter()
+        LLM_QUEUE_DEPTH.labels(self.model).dec()
+        _in_flight_calls.discard(self)
+        server_timing.record("llm", finished - self.started)
+        if self.first_token_at is not None:
+            prefill = self.first_token_at - self.started
+            server_timing.record("llm_prefill", prefill)
+            server_timing.record("llm_decode", finished - self.first_token_at)
+            self.span.set_attribute("llm.time_to_first_token_ms", round(prefill * 1000, 3))
+        if self.completion_tokens is not None:
+            self.span.set_attribute("llm.completion_tokens", self.completion_tokens)
+        self.span.__exit__(exc_type, exc, tb)
+        if exc_type is not None or self.completion_tokens is None:
+            LLM_REQUESTS.labels(self.model, "error").inc()
+            return
+        first_token_at = self.first_token_at or finished
+        LLM_REQUESTS.labels(self.model, "ok").inc()
+        LLM_TOKENS.labels(self.model, "in").inc(self.prompt_tokens)
+        LLM_TOKENS.labels(self.model, "out").inc(self.completion_tokens)
+        LLM_TTFT.labels(self.model).observe(first_token_at - self.started)
+        LLM_DURATION.labels(self.model).observe(finished - self.started)
+        # Without streaming the decode phase can't be separated, so use the whole call
+        decode_time = finished - first_token_at if self.first_token_at else finished - self.started
+        if decode_time > 0 and self.completion_tokens:
+            LLM_TOKENS_PER_SECOND.labels(self.model).observe(self.completion_tokens / decode_time)
+
+
+llm_call = LLMCall
+
+
+def timed_tool(func):
+    """
+    Record a tool function's execution time (and failures) under its (qualified)
+    name, as a "tool <name>" span too when the request is traced.
+    """
+    name = func.__qualname__
+    span_name = f"tool {name}"
+    duration = TOOL_DURATION.labels(name)
+    errors = TOOL_ERRORS.labels(name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - start)
+    return wrapper
+
+
+# Caches report through their stats(): {"entries", "hits", "misses", ...}
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache) -> None:
+    _caches[name] = cache
+
+
+class StatsCollector:
+    """Turns pool and cache stats into metrics at scrape time."""
+
+    def collect(self):
+        pools = pool_stats()
+        checked_out = GaugeMetricFamily("corp_ai_db_pool_checked_out", "Connections checked out", labels=["pool"])
+        size = GaugeMetricFamily("corp_ai_db_pool_size", "Configured pool size", labels=["pool"])
+        overflow = GaugeMetricFamily("corp_ai_db_pool_overflow", "Connections open beyond the pool size", labels=["pool"])
+        checkouts = CounterMetricFamily("corp_ai_db_pool_checkouts", "Connection checkouts", labels=["pool"])
+        timeouts = CounterMetricFamily("corp_ai_db_pool_timeouts", "Checkouts that timed out", labels=["pool"])
+        invalidations = CounterMetricFamily("corp_ai_db_pool_invalidations", "Connections invalidated", labels=["pool"])
+        wait_max = GaugeMetricFamily("corp_ai_db_pool_checkout_wait_max_seconds", "Longest checkout wait", labels=["pool"])
+        for name, stats in pools.items():
+            checkouts.add_metric([name], stats["checkouts"])
+            timeouts.add_metric([name], stats["timeouts"])
+            invalidations.add_metric([name], stats["invalidations"])
+            wait_max.add_metric([name], stats["checkout_wait_max_ms"] / 1000)
+            if "size" in stats:
+                checked_out.add_metric([name], stats["checked_out"])
+                size.add_metric([name], stats["size"])
+                overflow.add_metric([name], stats["overflow"])
+        yield from (checked_out, size, overflow, checkouts, timeouts, invalidations, wait_max)
+
+        hits = CounterMetricFamily("corp_ai_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("corp_ai_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("corp_ai_cache_hit_ratio", "Cache hits / lookups since start", labels=["cache"])
+        entries = GaugeMetricFamily("corp_ai_cache_entries", "Entries currently cached", labels=["cache"])
+        for name, cache in _caches.items():
+            stats = cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hits"] / lookups if lookups else 0.0)
+            entries.add_metric([name], stats["entries"])
+        yield from (hits, misses, ratio, entries)
+
+
+_stats_collector = StatsCollector()
+if PROMETHEUS_AVAILABLE:
+    REGISTRY.register(_stats_collector)
+
+
+def render_metrics() -> bytes:
+    """The current metrics in Prometheus text format."""
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed\n"
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_stats_collector)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def setup_metrics(app) -> None:
+    """Add the HTTP middleware to the app (served at /metrics by app.py)."""
+    if not settings.METRICS_ENABLED:
+        return
+    if not PROMETHEUS_AVAILABLE:
+        logger.warning("METRICS_ENABLED but prometheus_client is not installed; metrics are disabled")
+        return
+    app.add_middleware(MetricsMiddleware)
@@ -1,60 +1,38 @@
-from fastapi import FastAPI, Request, Response, status
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.exceptions import RequestValidationError
-from starlette.exceptions import HTTPException as StarletteHTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, status
 
-# Try to import rate limiting, but make it optional
-try:
-    from fastapi_limiter import FastAPILimiter
-    from fastapi_limiter.depends import RateLimiter
-    RATE_LIMITING_AVAILABLE = True
-except ImportError:
-    RATE_LIMITING_AVAILABLE = False
-    print("WARNING: fastapi_limiter not available. Rate limiting will be disabled.")
-    
-    # Create dummy classes for when rate limiting is not available
-    class FastAPILimiter:
-        @staticmethod
-        async def init(*args, **kwargs):
-            pass
-            
-    class RateLimiter:
-        def __init__(self, *args, **kwargs):
-            pass
-            
-        async def __call__(self, *args, **kwargs):
-            pass
-# Try to import Redis, but make it optional
-try:
-    import redis.asyncio as redis
-    REDIS_AVAILABLE = True
-except ImportError:
-    REDIS_AVAILABLE = False
-    print("WARNING: redis.asyncio not available. Redis features will be disabled.")
-    
-    # Create dummy class for when Redis is not available
-    class redis:
-        @staticmethod
-        def from_url(*args, **kwargs):
-            return None
 import time
 import logging
 import json
-import traceback
+import os
+import re
 from typing import Callable, Dict, Any, Optional
 from config import settings
-import uuid
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+from auth.tokens import verify_access_token
+from jose import JWTError
+from logging_config import request_id_var
+import server_timing
+from rate_limiter import (
+    ANONYMOUS_TIER, DEFAULT_GROUP, RateLimit, rate_limit_policy, rate_limiter, retry_after_header
 )
+
 logger = logging.getLogger("corp_ai")
+access_logger = logging.getLogger("corp_ai.access")
+
+# Incoming X-Request-ID values are reused (e.g. from a proxy) when they look like an id
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware giving each request one id and one access log line.
 
-class RequestLoggingMiddleware:
-    """Middleware for logging requests and responses"""
+    The id (the caller's X-Request-ID if valid, otherwise a new one) is kept in
+    request.state.request_id and in a contextvar, so every log record written
+    while the request is served carries it. Responses get X-Request-ID and
+    X-Process-Time (seconds until the response started) and, when enabled,
+    a Server-Timing breakdown of where that time went (see server_timing),
+    which the access log line carries too. Unhandled exceptions are logged
+    once and answered with a 500 that includes the request id.
+    """
     
     def __init__(self, app):
         self.app = app
@@ -62,230 +40,127 @@ class RequestLoggingMiddleware:
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             return await self.app(scope, receive, send)
-            
-        # Create a request object
-        request = Request(scope)
-        request_id = str(uuid.uuid4())
         
-        # Store request_id in request state
-        request.state.request_id = request_id
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = os.urandom(16).hex()  # same shape as uuid4().hex, a fifth of the cost
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        timings, timings_token = server_timing.start_request() if settings.SERVER_TIMING_ENABLED else (None, None)
+        request_id_header = request_id.encode("latin-1")
+        status_code = None
+        start = time.perf_counter()
         
-        # Log request
-        path = scope.get("path", "")
-        method = scope.get("method", "")
-        logger.info(f"Request {request_id} started: {method} {path}")
-        
-        start_time = time.time()
-        
-        # Create a modified send function to capture response status
         async def send_wrapper(message):
+            nonlocal status_code
             if message["type"] == "http.response.start":
-                # Log response
-                process_time = time.time() - start_time
                 status_code = message["status"]
-                logger.info(
-                    f"Request {request_id} completed: {method} {path} "
-                    f"- Status: {status_code} - Time: {process_time:.4f}s"
-                )
-                
-                # Add custom headers
-                headers = message.get("headers", [])
-                headers.append((b"X-Process-Time", str(process_time).encode()))
-                headers.append((b"X-Request-ID", request_id.encode()))
-                message["headers"] = headers
-                
+                headers = list(message.get("headers", ()))
+                elapsed = time.perf_counter() - start
+                headers.append((b"x-request-id", request_id_header))
+                headers.append((b"x-process-time", f"{elapsed:.6f}".encode()))
+                if timings is not None:
+                    headers.append((b"server-timing", timings.header(elapsed).encode("latin-1")))
+                message = {**message, "headers": headers}
             await send(message)
         
         try:
             await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(
-                f"Request {request_id} failed: {method} {path} "
-                f"- Error: {str(e)} - Time: {process_time:.4f}s"
-            )
-            logger.error(traceback.format_exc())
-            
-            # Send error response
-            await send({
-                "type": "http.response.start",
-                "status": 500,
-                "headers": [
-                    (b"content-type", b"application/json"),
-                    (b"X-Request-ID", request_id.encode())
-                ]
-            })
-            
-            body = json.dumps({
-                "detail": "Internal server error",
-                "request_id": request_id
-            }).encode("utf-8")
-            
-            await send({
-                "type": "http.response.body",
-                "body": body
-            })
-
-class ErrorHandlerMiddleware:
-    """Middleware for handling and formatting errors"""
-    
-    def __init__(self, app):
-        self.app = app
-    
-    async def __call__(self, scope, receive, send):
-        if scope["type"] != "http":
-            return await self.app(scope, receive, send)
-        
-        request_id = str(uuid.uuid4())
-        
-        # Create a modified receive function to store the request_id
-        async def receive_wrapper():
-            message = await receive()
-            if message["type"] == "http.request":
-                # Store request_id in request state
-                # This is a bit of a hack since we don't have direct access to request.state
-                scope["request_id"] = request_id
-            return message
-        
-        # Create a modified send function to handle errors
-        async def send_wrapper(message):
-            if message["type"] == "http.response.start":
-                # Add request ID header
-                headers = message.get("headers", [])
-                headers.append((b"X-Request-ID", request_id.encode()))
-                message["headers"] = headers
-            await send(message)
-        
-        try:
-            await self.app(scope, receive_wrapper, send_wrapper)
-        except Exception as e:
-            # Log the error
-            logger.error(f"Unhandled exception in request {request_id}: {str(e)}")
-            logger.error(traceback.format_exc())
-            
-            # Determine status code and error details
-            status_code = 500
-            error_detail = "Internal server error"
-            error_content = {"detail": error_detail, "request_id": request_id}
-            
-            if isinstance(e, StarletteHTTPException):
-                status_code = e.status_code
-                error_detail = str(e.detail)
-                error_content = {"detail": error_detail, "request_id": request_id}
-            elif isinstance(e, RequestValidationError):
-                status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
-                error_content = {
-                    "detail": "Validation error",
-                    "errors": [err for err in e.errors()],
-                    "request_id": request_id
+            access_logger.exception(f"Unhandled exception: {str(e)}")
+            if status_code is None:
+                # Nothing was sent yet, so the client can still get a proper error
+                await send_wrapper({
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [(b"content-type", b"application/json")]
+                })
+                await send({
+                    "type": "http.response.body",
+                    "body": json.dumps({"detail": "Internal server error", "request_id": request_id}).encode("utf-8")
+                })
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            route = getattr(scope.get("route"), "path", None)
+            access_logger.info(
+                f"{scope['method']} {scope['path']} {status_code} {duration_ms:.1f}ms",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 3),
+                    "client": scope["client"][0] if scope.get("client") else None,
+                    "timings": timings.to_dict() if timings is not None else None,
                 }
-            
-            # Send error response
-            await send({
-                "type": "http.response.start",
-                "status": status_code,
-                "headers": [
-                    (b"content-type", b"application/json"),
-                    (b"X-Request-ID", request_id.encode())
-                ]
-            })
-            
-            body = json.dumps(error_content).encode("utf-8")
-            
-            await send({
-                "type": "http.response.body",
-                "body": body
-            })
+            )
+            request_id_var.reset(token)
+            if timings_token is not None:
+                server_timing.end_request(timings_token)
 
-async def setup_middlewares(app: FastAPI) -> None:
-    """Set up all middlewares for the application"""
-    
-    # Add CORS middleware
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],  # In production, replace with specific origins
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-    
-    # Add custom error handler middleware
-    app.middleware("http")(ErrorHandlerMiddleware())
+def setup_middlewares(app: FastAPI) -> None:
+    """
+    Add the request context middleware. Call it after the other middlewares
+    have been added so its timing covers them (only the loop monitor's
+    bookkeeping sits outside it).
+    """
+    app.add_middleware(RequestContextMiddleware)
     
-    # Add request logging middleware
-    app.middleware("http")(RequestLoggingMiddleware())
-    
-    # Set up rate limiting if enabled and available
-    if RATE_LIMITING_AVAILABLE and REDIS_AVAILABLE and settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_REDIS_URL:
-        try:
-            redis_instance = redis.from_url(settings.RATE_LIMIT_REDIS_URL)
-            await FastAPILimiter.init(redis_instance)
-            logger.info("Rate limiting initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize rate limiting: {str(e)}")
-            logger.error(traceback.format_exc())
+    # Rate limiting is applied per route group by the rate_limit dependency
+    if settings.RATE_LIMIT_ENABLED:
+        logger.info(f"Rate limiting enabled ({type(rate_limiter).__name__})")
     else:
-        if settings.RATE_LIMIT_ENABLED:
-            if not RATE_LIMITING_AVAILABLE:
-                logger.warning("Rate limiting is enabled but fastapi_limiter is not available")
-            elif not REDIS_AVAILABLE:
-                logger.warning("Rate limiting is enabled but redis.asyncio is not available")
-            else:
-                logger.warning("Rate limiting is enabled but not properly configured")
-        else:
-            logger.info("Rate limiting is disabled")
+        logger.info("Rate limiting is disabled")
 
 
 # Rate limiter dependency for routes
 def rate_limit(
-    times: int = settings.RATE_LIMIT_DEFAULT_LIMIT,
-    seconds: int = settings.RATE_LIMIT_DEFAULT_PERIOD
+    times: Optional[int] = None,
+    seconds: Optional[int] = None,
+    group: str = DEFAULT_GROUP
 ):
-    """Rate limiting dependency that can be applied to routes"""
-    if RATE_LIMITING_AVAILABLE and settings.RATE_LIMIT_ENABLED:
-        return RateLimiter(times=times, seconds=seconds)
-    
-    # If rate limiting is disabled or not available, return a no-op dependency
-    async def skip_limiter():
-        pass
-    
-    return skip_limiter
+    """
+    Rate limiting dependency that can be applied to routes or routers.
 
-# Custom exception handlers
-def register_exception_handlers(app: FastAPI) -> None:
-    """Register custom exception handlers"""
-    
-    @app.exception_handler(StarletteHTTPException)
-    async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-        request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
-        logger.warning(f"HTTP exception in request {request_id}: {exc.status_code} - {exc.detail}")
-        return JSONResponse(
-            status_code=exc.status_code,
-            content={"detail": exc.detail, "request_id": request_id}
-        )
-    
-    @app.exception_handler(RequestValidationError)
-    async def validation_exception_handler(request: Request, exc: RequestValidationError):
-        request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
-        logger.warning(f"Validation error in request {request_id}: {exc.errors()}")
-        return JSONResponse(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            content={
-                "detail": "Validation error",
-                "errors": exc.errors(),
-                "request_id": request_id
-            }
-        )
-    
-    @app.exception_handler(Exception)
-    async def general_exception_handler(request: Request, exc: Exception):
-        request_id = getattr(request.state, "request_id", str(uuid.uuid4()))
-        logger.error(f"Unhandled exception in request {request_id}: {str(exc)}")
-        logger.error(traceback.format_exc())
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "detail": "Internal server error",
-                "request_id": request_id
-            }
-        )
+    Requests are counted per user (per client IP when anonymous) within the
+    route group. Without explicit times/seconds the limit comes from
+    RATE_LIMIT_RULES for the group and the caller's subscription tier.
+    """
+    fixed = RateLimit(times, seconds) if times and seconds else None
+
+    # Reads the bearer token itself rather than depending on the OAuth2 scheme:
+    # each sub-dependency FastAPI resolves costs more than the limit check
+    async def limiter(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        identity = None
+        tier = ANONYMOUS_TIER
+        authorization = request.headers.get("authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            token = authorization[7:]
+            try:
+                claims = verify_access_token(token)
+                identity = claims.get("sub")
+                tier = claims.get("plan") or "basic"
+            except JWTError:
+                pass  # The route's own auth dependency rejects the token
+        if identity is None:
+            identity = f"ip:{request.client.host if request.client else 'unknown'}"
+            tier = ANONYMOUS_TIER
+
+        limit = fixed or rate_limit_policy.limit_for(group, tier)
+        wait = await rate_limiter.hit(f"{group}:{identity}", limit)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": retry_after_header(wait), "X-RateLimit-Limit": str(limit.times)}
+            )
+
+    return limiter
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db.base_class import Base
 import uuid
@@ -16,3 +16,8 @@ class ToolHistory(Base):
     
     # Relationship with User model
     user = relationship("User", back_populates="tool_history")
+    
+    # Serves the keyset-paginated history listing: newest first per user, id breaks timestamp ties
+    __table_args__ = (
+        Index("ix_tool_history_user_id_timestamp", "user_id", timestamp.desc(), id.desc()),
+    )
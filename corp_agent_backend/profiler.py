@@ -0,0 +1,149 @@
+"""
+Sampling profiler for live workers - backs the admin /debug/profile endpoint.
+
+A background thread snapshots every thread's stack (sys._current_frames) at a
+fixed rate for the requested duration and aggregates them into collapsed
+stacks ("thread;outer;...;inner count", the input format of flamegraph.pl and
+speedscope) plus a top-N table of functions by self and total samples.
+
+The sampler thread only exists while a profile is being taken, so there is no
+overhead when idle; only one profile runs per worker at a time.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Leaf frames that mean a thread is parked rather than doing work
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+@dataclass
+class Profile:
+    duration: float
+    interval: float
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "frame;frame;... count" line each, hottest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n: int = 25) -> List[Dict]:
+        """The n functions with the most samples of their own (on top of the stack)."""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread name
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        stack_samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": frame,
+                "self": count,
+                "self_pct": round(count / stack_samples * 100, 2),
+                "total": total_counts[frame],
+                "total_pct": round(total_counts[frame] / stack_samples * 100, 2),
+            }
+            for frame, count in self_counts.most_common(n)
+        ]
+
+
+class SamplingProfiler:
+    """Takes one profile at a time from a short-lived sampler thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def start(self, seconds: float, hz: float, include_idle: bool = False) -> Tuple[threading.Thread, Profile]:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already being taken in this worker")
+        self._stop.clear()
+        profile = Profile(duration=seconds, interval=1.0 / hz)
+        thread = threading.Thread(
+            target=self._run, args=(profile, include_idle), name="sampling-profiler", daemon=True
+        )
+        thread.start()
+        return thread, profile
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def profile(self, seconds: float, hz: float, include_idle: bool = False) -> Profile:
+        """Sample for `seconds`, blocking the calling thread."""
+        thread, profile = self.start(seconds, hz, include_idle)
+        thread.join()
+        return profile
+
+    def _run(self, profile: Profile, include_idle: bool) -> None:
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + profile.duration
+        started = time.monotonic()
+        names: Dict[int, str] = {}
+        try:
+            while not self._stop.is_set():
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    stack = self._stack(frame, include_idle)
+                    if stack is None:
+                        continue
+                    name = names.get(ident)
+                    if name is None:
+                        name = names[ident] = self._thread_name(ident)
+                    profile.stacks[f"{name};{stack}"] += 1
+                profile.samples += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(profile.interval, remaining))
+        finally:
+            profile.duration = time.monotonic() - started
+            self._lock.release()
+
+    @staticmethod
+    def _stack(frame, include_idle: bool) -> Optional[str]:
+        code = frame.f_code
+        if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+            return None
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+    @staticmethod
+    def _thread_name(ident: int) -> str:
+        for thread in threading.enumerate():
+            if thread.ident == ident:
+                return thread.name.replace(";", "_").replace(" ", "_")
+        return f"thread-{ident}"
+
+
+profiler = SamplingProfiler()
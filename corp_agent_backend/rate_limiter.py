@@ -0,0 +1,198 @@
+"""
+Built-in request rate limiter used by `middleware.rate_limit`.
+
+Limits are "times per seconds" and are configured per route group and
+subscription tier (see RATE_LIMIT_RULES). Two backends:
+
+* memory - GCRA (generic cell rate algorithm): one float per client, the
+  "theoretical arrival time" of its next request, in a bounded dict. Allows a
+  burst of up to `times` requests, then one every `seconds / times`.
+* redis  - sliding-window counter shared by every worker: two INCR'd
+  fixed-window keys per client, weighted by how far into the current window we
+  are. Falls back to the memory backend if Redis stops answering.
+"""
+import logging
+import math
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from config import settings
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger("corp_ai.rate_limit")
+
+DEFAULT_GROUP = "default"
+ANONYMOUS_TIER = "anonymous"
+
+
+class RateLimit(NamedTuple):
+    times: int
+    seconds: float
+
+
+def parse_rules(spec: str) -> Dict[Tuple[str, str], RateLimit]:
+    """
+    Parse "group:tier=times/seconds" entries separated by commas, e.g.
+    "chat:basic=20/60,chat:*=60/60". "*" matches any group or tier.
+    """
+    rules = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            scope, limit = entry.split("=")
+            group, tier = scope.split(":")
+            times, seconds = limit.split("/")
+            rules[(group.strip(), tier.strip())] = RateLimit(int(times), float(seconds))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit rule '{entry}', expected group:tier=times/seconds")
+    return rules
+
+
+class RateLimitPolicy:
+    """Resolves the limit for a (group, tier), most specific rule first; results are memoized."""
+
+    def __init__(self, rules: Dict[Tuple[str, str], RateLimit], default: RateLimit):
+        self.rules = rules
+        self.default = default
+        self._resolved: Dict[Tuple[str, str], RateLimit] = {}
+
+    def limit_for(self, group: str, tier: str) -> RateLimit:
+        key = (group, tier)
+        limit = self._resolved.get(key)
+        if limit is None:
+            for candidate in ((group, tier), (group, "*"), (DEFAULT_GROUP, tier), ("*", tier), (DEFAULT_GROUP, "*")):
+                if candidate in self.rules:
+                    limit = self.rules[candidate]
+                    break
+            else:
+                limit = self.default
+            self._resolved[key] = limit
+        return limit
+
+
+class MemoryRateLimiter:
+    """GCRA over a bounded dict of client key -> theoretical arrival time (monotonic seconds)."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tat: Dict[str, float] = {}
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def check(self, key: str, limit: RateLimit, now: Optional[float] = None) -> float:
+        """Record a request; returns 0 if allowed, otherwise seconds until it would be."""
+        if now is None:
+            now = time.monotonic()
+        emission = limit.seconds / limit.times
+        tat = self._tat.pop(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + emission
+        if new_tat - now > limit.seconds:
+            self._tat[key] = tat
+            return new_tat - now - limit.seconds
+        # Re-inserting keeps the dict in least-recently-used order for eviction
+        self._tat[key] = new_tat
+        if len(self._tat) > self.max_keys:
+            self._evict(now)
+        return 0.0
+
+    async def hit(self, key: str, limit: RateLimit) -> float:
+        return self.check(key, limit)
+
+    def _evict(self, now: float) -> None:
+        # Clients whose arrival time has passed are fully replenished; forgetting them changes nothing
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        # Still full of active clients: drop the least recently seen tenth
+        overflow = len(self._tat) - self.max_keys
+        if overflow > 0:
+            for key in list(self._tat)[:max(overflow, self.max_keys // 10)]:
+                del self._tat[key]
+                self.evicted += 1
+
+    def clear(self) -> None:
+        self._tat.clear()
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisRateLimiter:
+    """Sliding-window counter in Redis; one round trip (pipelined INCR, EXPIRE, GET) per request."""
+
+    def __init__(self, client, prefix: str = "corp_ai:rate", fallback: Optional[MemoryRateLimiter] = None):
+        self.client = client
+        self.prefix = prefix
+        self.fallback = fallback or MemoryRateLimiter()
+        self._failing = False
+
+    async def hit(self, key: str, limit: RateLimit) -> float:
+        now = time.time()
+        window = int(now // limit.seconds)
+        elapsed = now - window * limit.seconds
+        current_key = f"{self.prefix}:{key}:{int(limit.seconds)}:{window}"
+        previous_key = f"{self.prefix}:{key}:{int(limit.seconds)}:{window - 1}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incr(current_key)
+            pipe.expire(current_key, int(limit.seconds * 2) + 1)
+            pipe.get(previous_key)
+            current, _, previous = await pipe.execute()
+        except Exception as e:
+            if not self._failing:
+                logger.warning(f"Redis rate limiting unavailable, using the in-process limiter: {str(e)}")
+                self._failing = True
+            return self.fallback.check(key, limit)
+        if self._failing:
+            logger.info("Redis rate limiting recovered")
+            self._failing = False
+
+        previous = int(previous or 0)
+        weight = 1 - elapsed / limit.seconds
+        if previous * weight + current <= limit.times:
+            return 0.0
+        # Wait until the previous window's share has decayed enough, or for the next window
+        if previous and current <= limit.times:
+            wait = limit.seconds * (1 - (limit.times - current) / previous) - elapsed
+        else:
+            wait = limit.seconds - elapsed
+        return max(wait, 0.001)
+
+    def clear(self) -> None:
+        self.fallback.clear()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def build_rate_limiter():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            url = settings.RATE_LIMIT_REDIS_URL or (
+                f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+            )
+            return RedisRateLimiter(
+                redis.from_url(url, socket_timeout=0.05),
+                fallback=MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS),
+            )
+        logger.warning("RATE_LIMIT_BACKEND is redis but redis.asyncio is not available; using the in-process limiter")
+    return MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+
+def retry_after_header(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
+
+
+rate_limit_policy = RateLimitPolicy(
+    parse_rules(settings.RATE_LIMIT_RULES),
+    RateLimit(settings.RATE_LIMIT_DEFAULT_LIMIT, settings.RATE_LIMIT_DEFAULT_PERIOD),
+)
+rate_limiter = build_rate_limiter()
@@ -0,0 +1,188 @@
+"""
+Reference data - the tools catalog, subscription plans and roles, loaded once
+and served as pre-serialized bytes.
+
+The catalog is validated once when routers/tools.py loads it. Plans and roles
+are read from the database whenever the authorization table reloads (at
+startup, every AUTHZ_RELOAD_INTERVAL_SECONDS, and on POST
+/admin/authorization/reload after an admin changes them), so both always
+agree. Everything is indexed (tools by id, category and required plan; plans
+and roles by id and name), and each response body is serialized once per load.
+Large bodies are also compressed once per load, at the highest settings, for
+each encoding CompressionMiddleware offers.
+
+Each body has a strong ETag, a hash of its bytes, with an encoding suffix for
+compressed variants. A request whose If-None-Match has the ETag of any variant
+of the current body gets a 304 with no body. A reload that changes the
+content changes the ETags, so clients fetch the new body.
+"""
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from compression import BROTLI_AVAILABLE, compress_once, negotiate_encoding
+from config import settings
+from db.models import Role, SubscriptionPlan
+from serialization import dumps
+
+logger = logging.getLogger("corp_ai.reference_data")
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+class CachedBody:
+    """One JSON body, serialized once, with its compressed variants and their ETags."""
+
+    __slots__ = ("variants", "etag", "cache_control")
+
+    def __init__(self, content, cache_control: str = "no-cache"):
+        body = dumps(content)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.cache_control = cache_control
+        # encoding -> (bytes, etag); None is the uncompressed body
+        self.variants: Dict[Optional[bytes], Tuple[bytes, str]] = {None: (body, self.etag)}
+        if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MINIMUM_SIZE:
+            encodings = [b"gzip"] + ([b"br"] if BROTLI_AVAILABLE else [])
+            for encoding in encodings:
+                self.variants[encoding] = (compress_once(body, encoding), f'"{digest}-{encoding.decode()}"')
+
+    @property
+    def body(self) -> bytes:
+        return self.variants[None][0]
+
+    def _variant(self, request: Request) -> Tuple[Optional[bytes], bytes, str]:
+        if len(self.variants) > 1:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+            if encoding in self.variants:
+                return (encoding, *self.variants[encoding])
+        return (None, *self.variants[None])
+
+    def response(self, request: Request) -> Response:
+        """The body (compressed if the client accepts it), or a 304 if the client has it already."""
+        encoding, body, etag = self._variant(request)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request.headers.get("if-none-match"), (tag for _, tag in self.variants.values())):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding.decode()  # CompressionMiddleware leaves it alone
+        return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+class ReferenceData:
+    """The catalog, plans and roles with their indexes and cached bodies."""
+
+    def __init__(self):
+        self.tools: Tuple[dict, ...] = ()
+        self.tools_by_id: Dict[str, dict] = {}
+        self.tools_by_category: Dict[str, List[dict]] = {}
+        self.tools_by_plan: Dict[str, List[dict]] = {}
+        self.catalog_body: Optional[CachedBody] = None
+        self._tool_bodies: Dict[str, CachedBody] = {}
+        self._category_bodies: Dict[str, CachedBody] = {}
+        self._empty_category = CachedBody({"tools": []}, cache_control="private, no-cache")
+
+        self.plans: Tuple[dict, ...] = ()
+        self.plans_by_id: Dict[str, dict] = {}
+        self.plans_by_name: Dict[str, dict] = {}
+        self.plans_body: Optional[CachedBody] = None
+        self.roles_by_id: Dict[int, str] = {}
+        self.roles_by_name: Dict[str, int] = {}
+        self.loaded_from_db = False
+        self.version = 0
+
+    # Tools catalog (static, validated by the caller)
+
+    def load_tools(self, tools: Iterable[dict]) -> None:
+        self.tools = tuple(tools)
+        self.tools_by_id = {tool["id"]: tool for tool in self.tools}
+        self.tools_by_category = {}
+        self.tools_by_plan = {}
+        for tool in self.tools:
+            self.tools_by_category.setdefault(tool["category"], []).append(tool)
+            self.tools_by_plan.setdefault(tool["requiredSubscription"], []).append(tool)
+        # The catalog is only served to signed-in users, so shared caches mustn't keep it
+        self.catalog_body = CachedBody({"tools": list(self.tools)}, cache_control="private, no-cache")
+        self._category_bodies = {
+            category: CachedBody({"tools": tools}, cache_control="private, no-cache")
+            for category, tools in self.tools_by_category.items()
+        }
+        self._tool_bodies = {
+            tool_id: CachedBody(tool, cache_control="private, no-cache") for tool_id, tool in self.tools_by_id.items()
+        }
+        self.version += 1
+
+    def tool_body(self, tool_id: str) -> Optional[CachedBody]:
+        return self._tool_bodies.get(tool_id)
+
+    def category_body(self, category: str) -> CachedBody:
+        return self._category_bodies.get(category, self._empty_category)
+
+    # Plans and roles (database)
+
+    def update(self, roles: Iterable[Tuple[int, str]], plans: Iterable[dict]) -> bool:
+        """Swap in roles and plans; returns whether the plans response changed."""
+        self.roles_by_id = dict(roles)
+        self.roles_by_name = {name: role_id for role_id, name in self.roles_by_id.items()}
+        plans = tuple(plans)
+        self.loaded_from_db = True
+        if self.plans_body is not None and plans == self.plans:
+            return False
+        self.plans = plans
+        self.plans_by_id = {plan["id"]: plan for plan in plans}
+        self.plans_by_name = {plan["name"]: plan for plan in plans}
+        self.plans_body = CachedBody(list(plans))
+        self.version += 1
+        return True
+
+    async def reload(self, db) -> bool:
+        roles = (await db.execute(select(Role.id, Role.name).order_by(Role.id))).all()
+        plans = (await db.execute(select(SubscriptionPlan).order_by(SubscriptionPlan.id))).scalars().all()
+        changed = self.update(
+            [(role_id, name) for role_id, name in roles],
+            [
+                {
+                    "id": str(plan.id),
+                    "name": plan.name,
+                    "description": getattr(plan, "description", None),  # not a column yet
+                    "price": plan.price,
+                    "duration_days": plan.duration_days,
+                    "features": plan.features,
+                }
+                for plan in plans
+            ],
+        )
+        if changed:
+            logger.info(f"Reference data reloaded: {len(self.plans)} plans, {len(self.roles_by_id)} roles")
+        return changed
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_from_db": self.loaded_from_db,
+            "tools": len(self.tools),
+            "categories": sorted(self.tools_by_category),
+            "tools_by_plan": {plan: len(tools) for plan, tools in self.tools_by_plan.items()},
+            "plans": list(self.plans_by_name),
+            "roles": list(self.roles_by_name),
+            "catalog_etag": self.catalog_body.etag if self.catalog_body is not None else None,
+            "plans_etag": self.plans_body.etag if self.plans_body is not None else None,
+        }
+
+
+reference_data = ReferenceData()
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth.auth_controller import get_current_user
+from auth.authorization import authorization
+from auth.principal import Principal
+from auth.provisioning import ProvisioningInputError, TooManyRowsError, parse_rows, provision_users
+from db.session import get_async_db
+from schemas.auth import BulkProvisionReport
+import logging
+
+logger = logging.getLogger("corp_ai.admin")
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def require_admin(user: Principal = Depends(get_current_user)):
+    """Verify user has the admin role"""
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=403,
+            detail="Requires admin role"
+        )
+    return user
+
+@router.post("/users/bulk", response_model=BulkProvisionReport)
+async def bulk_provision_users(
+    request: Request,
+    admin: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create many users at once from a JSON body (a list of users, or {"users": [...]})
+    or a CSV body (Content-Type: text/csv, header row required).
+
+    Rows that fail validation or insertion are listed in the report; the rest are created.
+    """
+    content_type = request.headers.get("content-type", "application/json")
+    body = await request.body()
+    try:
+        rows = parse_rows(body.decode("utf-8-sig"), content_type)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be UTF-8")
+    except TooManyRowsError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ProvisioningInputError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    logger.info(f"{admin.email} bulk provisioning {len(rows)} users")
+    return await provision_users(db, rows)
+
+@router.get("/authorization")
+async def authorization_table(admin: Principal = Depends(require_admin)):
+    """Roles, plans and rules behind the current authorization decision table."""
+    return authorization.stats()
+
+@router.post("/authorization/reload")
+async def reload_authorization(
+    admin: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Re-read roles and plans now, e.g. right after changing them in the database."""
+    changed = await authorization.reload(db)
+    logger.info(f"{admin.email} reloaded the authorization table (changed: {changed})")
+    return {"changed": changed, **authorization.stats()}
@@ -1,32 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
-from db.session import get_db
+from db.session import get_async_db, write_queue
 from db.models import User, SubscriptionPlan, Role, UserSubscription
+from auth.auth_controller import get_current_user, optional_oauth2_scheme
+from auth.hashing import password_hasher
+from auth.principal import Principal, get_principal, invalidate_principal, load_auth_context
+from auth.tokens import create_access_token, revoke_access_token
+from auth.refresh_tokens import (
+    invalid_refresh_token, issue_refresh_token, new_refresh_token, revoke_refresh_token, rotate_refresh_token
+)
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from typing import Optional
-from schemas.auth import UserCreate, UserLogin, Token as TokenResponse, PasswordReset, PasswordResetConfirm
+from schemas.auth import UserCreate, UserLogin, Token as TokenResponse, PasswordReset, PasswordResetConfirm, RefreshRequest
 import logging
 from config import settings
+from middleware import rate_limit
+from reference_data import reference_data
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# OAuth2 setup
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
-
 # Router
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Credential endpoints are throttled per client to slow down password guessing
+auth_rate_limit = [Depends(rate_limit(group="auth"))]
+
 # Response models
 class UserInfo(TokenResponse):
     """User information response model."""
@@ -41,59 +45,40 @@ class SubscriptionResponse(BaseModel):
     is_active: bool
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_user(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
-    logger.debug(f"Created access token for user: {data.get('sub')}")
-    return encoded_jwt
+def principal_claims(principal: Principal) -> dict:
+    """Access token claims: role and subscription info travel with the token."""
+    return {
+        "sub": principal.email,
+        "role": principal.role,
+        "is_admin": principal.is_admin,
+        "plan": principal.subscription_plan
+    }
 
-def get_user(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
-
-async def get_current_user(response: Response, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+def to_user_info(principal: Principal, access_token: str, refresh_token: Optional[str] = None) -> TokenResponse:
+    return TokenResponse(
+        access_token=access_token,
+        token_type="bearer",
+        user_id=str(principal.id),
+        email=principal.email,
+        role=principal.role,
+        subscription_plan=principal.subscription_plan,
+        subscription_end_date=principal.subscription_end_date.isoformat() if principal.subscription_end_date else None,
+        refresh_token=refresh_token
     )
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            logger.warning("Token missing 'sub' claim")
-            raise credentials_exception
-    except JWTError as e:
-        logger.warning(f"JWT validation error: {str(e)}")
-        raise credentials_exception
-    
-    user = get_user(db, email=email)
-    if user is None:
-        logger.warning(f"User not found: {email}")
-        raise credentials_exception
-    
-    logger.debug(f"User authenticated: {email}")
-    return user
 
 # Routes
-@router.post("/register", response_model=TokenResponse)
-async def register(request: Request, user_data: UserCreate, db: Session = Depends(get_db)):
+@router.post("/register", response_model=TokenResponse, dependencies=auth_rate_limit)
+async def register(request: Request, user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"Processing registration request {request_id}")
     
     try:
         # Check if user already exists
-        existing_user = get_user(db, user_data.email)
+        existing_user = await get_user(db, user_data.email)
         if existing_user:
             logger.warning(f"Registration failed: Email already exists - {user_data.email}")
             raise HTTPException(
@@ -103,7 +88,7 @@ async def register(request: Request, user_data: UserCreate, db: Session = Depend
         
         # Get user role (default to regular user)
         try:
-            role = db.query(Role).filter(Role.name == "user").one()
+            role = (await db.execute(select(Role).where(Role.name == "user"))).scalars().one()
         except NoResultFound:
             logger.error("Default user role not found in database")
             raise HTTPException(
@@ -111,8 +96,8 @@ async def register(request: Request, user_data: UserCreate, db: Session = Depend
                 detail="Role configuration error"
             )
         
-        # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        # Hash password (off the event loop)
+        hashed_password = await password_hasher.hash(user_data.password)
         
         # Create user
         new_user = User(
@@ -126,25 +111,31 @@ async def register(request: Request, user_data: UserCreate, db: Session = Depend
             is_verified=False  # Requires email verification
         )
         
-        # Add and commit user
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        
         # Get basic subscription plan
-        basic_plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.name == "basic").first()
-        if basic_plan:
-            # Create free subscription
-            subscription = UserSubscription(
-                user_id=new_user.id,
-                plan_id=basic_plan.id,
-                start_date=datetime.utcnow(),
-                end_date=datetime.utcnow() + timedelta(days=basic_plan.duration_days),
-                active=True
-            )
-            db.add(subscription)
-            db.commit()
-            db.refresh(subscription)
+        basic_plan = (
+            await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.name == "basic"))
+        ).scalars().first()
+        
+        async def create_account():
+            # User, free subscription and first refresh token go in together, in a single commit
+            db.add(new_user)
+            await db.flush()
+            refresh_token, refresh_row = new_refresh_token(new_user.id)
+            db.add(refresh_row)
+            subscription = None
+            if basic_plan:
+                subscription = UserSubscription(
+                    user_id=new_user.id,
+                    plan_id=basic_plan.id,
+                    start_date=datetime.utcnow(),
+                    end_date=datetime.utcnow() + timedelta(days=basic_plan.duration_days),
+                    active=True
+                )
+                db.add(subscription)
+            await db.commit()
+            return subscription, refresh_token
+        
+        subscription, refresh_token = await write_queue.submit(create_account)
         
         # Create access token with role and subscription info
         token_data = {
@@ -165,11 +156,12 @@ async def register(request: Request, user_data: UserCreate, db: Session = Depend
             email=new_user.email,
             role=role.name,
             subscription_plan=basic_plan.name if basic_plan else None,
-            subscription_end_date=subscription.end_date.isoformat() if basic_plan else None
+            subscription_end_date=subscription.end_date.isoformat() if basic_plan else None,
+            refresh_token=refresh_token
         )
         
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Registration failed - Email: {user_data.email} - Error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -178,71 +170,28 @@ async def register(request: Request, user_data: UserCreate, db: Session = Depend
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Unexpected error during registration - Email: {user_data.email} - Error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
         )
-    
-    logger.debug(f"Registration attempt for email={email}, role={role_name}")
-    
-    # Validate required fields
-    if not email or not password:
-        error_msg = "Email and password are required"
-        logger.warning(f"Registration failed: {error_msg} - Request ID: {request_id}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=error_msg
-        )
-    
-    # Check if user already exists
-    db_user = get_user(db, email=email)
-    if db_user:
-        error_msg = "Email already registered"
-        logger.warning(f"Registration failed: {error_msg} - Email: {email} - Request ID: {request_id}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
-    
-    # Get the role from the database or create default role
-    role = db.query(Role).filter(Role.name == role_name).first()
-    if not role:
-        # Use default role if specified role doesn't exist
-        role = db.query(Role).filter(Role.name == "user").first()
-        if not role:
-            # Create a default role if none exists
-            role = Role(name="user")
-            db.add(role)
-            db.commit()
-    
-    hashed_password = get_password_hash(password)
-    db_user = User(
-        email=email, 
-        hashed_password=hashed_password, 
-        role_id=role.id,
-        is_active=True
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    access_token = create_access_token(data={"sub": db_user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/login", response_model=TokenResponse)
-async def login(request: Request, user_data: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=TokenResponse, dependencies=auth_rate_limit)
+async def login(request: Request, user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"Processing login request {request_id}")
     
     try:
-        # Get user
-        user = get_user(db, user_data.email)
-        if not user:
+        # User, role and active plan in one query
+        context = await load_auth_context(db, user_data.email)
+        if not context:
             logger.warning(f"Login failed: User not found - Email: {user_data.email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
+        user, principal = context
         
         # Verify account status
         if not user.is_active:
@@ -253,56 +202,27 @@ async def login(request: Request, user_data: UserLogin, db: Session = Depends(ge
             )
         
         # Verify password
-        if not verify_password(user_data.password, user.hashed_password):
+        if not await password_hasher.verify(user_data.password, user.hashed_password):
             logger.warning(f"Login failed: Invalid password - Email: {user_data.email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
         
-        # Get user role
-        try:
-            role = db.query(Role).filter(Role.id == user.role_id).one()
-        except NoResultFound:
+        if principal.role is None:
             logger.error(f"Role not found for user - Email: {user_data.email} - Role ID: {user.role_id}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Role configuration error"
             )
         
-        # Get active subscription
-        active_subscription = (
-            db.query(UserSubscription)
-            .join(SubscriptionPlan)
-            .filter(
-                UserSubscription.user_id == user.id,
-                UserSubscription.active == True,
-                UserSubscription.end_date > datetime.utcnow()
-            )
-            .first()
-        )
-        
         # Create token with role and subscription info
-        token_data = {
-            "sub": user.email,
-            "role": role.name,
-            "is_admin": role.name == "admin",
-            "plan": active_subscription.plan.name if active_subscription else None
-        }
-        
-        access_token = create_access_token(data=token_data)
+        access_token = create_access_token(data=principal_claims(principal))
+        refresh_token = await issue_refresh_token(db, user.id)
         
-        logger.info(f"Login successful - Email: {user.email} - Role: {role.name}")
+        logger.info(f"Login successful - Email: {principal.email} - Role: {principal.role}")
         
-        return TokenResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user_id=str(user.id),
-            email=user.email,
-            role=role.name,
-            subscription_plan=active_subscription.plan.name if active_subscription else None,
-            subscription_end_date=active_subscription.end_date.isoformat() if active_subscription else None
-        )
+        return to_user_info(principal, access_token, refresh_token)
         
     except HTTPException:
         raise
@@ -313,34 +233,45 @@ async def login(request: Request, user_data: UserLogin, db: Session = Depends(ge
             detail="An unexpected error occurred"
         )
         
+@router.post("/refresh", response_model=TokenResponse, dependencies=auth_rate_limit)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Trade a refresh token for a new access token and a new refresh token.
+
+    No password check: the refresh token is looked up by its digest and the
+    principal usually comes from the in-process cache.
+    """
+    email, refresh_token = await rotate_refresh_token(db, request.refresh_token)
+    principal = await get_principal(db, email)
+    if principal is None or not principal.is_active:
+        raise invalid_refresh_token()
+    
+    access_token = create_access_token(data=principal_claims(principal))
+    logger.debug(f"Refreshed session - Email: {email}")
+    return to_user_info(principal, access_token, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: RefreshRequest,
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revoke the refresh token's session so it can't be refreshed again, and the
+    presented access token (if any) so it stops working before it expires.
+    """
+    if await revoke_refresh_token(db, request.refresh_token):
+        logger.info("Refresh session revoked on logout")
+    if token and await revoke_access_token(token):
+        logger.info("Access token revoked on logout")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.get("/me", response_model=UserInfo)
-async def get_current_user_info(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     """Endpoint to validate the token and return the current user info."""
     try:
-        # Get user role
-        role = db.query(Role).filter(Role.id == current_user.role_id).one()
-        
-        # Get active subscription
-        active_subscription = (
-            db.query(UserSubscription)
-            .join(SubscriptionPlan)
-            .filter(
-                UserSubscription.user_id == current_user.id,
-                UserSubscription.active == True,
-                UserSubscription.end_date > datetime.utcnow()
-            )
-            .first()
-        )
-        
-        return UserInfo(
-            access_token="",  # Don't return a new token
-            token_type="bearer",
-            user_id=str(current_user.id),
-            email=current_user.email,
-            role=role.name,
-            subscription_plan=active_subscription.plan.name if active_subscription else None,
-            subscription_end_date=active_subscription.end_date.isoformat() if active_subscription else None
-        )
+        # The principal already carries the role and active plan
+        return to_user_info(current_user, access_token="")  # Don't return a new token
     except Exception as e:
         logger.error(f"Error in get_current_user_info: {str(e)}")
         raise HTTPException(
@@ -348,8 +279,8 @@ async def get_current_user_info(current_user: User = Depends(get_current_user),
             detail="An error occurred while retrieving user information"
         )
 
-@router.post("/subscribe", response_model=SubscriptionResponse)
-async def subscribe(request: Request, subscription_data: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.post("/subscribe")
+async def subscribe(request: Request, subscription_data: dict, current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     request_id = getattr(request.state, "request_id", "unknown")
     logger.info(f"Processing subscription request {request_id} for user {current_user.email}")
 
@@ -361,7 +292,9 @@ async def subscribe(request: Request, subscription_data: dict, current_user: Use
     
     try:
         # Get the subscription plan from the database
-        subscription_plan = db.query(SubscriptionPlan).filter(SubscriptionPlan.id == plan_id).first()
+        subscription_plan = (
+            await db.execute(select(SubscriptionPlan).where(SubscriptionPlan.id == plan_id))
+        ).scalars().first()
         if not subscription_plan:
             error_msg = f"Subscription plan with ID {plan_id} not found"
             logger.warning(f"Subscription failed: {error_msg} - User: {current_user.email} - Request ID: {request_id}")
@@ -370,12 +303,16 @@ async def subscribe(request: Request, subscription_data: dict, current_user: Use
         logger.debug(f"Found subscription plan: {subscription_plan.name} - Duration: {subscription_plan.duration_days} days")
         
         # Check if user already has an active subscription to this plan
-        existing_subscription = db.query(UserSubscription).filter(
-            UserSubscription.user_id == current_user.id,
-            UserSubscription.plan_id == subscription_plan.id,
-            UserSubscription.active == True,
-            UserSubscription.end_date > datetime.utcnow()
-        ).first()
+        existing_subscription = (
+            await db.execute(
+                select(UserSubscription).where(
+                    UserSubscription.user_id == current_user.id,
+                    UserSubscription.plan_id == subscription_plan.id,
+                    UserSubscription.active == True,
+                    UserSubscription.end_date > datetime.utcnow()
+                )
+            )
+        ).scalars().first()
         
         if existing_subscription:
             logger.info(f"User already has an active subscription to plan {subscription_plan.name} - User: {current_user.email}")
@@ -394,42 +331,33 @@ async def subscribe(request: Request, subscription_data: dict, current_user: Use
             active=True
         )
         
-        db.add(user_subscription)
-        db.commit()
+        async def save_subscription():
+            db.add(user_subscription)
+            await db.commit()
+        
+        await write_queue.submit(save_subscription)
+        invalidate_principal(email=current_user.email)
         
         logger.info(f"Subscription successful - User: {current_user.email} - Plan: {subscription_plan.name} - Request ID: {request_id}")
         return {"plan": subscription_plan.name, "active": True, "end_date": end_date.isoformat()}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_msg = f"Error processing subscription: {str(e)}"
         logger.error(f"{error_msg} - User: {current_user.email} - Request ID: {request_id}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error processing subscription")
 
 
 @router.get("/subscription-plans")
-async def get_subscription_plans(db: Session = Depends(get_db)):
+async def get_subscription_plans(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
-    Get all available subscription plans
+    Get all available subscription plans (cached; reloaded with the authorization table)
     """
     try:
-        # Get all subscription plans from the database
-        subscription_plans = db.query(SubscriptionPlan).all()
-        
-        # Format the response
-        plans = [
-            {
-                "id": str(plan.id),
-                "name": plan.name,
-                "description": plan.description,
-                "price": plan.price,
-                "duration_days": plan.duration_days,
-                "features": plan.features
-            }
-            for plan in subscription_plans
-        ]
-        
-        return plans
+        if reference_data.plans_body is None:
+            # Not loaded at startup (e.g. the database was unavailable)
+            await reference_data.reload(db)
+        return reference_data.plans_body.response(request)
     except Exception as e:
         logger.error(f"Error fetching subscription plans: {str(e)}")
         raise HTTPException(
@@ -3,10 +3,12 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
 from auth.auth_controller import get_current_user
-from db.models import User
+from auth.principal import Principal
 from db.session import SessionLocal
+from middleware import rate_limit
+from shutdown import register_state
 
-router = APIRouter(tags=["chat"])
+router = APIRouter(tags=["chat"], dependencies=[Depends(rate_limit(group="chat"))])
 
 class ChatMessage(BaseModel):
     id: str
@@ -23,9 +25,11 @@ class ChatResponse(BaseModel):
 
 # In-memory chat storage (replace with database in production)
 user_chats: Dict[str, List[ChatMessage]] = {}
+# ...so it's lost on every restart; the shutdown report counts the messages lost
+register_state("user_chats", lambda: sum(len(messages) for messages in user_chats.values()))
 
 @router.post("/query", response_model=ChatResponse)
-async def query_ai(request: ChatRequest, current_user: User = Depends(get_current_user)):
+async def query_ai(request: ChatRequest, current_user: Principal = Depends(get_current_user)):
     """Query the AI assistant"""
     user_id = str(current_user.id)
     
@@ -57,7 +61,7 @@ async def query_ai(request: ChatRequest, current_user: User = Depends(get_curren
     return ChatResponse(response=ai_response)
 
 @router.get("/history", response_model=List[ChatMessage])
-async def get_chat_history(current_user: User = Depends(get_current_user)):
+async def get_chat_history(current_user: Principal = Depends(get_current_user)):
     """Get chat history for the current user"""
     user_id = str(current_user.id)
     return user_chats.get(user_id, [])
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from auth.principal import Principal
+from config import settings
+from loop_monitor import loop_monitor
+from profiler import ProfilerBusyError, profiler
+from routers.admin import require_admin
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger("corp_ai.debug")
+
+router = APIRouter(prefix="/debug", tags=["debug"], include_in_schema=False)
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(5.0, gt=0),
+    hz: float = Query(None, gt=0, le=1000, description="Samples per second (default PROFILER_SAMPLE_HZ)"),
+    top: int = Query(25, ge=1, le=500),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    include_idle: bool = Query(False, description="Keep stacks of threads parked in select/wait/queue.get"),
+    admin: Principal = Depends(require_admin)
+):
+    """
+    Sample every thread's stack in the worker that serves this request for `seconds`.
+
+    Returns the top functions by self time plus the collapsed stacks, or with
+    format=collapsed just the collapsed stacks as a file for flamegraph.pl / speedscope.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS:g}"
+        )
+    try:
+        thread, profile = profiler.start(seconds, hz or settings.PROFILER_SAMPLE_HZ, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    logger.info(f"{admin.email} started a {seconds:g}s profile")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        # Also stops early when the client goes away
+        profiler.stop()
+        await asyncio.to_thread(thread.join)
+
+    if format == "collapsed":
+        return Response(
+            profile.collapsed(),
+            media_type="text/plain",
+            headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+        )
+    return {
+        "pid": os.getpid(),
+        "duration": round(profile.duration, 3),
+        "interval_ms": round(profile.interval * 1000, 3),
+        "samples": profile.samples,
+        "top": profile.top(top),
+        "collapsed": profile.collapsed(),
+    }
+
+@router.get("/loop")
+async def event_loop_blocks(
+    events: int = Query(20, ge=0, le=100),
+    admin: Principal = Depends(require_admin)
+):
+    """Event loop lag and the most recent blocks, with the route and stack that caused each."""
+    return {"pid": os.getpid(), **loop_monitor.stats(events)}
@@ -6,11 +6,16 @@ from fastapi.responses import JSONResponse, FileResponse
 from typing import Dict, Any, Optional, List
 from tools.finance_tool import FinanceTool
 from auth.auth_controller import get_current_user
-from models.user import User
+from auth.authorization import register_route_group, require_route_group
+from auth.principal import Principal
+from models.user import User  # noqa: F401 - registers the mapper its models relate to
 from models.finance import FinanceReport, Budget
-from db.session import get_db
-from sqlalchemy.orm import Session
+from db.session import get_async_db, write_queue
+from serialization import FastJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+import threading
 from pathlib import Path
 from pydantic import BaseModel
 from datetime import datetime
@@ -21,7 +26,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-finance_tool = FinanceTool()
+_finance_tool: Optional[FinanceTool] = None
+_finance_tool_lock = threading.Lock()
+
+def get_finance_tool() -> FinanceTool:
+    """
+    The shared FinanceTool, created on first use rather than at import (it loads the
+    model). A sync dependency, so FastAPI creates it in the threadpool.
+    """
+    global _finance_tool
+    if _finance_tool is None:
+        with _finance_tool_lock:
+            if _finance_tool is None:
+                _finance_tool = FinanceTool()
+    return _finance_tool
 
 # Budget request model
 class BudgetRequest(BaseModel):
@@ -38,20 +56,15 @@ class BudgetResponse(BaseModel):
     surplus: float
     created_at: Optional[datetime] = None
 
-def check_finance_access(user: User = Depends(get_current_user)):
-    """Verify user has finance or admin role"""
-    if user.role not in ['admin', 'finance']:
-        raise HTTPException(
-            status_code=403,
-            detail="Requires finance or admin role"
-        )
-    return user
+register_route_group("finance", roles=["finance"], detail="Requires finance or admin role")
+check_finance_access = require_route_group("finance")
 
 @router.post("/analyze")
 async def analyze_file(
     file: UploadFile,
-    user: User = Depends(check_finance_access),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(check_finance_access),
+    finance_tool: FinanceTool = Depends(get_finance_tool),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Analyze uploaded financial spreadsheet"""
     if not file.filename.endswith(('.xlsx', '.csv')):
@@ -62,7 +75,8 @@ async def analyze_file(
     
     try:
         analysis = await finance_tool.analyze_spreadsheet(file)
-        return analysis
+        # Straight to orjson: numpy metrics and per-column monthly trends make this large
+        return FastJSONResponse(analysis)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -72,7 +86,8 @@ async def analyze_file(
 @router.post("/insights")
 async def generate_insights(
     data: Dict[str, Any],
-    user: User = Depends(check_finance_access)
+    user: Principal = Depends(check_finance_access),
+    finance_tool: FinanceTool = Depends(get_finance_tool)
 ):
     """Generate LLM insights from financial data"""
     try:
@@ -88,8 +103,9 @@ async def generate_insights(
 async def create_report(
     data: Dict[str, Any],
     background_tasks: BackgroundTasks,
-    user: User = Depends(check_finance_access),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(check_finance_access),
+    finance_tool: FinanceTool = Depends(get_finance_tool),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate PDF report with insights and charts"""
     try:
@@ -106,8 +122,11 @@ async def create_report(
             report_type="financial_analysis",
             status="completed"
         )
-        db.add(report)
-        db.commit()
+        async def save_report():
+            db.add(report)
+            await db.commit()
+        
+        await write_queue.submit(save_report)
         
         # Save PDF file
         reports_dir = Path("data/reports")
@@ -131,11 +150,12 @@ async def create_report(
 @router.get("/reports/{report_id}/download")
 async def download_report(
     report_id: int,
-    user: User = Depends(check_finance_access),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(check_finance_access),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Download generated PDF report"""
-    report = db.query(FinanceReport).filter(FinanceReport.id == report_id).first()
+    result = await db.execute(select(FinanceReport).where(FinanceReport.id == report_id))
+    report = result.scalars().first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
         
@@ -155,8 +175,8 @@ async def download_report(
 @router.post("/budget", response_model=BudgetResponse)
 async def create_budget(
     budget_data: BudgetRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new budget plan"""
     try:
@@ -172,9 +192,12 @@ async def create_budget(
             surplus=surplus
         )
         
-        db.add(new_budget)
-        db.commit()
-        db.refresh(new_budget)
+        async def save_budget():
+            db.add(new_budget)
+            await db.commit()
+            await db.refresh(new_budget)
+        
+        await write_queue.submit(save_budget)
         
         return BudgetResponse(
             id=new_budget.id,
@@ -185,7 +208,7 @@ async def create_budget(
             created_at=new_budget.created_at
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create budget: {str(e)}"
@@ -193,12 +216,13 @@ async def create_budget(
 
 @router.get("/budgets", response_model=List[BudgetResponse])
 async def get_budgets(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all budgets for the current user"""
     try:
-        budgets = db.query(Budget).filter(Budget.user_id == user.id).all()
+        result = await db.execute(select(Budget).where(Budget.user_id == user.id))
+        budgets = result.scalars().all()
         
         return [
             BudgetResponse(
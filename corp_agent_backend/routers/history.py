@@ -3,7 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from auth.auth_controller import get_current_user
-from db.models import User
+from auth.principal import Principal
 
 router = APIRouter(prefix="/tools/history", tags=["history"])
 
@@ -30,6 +30,6 @@ MOCK_HISTORY = [
 ]
 
 @router.get("/", response_model=List[ToolUsage])
-async def get_tool_history(current_user: User = Depends(get_current_user)):
+async def get_tool_history(current_user: Principal = Depends(get_current_user)):
     """Get tool usage history for the current user"""
     return MOCK_HISTORY
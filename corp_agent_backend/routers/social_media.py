@@ -4,14 +4,17 @@ Social Media API Router - Handles social media post scheduling and management
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, Optional, List
-from auth.auth_controller import get_current_user
-from models.user import User
+from auth.authorization import register_route_group, require_route_group
+from auth.principal import Principal
+from models.user import User  # noqa: F401 - registers the mapper its models relate to
 from models.social_media import SocialMediaPost
 from tools.social_media_tool import SocialMediaTool
-from db.session import get_db
-from sqlalchemy.orm import Session
+from db.session import get_async_db, write_queue
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
+import threading
 
 router = APIRouter(
     prefix="/tools/social_media",
@@ -19,7 +22,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-social_media_tool = SocialMediaTool()
+_social_media_tool: Optional[SocialMediaTool] = None
+_social_media_tool_lock = threading.Lock()
+
+def get_social_media_tool() -> SocialMediaTool:
+    """
+    The shared SocialMediaTool, created on first use rather than at import (it loads the
+    model). A sync dependency, so FastAPI creates it in the threadpool.
+    """
+    global _social_media_tool
+    if _social_media_tool is None:
+        with _social_media_tool_lock:
+            if _social_media_tool is None:
+                _social_media_tool = SocialMediaTool()
+    return _social_media_tool
 
 # Request and response models
 class SocialMediaPostRequest(BaseModel):
@@ -43,21 +59,21 @@ class ContentGenerationRequest(BaseModel):
 class ContentGenerationResponse(BaseModel):
     content: str
 
-# Check if user has access to social media tools
-def check_social_media_access(user: User = Depends(get_current_user)):
-    """Verify user has appropriate subscription for social media tools"""
-    if user.subscription_plan not in ['professional', 'enterprise'] and user.role != 'admin':
-        raise HTTPException(
-            status_code=403,
-            detail="Social media tools require a Professional or Enterprise subscription"
-        )
-    return user
+# Social media tools need a Professional or Enterprise subscription (admins always pass)
+register_route_group(
+    "social_media",
+    min_plan="professional",
+    detail="Social media tools require a Professional or Enterprise subscription"
+)
+check_social_media_access = require_route_group("social_media")
 
 @router.post("", response_model=SocialMediaPostResponse)
 async def create_post(
     post_data: SocialMediaPostRequest,
-    user: User = Depends(check_social_media_access),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    user: Principal = Depends(check_social_media_access),
+    social_media_tool: SocialMediaTool = Depends(get_social_media_tool),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new social media post"""
     try:
@@ -70,12 +86,14 @@ async def create_post(
             status="scheduled"
         )
         
-        db.add(new_post)
-        db.commit()
-        db.refresh(new_post)
+        async def save():
+            db.add(new_post)
+            await db.commit()
+            await db.refresh(new_post)
         
-        # Schedule the post using the social media tool
-        background_tasks = BackgroundTasks()
+        await write_queue.submit(save)
+        
+        # Schedule the post using the social media tool, after the response is sent
         background_tasks.add_task(
             social_media_tool.schedule_post,
             new_post.id,
@@ -93,7 +111,7 @@ async def create_post(
             created_at=new_post.created_at
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create social media post: {str(e)}"
@@ -101,12 +119,13 @@ async def create_post(
 
 @router.get("/posts", response_model=List[SocialMediaPostResponse])
 async def get_posts(
-    user: User = Depends(check_social_media_access),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(check_social_media_access),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all social media posts for the current user"""
     try:
-        posts = db.query(SocialMediaPost).filter(SocialMediaPost.user_id == user.id).all()
+        result = await db.execute(select(SocialMediaPost).where(SocialMediaPost.user_id == user.id))
+        posts = result.scalars().all()
         
         return [
             SocialMediaPostResponse(
@@ -127,7 +146,8 @@ async def get_posts(
 @router.post("/generate", response_model=ContentGenerationResponse)
 async def generate_content(
     request: ContentGenerationRequest,
-    user: User = Depends(check_social_media_access)
+    user: Principal = Depends(check_social_media_access),
+    social_media_tool: SocialMediaTool = Depends(get_social_media_tool)
 ):
     """Generate social media content using AI"""
     try:
@@ -146,15 +166,18 @@ async def generate_content(
 @router.delete("/posts/{post_id}")
 async def delete_post(
     post_id: int,
-    user: User = Depends(check_social_media_access),
-    db: Session = Depends(get_db)
+    user: Principal = Depends(check_social_media_access),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a scheduled social media post"""
     try:
-        post = db.query(SocialMediaPost).filter(
-            SocialMediaPost.id == post_id,
-            SocialMediaPost.user_id == user.id
-        ).first()
+        result = await db.execute(
+            select(SocialMediaPost).where(
+                SocialMediaPost.id == post_id,
+                SocialMediaPost.user_id == user.id
+            )
+        )
+        post = result.scalars().first()
         
         if not post:
             raise HTTPException(
@@ -169,14 +192,17 @@ async def delete_post(
                 detail="Cannot delete a published post"
             )
         
-        db.delete(post)
-        db.commit()
+        async def remove():
+            await db.delete(post)
+            await db.commit()
+        
+        await write_queue.submit(remove)
         
         return {"message": "Post deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete post: {str(e)}"
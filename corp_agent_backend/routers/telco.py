@@ -12,7 +12,7 @@ import json
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth.authorization import register_route_group, require_route_group
 from ..models.user import User
 from ..models.telco import TelcoReport
 from ..tools.telco_tool import (
@@ -35,15 +35,12 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-def check_telco_access(user: User = Depends(get_current_user)):
-    """Check if user has access to telco tools."""
-    allowed_roles = ["admin", "network_ops", "fraud_team"]
-    if user.role not in allowed_roles:
-        raise HTTPException(
-            status_code=403,
-            detail="You don't have permission to access telco tools"
-        )
-    return user
+register_route_group(
+    "telco",
+    roles=["network_ops", "fraud_team"],
+    detail="You don't have permission to access telco tools"
+)
+check_telco_access = require_route_group("telco")
 
 @router.post("/upload", response_model=Dict)
 async def upload_telco_data(
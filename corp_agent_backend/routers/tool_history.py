@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 from auth.auth_controller import get_current_user
-from db.models import User
-from db.session import get_db
-from sqlalchemy.orm import Session
+from auth.principal import Principal
+from config import settings
+from db.session import AsyncSessionLocal, get_async_db, write_queue
+from db.write_behind import BufferFullError, WriteBehindBuffer
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import binascii
 import uuid
 
 router = APIRouter(prefix="/tools/history", tags=["tools"])
@@ -25,66 +30,165 @@ class ToolUsage(BaseModel):
 
 class ToolsHistoryResponse(BaseModel):
     history: List[ToolUsage]
+    nextCursor: Optional[str] = None
+
+MAX_BATCH_EVENTS = 500
+
+class ToolUsageBatchCreate(BaseModel):
+    events: List[ToolUsageCreate] = Field(..., min_length=1, max_length=MAX_BATCH_EVENTS)
+
+class ToolUsageBatchResponse(BaseModel):
+    accepted: int
 
 from models.tool_history import ToolHistory
-from datetime import datetime
+# models.user.User has relationships to these; they must be imported before the mappers configure
+from models import finance, role, social_media, subscription  # noqa: F401
+
+# Usage events are acknowledged immediately and bulk-inserted in the background;
+# app startup/shutdown start and drain it
+tool_history_recorder = WriteBehindBuffer(
+    ToolHistory,
+    AsyncSessionLocal,
+    write_queue=write_queue,
+    flush_interval_ms=settings.TOOL_HISTORY_FLUSH_INTERVAL_MS,
+    batch_size=settings.TOOL_HISTORY_FLUSH_BATCH_SIZE,
+    max_buffered=settings.TOOL_HISTORY_BUFFER_LIMIT,
+)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(timestamp: datetime, history_id: str) -> str:
+    """Opaque cursor pointing just past the given row in (timestamp DESC, id DESC) order."""
+    raw = f"{timestamp.isoformat()}|{history_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, history_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), history_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; normalise aware query parameters to match."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def to_history_row(usage: ToolUsageCreate, user_id) -> dict:
+    """Build a complete row up front so it can be acknowledged before it's written."""
+    return {
+        "id": str(uuid.uuid4()),
+        "tool_id": usage.toolId,
+        "name": usage.name,
+        "category": usage.category,
+        "timestamp": datetime.utcnow(),
+        "user_id": user_id,
+    }
+
+async def buffer_rows(rows: List[dict]) -> None:
+    try:
+        await tool_history_recorder.add(rows)
+    except BufferFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tool history is temporarily unavailable, please retry"
+        )
+
+def to_tool_usage(h: ToolHistory) -> ToolUsage:
+    return ToolUsage(
+        id=h.id,
+        toolId=h.tool_id,
+        name=h.name,
+        category=h.category,
+        timestamp=h.timestamp.isoformat(),
+        userId=str(h.user_id)
+    )
 
 @router.get("", response_model=ToolsHistoryResponse)
 async def get_tool_history(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Get tool history for the current user from database
-    history = db.query(ToolHistory).filter(
-        ToolHistory.user_id == current_user.id
-    ).order_by(ToolHistory.timestamp.desc()).all()
+    """
+    Page through the current user's tool history, newest first.
+
+    Pass the returned nextCursor back as `cursor` to fetch the next page. Every
+    page is a range scan on the (user_id, timestamp, id) index, so page latency
+    doesn't depend on how much history the user has.
+    """
+    query = select(ToolHistory).where(ToolHistory.user_id == current_user.id)
     
-    return {"history": [
-        ToolUsage(
-            id=h.id,
-            toolId=h.tool_id,
-            name=h.name,
-            category=h.category,
-            timestamp=h.timestamp.isoformat(),
-            userId=h.user_id
-        ) for h in history
-    ]}
-
-@router.post("", response_model=ToolUsage)
-async def record_tool_usage(
-    usage: ToolUsageCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    # Create a new tool usage record
-    tool_history = ToolHistory(
-        tool_id=usage.toolId,
-        name=usage.name,
-        category=usage.category,
-        user_id=current_user.id
+    if category:
+        query = query.where(ToolHistory.category == category)
+    if since:
+        query = query.where(ToolHistory.timestamp >= to_utc_naive(since))
+    if until:
+        query = query.where(ToolHistory.timestamp < to_utc_naive(until))
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            ToolHistory.timestamp < after_timestamp,
+            and_(ToolHistory.timestamp == after_timestamp, ToolHistory.id < after_id)
+        ))
+    
+    # Fetch one extra row to learn whether another page exists
+    result = await db.execute(
+        query.order_by(ToolHistory.timestamp.desc(), ToolHistory.id.desc()).limit(limit + 1)
     )
+    rows = result.scalars().all()
     
-    db.add(tool_history)
-    db.commit()
-    db.refresh(tool_history)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
     
-    return ToolUsage(
-        id=tool_history.id,
-        toolId=tool_history.tool_id,
-        name=tool_history.name,
-        category=tool_history.category,
-        timestamp=tool_history.timestamp.isoformat(),
-        userId=tool_history.user_id
+    return ToolsHistoryResponse(
+        history=[to_tool_usage(h) for h in rows],
+        nextCursor=next_cursor
     )
 
+@router.post("", response_model=ToolUsage, status_code=status.HTTP_202_ACCEPTED)
+async def record_tool_usage(
+    usage: ToolUsageCreate,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Record a tool usage event. It's written in the next background flush."""
+    row = to_history_row(usage, current_user.id)
+    await buffer_rows([row])
+    return to_tool_usage(ToolHistory(**row))
+
+@router.post("/batch", response_model=ToolUsageBatchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def record_tool_usage_batch(
+    batch: ToolUsageBatchCreate,
+    current_user: Principal = Depends(get_current_user)
+):
+    """Record many tool usage events in one request."""
+    rows = [to_history_row(usage, current_user.id) for usage in batch.events]
+    await buffer_rows(rows)
+    return ToolUsageBatchResponse(accepted=len(rows))
+
 @router.delete("", status_code=204)
 async def clear_tool_history(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # Write out anything still buffered first so it can't reappear after the delete
+    await tool_history_recorder.flush()
+    
     # Delete all tool history for the current user
-    db.query(ToolHistory).filter(
-        ToolHistory.user_id == current_user.id
-    ).delete()
-    db.commit()
+    async def clear():
+        await db.execute(
+            delete(ToolHistory).where(ToolHistory.user_id == current_user.id)
+        )
+        await db.commit()
+    
+    await write_queue.submit(clear)
     return {"status": "success"}
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from auth.auth_controller import get_current_user
-from db.models import User
+from auth.authorization import authorization, require_tool
+from auth.principal import Principal
+from middleware import rate_limit
+from reference_data import reference_data
 from tools import (
     create_lead, forecast_sales, handle_customer_query, send_campaign,
     post_social, generate_report, create_job_post, review_contract,
@@ -11,7 +14,7 @@ from tools import (
     make_reservation
 )
 
-router = APIRouter(prefix="/tools", tags=["tools"])
+router = APIRouter(prefix="/tools", tags=["tools"], dependencies=[Depends(rate_limit(group="tools"))])
 
 # Tool models
 class ToolField(BaseModel):
@@ -192,24 +195,34 @@ TOOLS = [
     }
 ]
 
+# Each tool's requiredSubscription is enforced through the central decision table
+authorization.register_tools(TOOLS)
+
+# Validated once here and served from pre-serialized bytes with ETags
+reference_data.load_tools(ToolModel(**tool).model_dump() for tool in TOOLS)
+
 @router.get("", response_model=ToolsResponse)
-async def get_tools(current_user: User = Depends(get_current_user)):
+async def get_tools(request: Request, current_user: Principal = Depends(get_current_user)):
     """Get all available tools"""
-    return {"tools": TOOLS}
+    return reference_data.catalog_body.response(request)
 
 @router.get("/category/{category}", response_model=ToolsResponse)
-async def get_tools_by_category(category: str, current_user: User = Depends(get_current_user)):
+async def get_tools_by_category(category: str, request: Request, current_user: Principal = Depends(get_current_user)):
     """Get tools by category"""
-    filtered_tools = [tool for tool in TOOLS if tool["category"] == category]
-    return {"tools": filtered_tools}
+    return reference_data.category_body(category).response(request)
 
 @router.get("/{tool_id}", response_model=ToolModel)
-async def get_tool_by_id(tool_id: str, current_user: User = Depends(get_current_user)):
+async def get_tool_by_id(tool_id: str, request: Request, current_user: Principal = Depends(get_current_user)):
     """Get a specific tool by ID"""
-    for tool in TOOLS:
-        if tool["id"] == tool_id:
-            return tool
-    raise HTTPException(status_code=404, detail=f"Tool with ID {tool_id} not found")
+    tool = reference_data.tools_by_id.get(tool_id)
+    if tool is None:
+        raise HTTPException(status_code=404, detail=f"Tool with ID {tool_id} not found")
+    if not authorization.can_use_tool(current_user, tool_id):
+        raise HTTPException(
+            status_code=403,
+            detail=f"This tool requires the {tool['requiredSubscription']} plan or above"
+        )
+    return reference_data.tool_body(tool_id).response(request)
 
 
 class LeadRequest(BaseModel): name: str; contact: str
@@ -263,7 +276,7 @@ class NotificationResponse(BaseModel): method: str; recipient: str; status: str
 class ReservationRequest(BaseModel): customer: str; date: str; time: str
 class ReservationResponse(BaseModel): reservation_id: str; customer: str; datetime: str
 
-@router.post("/crm", response_model=LeadResponse)
+@router.post("/crm", response_model=LeadResponse, dependencies=[Depends(require_tool("crm-leads"))])
 def api_create_lead(req: LeadRequest): return create_lead(req.name, req.contact)
 
 @router.post("/sales_forecast", response_model=ForecastResponse)
@@ -272,7 +285,7 @@ def api_forecast_sales(req: ForecastRequest): return forecast_sales(req.product_
 @router.post("/chat_support", response_model=QueryResponse)
 def api_chat_support(req: QueryRequest): return handle_customer_query(req.query)
 
-@router.post("/marketing", response_model=CampaignResponse)
+@router.post("/marketing", response_model=CampaignResponse, dependencies=[Depends(require_tool("marketing-campaign"))])
 def api_send_campaign(req: CampaignRequest): return send_campaign(req.name, req.audience, req.message)
 
 @router.post("/social_media", response_model=SocialPostResponse)
@@ -281,13 +294,13 @@ def api_post_social(req: SocialPostRequest): return post_social(req.channel, req
 @router.post("/analytics", response_model=ReportResponse)
 def api_generate_report(req: ReportRequest): return generate_report(req.report_type, req.parameters)
 
-@router.post("/hr/job_post", response_model=JobPostResponse)
+@router.post("/hr/job_post", response_model=JobPostResponse, dependencies=[Depends(require_tool("hr-job-posting"))])
 def api_create_job(req: JobPostRequest): return create_job_post(req.title, req.description)
 
-@router.post("/contract_review", response_model=ContractResponse)
+@router.post("/contract_review", response_model=ContractResponse, dependencies=[Depends(require_tool("legal-contract"))])
 def api_review_contract(req: ContractRequest): return review_contract(req.text)
 
-@router.post("/finance/budget", response_model=BudgetResponse)
+@router.post("/finance/budget", response_model=BudgetResponse, dependencies=[Depends(require_tool("finance-budget"))])
 def api_plan_budget(req: BudgetRequest): return plan_budget(req.month, req.revenue, req.expenses)
 
 @router.post("/supply_chain/optimize", response_model=InventoryOptResponse)
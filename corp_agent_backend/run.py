@@ -1,12 +1,54 @@
 """
-Script to run the FastAPI application with uvicorn.
+Script to run the FastAPI application.
+
+    python run.py                   development: one uvicorn process, reloads on code changes
+    python run.py --workers 4       production: gunicorn with uvicorn workers and the app
+                                    preloaded (gunicorn.conf.py); WEB_CONCURRENCY if N is 0
 """
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+
 import uvicorn
 
+from config import settings
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_production(workers: int, host: str, port: int) -> None:
+    if importlib.util.find_spec("gunicorn") is None:
+        # uvicorn starts each worker as a fresh process, so nothing is preloaded or shared
+        logging.getLogger("corp_ai").warning(
+            "gunicorn is not installed; running uvicorn workers without preloading or recycling"
+        )
+        uvicorn.run(
+            "app:app", host=host, port=port, workers=workers, proxy_headers=True,
+            timeout_graceful_shutdown=settings.WORKER_GRACEFUL_TIMEOUT,
+        )
+        return
+    os.chdir(BACKEND_DIR)
+    os.execv(sys.executable, [
+        sys.executable, "-m", "gunicorn", "app:app", "--config", "gunicorn.conf.py",
+        "--workers", str(workers), "--bind", f"{host}:{port}",
+    ])
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, help="run N production workers (0 = WEB_CONCURRENCY)")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    args = parser.parse_args()
+
+    if args.workers is None:
+        uvicorn.run(
+            "app:app",
+            host=args.host,
+            port=args.port,
+            reload=True
+        )
+    else:
+        run_production(args.workers or settings.WEB_CONCURRENCY, args.host, args.port)
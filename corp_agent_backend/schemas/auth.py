@@ -1,7 +1,14 @@
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional
+from typing import List, Optional
 import re
 
+# At least 8 characters with upper and lower case letters, a digit and a special character
+PASSWORD_PATTERN = re.compile(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$')
+PASSWORD_RULE = (
+    'Password must contain at least 8 characters, '
+    'including uppercase, lowercase, number and special character'
+)
+
 class UserBase(BaseModel):
     email: EmailStr
     first_name: str = Field(..., min_length=1, max_length=50)
@@ -14,11 +21,8 @@ class UserCreate(UserBase):
     
     @validator('password')
     def validate_password(cls, v):
-        if not re.match(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$', v):
-            raise ValueError(
-                'Password must contain at least 8 characters, '
-                'including uppercase, lowercase, number and special character'
-            )
+        if not PASSWORD_PATTERN.match(v):
+            raise ValueError(PASSWORD_RULE)
         return v
     
     @validator('confirm_password')
@@ -39,6 +43,10 @@ class Token(BaseModel):
     role: str
     subscription_plan: Optional[str] = None
     subscription_end_date: Optional[str] = None
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -54,11 +62,8 @@ class PasswordResetConfirm(BaseModel):
     
     @validator('new_password')
     def validate_password(cls, v):
-        if not re.match(r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$', v):
-            raise ValueError(
-                'Password must contain at least 8 characters, '
-                'including uppercase, lowercase, number and special character'
-            )
+        if not PASSWORD_PATTERN.match(v):
+            raise ValueError(PASSWORD_RULE)
         return v
     
     @validator('confirm_password')
@@ -66,3 +71,30 @@ class PasswordResetConfirm(BaseModel):
         if 'new_password' in values and v != values['new_password']:
             raise ValueError('Passwords do not match')
         return v
+
+class BulkUserCreate(BaseModel):
+    """One row of a bulk provisioning file. Rows without a password can only sign in with OAuth."""
+    email: EmailStr
+    password: Optional[str] = None
+    first_name: Optional[str] = Field(None, max_length=50)
+    last_name: Optional[str] = Field(None, max_length=50)
+    company_name: Optional[str] = Field(None, max_length=100)
+    role: str = "user"
+    plan: Optional[str] = "basic"
+    
+    @validator('password')
+    def validate_password(cls, v):
+        if v is not None and not PASSWORD_PATTERN.match(v):
+            raise ValueError(PASSWORD_RULE)
+        return v
+
+class BulkProvisionError(BaseModel):
+    row: int
+    email: Optional[str] = None
+    error: str
+
+class BulkProvisionReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    errors: List[BulkProvisionError]
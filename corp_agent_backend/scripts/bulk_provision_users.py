@@ -0,0 +1,58 @@
+"""
+Create users in bulk from a CSV or JSON file.
+
+Usage:
+    python scripts/bulk_provision_users.py users.csv
+    python scripts/bulk_provision_users.py users.json --report report.json
+
+CSV files need a header row; columns are email, password, first_name,
+last_name, company_name, role and plan (only email is required). JSON files
+hold a list of objects with the same keys, or {"users": [...]}.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import argparse
+import asyncio
+
+from auth.provisioning import ProvisioningInputError, parse_rows, provision_users, shutdown_hash_pool
+from db.session import AsyncSessionLocal, async_engine
+
+
+async def run(path: str):
+    with open(path, encoding="utf-8-sig") as f:
+        content = f.read()
+    content_type = "text/csv" if path.lower().endswith(".csv") else "application/json"
+    rows = parse_rows(content, content_type)
+    try:
+        async with AsyncSessionLocal() as db:
+            return await provision_users(db, rows)
+    finally:
+        await shutdown_hash_pool()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help=".csv or .json file of users")
+    parser.add_argument("--report", help="also write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run(args.path))
+    except ProvisioningInputError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    print(f"{report.created} of {report.total} users created, {report.failed} failed")
+    for error in report.errors:
+        print(f"  row {error.row} ({error.email or '-'}): {error.error}")
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report.model_dump_json(indent=2))
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse is the app's default response class. It serializes with
+orjson when installed (the stdlib otherwise) and understands the values
+analysis results are full of: numpy scalars and arrays, pandas Timestamps,
+Timedeltas, Periods and NaT/NA, Decimals, sets, pydantic models, and dict
+keys that aren't strings (numpy integers, Timestamps, Periods). With orjson,
+NaN and infinities are written as null.
+
+FastAPI runs jsonable_encoder over plain dict/list return values before the
+response class sees them, which is slow on large results and fails on numpy
+integers. Routes returning large payloads skip that pass by returning
+FastJSONResponse(content) themselves.
+"""
+import datetime
+import decimal
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pandas' missing-value singletons (NaT is a datetime subclass, so check these first)
+MISSING_VALUE_TYPES = {"NaTType", "NAType"}
+
+
+def _default(obj: Any) -> Any:
+    """Convert a value the serializer doesn't know to one it does."""
+    if type(obj).__name__ in MISSING_VALUE_TYPES:
+        return None
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()  # datetime subclasses such as pandas.Timestamp
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()  # as jsonable_encoder does
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if type(obj).__module__ == "numpy" and hasattr(obj, "item"):
+        return obj.item()  # numpy scalars orjson doesn't take natively (float16, bool_ without orjson)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()  # numpy arrays orjson can't take natively, pandas Series and Index
+    if type(obj).__module__.startswith("pandas"):
+        return str(obj)  # Period, Interval
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _key(key: Any) -> Any:
+    if isinstance(key, (str, int, float, bool)) or key is None:
+        return key
+    if type(key).__name__ in MISSING_VALUE_TYPES:
+        return "null"
+    if isinstance(key, (datetime.date, datetime.time)):
+        return key.isoformat()
+    if type(key).__module__ == "numpy" and hasattr(key, "item"):
+        return key.item()
+    return str(key)
+
+
+def _normalize_keys(obj: Any) -> Any:
+    """Copy of `obj` with dict keys the serializers reject converted (the rare slow path)."""
+    if isinstance(obj, dict):
+        return {_key(k): _normalize_keys(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize_keys(v) for v in obj]
+    return obj
+
+
+def _dumps_stdlib(content: Any) -> bytes:
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize `content` to compact UTF-8 JSON."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError as e:
+            if "Dict key" not in str(e):
+                raise
+            return orjson.dumps(_normalize_keys(content), default=_default, option=ORJSON_OPTIONS)
+    try:
+        return _dumps_stdlib(content)
+    except TypeError as e:
+        if "keys must be" not in str(e):
+            raise
+        return _dumps_stdlib(_normalize_keys(content))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,161 @@
+"""
+Per-request resource accounting for the Server-Timing header and access log.
+
+RequestContextMiddleware gives each request a RequestTimings accumulator in a
+contextvar; code that spends time on a resource adds to it with `timed(name)`
+or `record(name, seconds)`, from the event loop or a threadpool worker alike
+(worker threads run in a copy of the request's context, which points at the
+same accumulator). Outside a request both are no-ops.
+
+Recorded resources:
+
+* db - SQL statement time and count (SQLAlchemy cursor events, both engines)
+* llm - LLM generation time; llm_prefill / llm_decode when a streaming caller
+  marks the first token (see metrics.LLMCall)
+* retrieval - query embedding and vector search
+* render - chart and PDF rendering
+
+The header reads e.g. `db;dur=12.4;desc="3 queries", llm;dur=812.0, app;dur=830.1`.
+"""
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("corp_ai_request_timings", default=None)
+
+# Header order; anything else recorded follows in first-recorded order
+KNOWN_METRICS = ("db", "llm", "llm_prefill", "llm_decode", "retrieval", "render")
+
+
+class RequestTimings:
+    """Seconds and call counts per resource for one request."""
+
+    __slots__ = ("_totals", "_lock")
+
+    def __init__(self):
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            total = self._totals.get(name)
+            if total is None:
+                self._totals[name] = [seconds, count]
+            else:
+                total[0] += seconds
+                total[1] += count
+
+    def _ordered(self):
+        names = [name for name in KNOWN_METRICS if name in self._totals]
+        names += [name for name in self._totals if name not in KNOWN_METRICS]
+        return [(name, self._totals[name]) for name in names]
+
+    def header(self, total_seconds: Optional[float] = None) -> str:
+        """The Server-Timing header value, with the whole request as `app`."""
+        parts = []
+        for name, (seconds, count) in self._ordered():
+            if name == "db":
+                parts.append(f'db;dur={seconds * 1000:.1f};desc="{int(count)} {"query" if count == 1 else "queries"}"')
+            else:
+                parts.append(f"{name};dur={seconds * 1000:.1f}")
+        if total_seconds is not None:
+            parts.append(f"app;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, dict]:
+        return {
+            name: {"ms": round(seconds * 1000, 3), "count": int(count)}
+            for name, (seconds, count) in self._ordered()
+        }
+
+
+def start_request() -> tuple:
+    """Give the current context a fresh accumulator; returns (timings, token for end_request)."""
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def end_request(token) -> None:
+    _timings.reset(token)
+
+
+def current() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+def record(name: str, seconds: float, count: int = 1) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds, count)
+
+
+class timed:
+    """
+    Add the time spent in a block or function to the current request's `name`:
+
+        with timed("retrieval"):
+            docs = search(query)
+
+        @timed("render")
+        def create_charts(...): ...
+    """
+
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._start = 0.0
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        record(self.name, time.perf_counter() - self._start)
+
+    def __call__(self, func):
+        name = self.name
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(name, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+
+
+def instrument_engine_timing(engine) -> None:
+    """Count each SQL statement executed on a (sync) Engine, and its time, towards `db`."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _timings.get() is not None:
+            conn.info.setdefault("corp_ai_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("corp_ai_query_started")
+        if started:
+            record("db", time.perf_counter() - started.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("corp_ai_query_started") if context.connection is not None else None
+        if started:
+            record("db", time.perf_counter() - started.pop())
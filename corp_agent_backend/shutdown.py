@@ -0,0 +1,222 @@
+"""
+Graceful shutdown - what the app's lifespan does once the server has been
+told to stop, in order:
+
+1. Stop accepting requests. ShutdownMiddleware answers anything arriving
+   from then on with a 503, Retry-After and Connection: close, so the client
+   or load balancer retries it elsewhere.
+2. Drain. In-flight requests - with their BackgroundTasks, which run after
+   the response inside the request, and the LLM generations they wait on -
+   get SHUTDOWN_GRACE_PERIOD seconds to finish. Whatever is still running then is cancelled; a request whose
+   response hasn't started gets a 503 asking the client to retry instead of
+   a dropped connection.
+3. Flush the write-behind buffers and the write queue.
+4. Close the DB pools, HTTP and Redis clients and background services.
+5. Report what was drained and what was dropped, including in-memory state
+   that doesn't survive a restart (register_state), in one log line.
+
+Steps 3 and 4 are run by app.py through run_step(), each bounded by
+SHUTDOWN_FLUSH_TIMEOUT, so one stuck close can't stop the rest.
+
+The lifespan creates a coordinator for each run of the app and hands it to
+ShutdownMiddleware through the lifespan state, so a stopped run leaves
+nothing behind for the next one; requests served without a lifespan aren't
+tracked.
+
+uvicorn itself stops listening and waits for open requests (up to its
+timeout_graceful_shutdown; gunicorn's graceful_timeout) before it runs the
+lifespan shutdown, so there the drain mostly covers requests (and their
+BackgroundTasks) that outlived the server's wait.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import in_flight_generations
+
+logger = logging.getLogger("corp_ai.shutdown")
+
+UNAVAILABLE_BODY = b'{"detail":"Server is shutting down, please retry"}'
+UNAVAILABLE_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(UNAVAILABLE_BODY)).encode()),
+    (b"retry-after", b"1"),
+    (b"connection", b"close"),
+]
+CANCEL_MESSAGE = "server shutting down"
+
+_states: Dict[str, Callable[[], int]] = {}
+
+
+def register_state(name: str, count: Callable[[], int]) -> None:
+    """In-memory state lost at shutdown; `count` says how many items of it there are then."""
+    _states[name] = count
+
+
+async def send_unavailable(send) -> None:
+    await send({"type": "http.response.start", "status": 503, "headers": UNAVAILABLE_HEADERS})
+    await send({"type": "http.response.body", "body": UNAVAILABLE_BODY})
+
+
+class _RequestState:
+    __slots__ = ("response_started", "response_complete")
+
+    def __init__(self):
+        self.response_started = False
+        self.response_complete = False  # after this the request is running its BackgroundTasks
+
+
+class ShutdownCoordinator:
+    """Tracks the work a shutdown has to wait for and reports how the shutdown went."""
+
+    def __init__(self):
+        self._requests: Dict[asyncio.Task, _RequestState] = {}
+        self.accepting = True
+        self.cancelling = False
+        self.rejected = 0
+        self.notified = 0
+        self.report: Optional[dict] = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._requests)
+
+    async def drain(self, grace_period: float) -> dict:
+        """Stop accepting requests and wait up to `grace_period` for in-flight work, then cancel the rest."""
+        self.accepting = False
+        started = time.perf_counter()
+        current = asyncio.current_task()
+        requests = {task: state for task, state in self._requests.items() if task is not current}
+        in_background = {task for task, state in requests.items() if state.response_complete}
+        generations = in_flight_generations()
+        pending = set(requests)
+        if pending:
+            logger.info(
+                f"Draining {len(requests)} requests ({len(in_background)} running background tasks) "
+                f"and {generations} LLM generations for up to {grace_period:.0f}s"
+            )
+            _, pending = await asyncio.wait(pending, timeout=grace_period)
+
+        report = {
+            "grace_period_seconds": grace_period,
+            "requests": {"in_flight": len(requests) - len(in_background), "drained": 0, "cancelled": 0},
+            "background_tasks": {"in_flight": len(in_background), "drained": 0, "cancelled": 0},
+            "llm_generations": {"in_flight": generations, "drained": 0, "cancelled": 0},
+        }
+        generations_cancelled = in_flight_generations() if pending else 0
+        for task in requests:
+            kind = "background_tasks" if task in in_background else "requests"
+            report[kind]["cancelled" if task in pending else "drained"] += 1
+        report["llm_generations"]["cancelled"] = min(generations_cancelled, generations)
+        report["llm_generations"]["drained"] = generations - report["llm_generations"]["cancelled"]
+
+        if pending:
+            self.cancelling = True
+            for task in pending:
+                task.cancel(CANCEL_MESSAGE)
+            # Let them unwind (and answer their clients); work stuck in a thread can't be interrupted
+            await asyncio.wait(pending, timeout=1.0)
+        report["requests"]["notified"] = self.notified
+        report["requests"]["rejected"] = self.rejected
+        report["drain_seconds"] = round(time.perf_counter() - started, 3)
+        self.report = report
+        return report
+
+    async def run_step(self, name: str, step: Callable[[], Awaitable], timeout: float) -> bool:
+        """Run one shutdown step, bounded by `timeout`; a failure is logged and the shutdown goes on."""
+        try:
+            await asyncio.wait_for(step(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.error(f"Shutdown step '{name}' timed out after {timeout:.0f}s")
+        except Exception as e:
+            logger.error(f"Shutdown step '{name}' failed: {str(e)}")
+        return False
+
+    async def flush_buffer(self, name: str, buffer, timeout: float) -> dict:
+        """Stop a WriteBehindBuffer, counting the rows it flushed and dropped."""
+        pending, flushed, dropped = buffer.pending, buffer.flushed, buffer.dropped
+        await self.run_step(name, buffer.stop, timeout)
+        lost = buffer.dropped - dropped + buffer.pending  # a timed-out stop leaves rows behind
+        return {"pending": pending, "flushed": buffer.flushed - flushed, "dropped": lost}
+
+    async def drain_queue(self, name: str, queue, timeout: float) -> dict:
+        """Stop a WriteQueue once its queued writes have run."""
+        pending = queue.depth
+        completed = await self.run_step(name, queue.stop, timeout)
+        left = 0 if completed else queue.depth
+        return {"pending": pending, "flushed": pending - left, "dropped": left}
+
+    def finish(self, report: dict) -> dict:
+        """Add the in-memory state being lost and log the report."""
+        report["state_dropped"] = {}
+        for name, count in _states.items():
+            try:
+                report["state_dropped"][name] = count()
+            except Exception as e:
+                logger.error(f"Could not count {name} at shutdown: {str(e)}")
+        self.report = report
+        dropped = (
+            report["requests"]["cancelled"] + report["background_tasks"]["cancelled"]
+            + report["llm_generations"]["cancelled"]
+            + sum(step.get("dropped", 0) for step in report.get("buffers", {}).values())
+        )
+        lost_state = {name: count for name, count in report["state_dropped"].items() if count}
+        log = logger.warning if dropped or lost_state else logger.info
+        log(
+            f"Shutdown complete: {report['requests']['drained']} requests, "
+            f"{report['background_tasks']['drained']} background tasks and "
+            f"{report['llm_generations']['drained']} LLM generations drained; {dropped} dropped"
+            + (f"; in-memory state lost: {lost_state}" if lost_state else ""),
+            extra={"shutdown": report},
+        )
+        return report
+
+
+class ShutdownMiddleware:
+    """
+    Pure ASGI middleware tracking in-flight requests for the drain, turning
+    new requests away once shutdown has begun, and answering requests the
+    drain cancels with a 503.
+    """
+
+    def __init__(self, app, coordinator: Optional[ShutdownCoordinator] = None):
+        self.app = app
+        self.coordinator = coordinator
+
+    async def __call__(self, scope, receive, send):
+        coordinator = self.coordinator or scope.get("state", {}).get("shutdown_coordinator")
+        if scope["type"] != "http" or coordinator is None:
+            return await self.app(scope, receive, send)
+
+        if not coordinator.accepting:
+            coordinator.rejected += 1
+            await send_unavailable(send)
+            return
+
+        task = asyncio.current_task()
+        state = _RequestState()
+        coordinator._requests[task] = state
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state.response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                state.response_complete = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            if not coordinator.cancelling or state.response_started:
+                raise
+            task.uncancel()
+            coordinator.notified += 1
+            await send_unavailable(send)
+        finally:
+            coordinator._requests.pop(task, None)
+
+
+def setup_shutdown(app) -> None:
+    app.add_middleware(ShutdownMiddleware)
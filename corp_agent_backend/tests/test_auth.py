@@ -1,20 +1,29 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from app import app
-from db.session import get_db, Base
-from scripts.seed_db import main as seed_db
+from db.session import get_db, get_async_db, Base
+from auth import tokens
+from auth.principal import principal_cache
+from db.models import SubscriptionPlan
+from scripts.seed_db import seed_roles, seed_subscription_plans, seed_admin_user
 
-# Create a test database
-TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Create a test database (file-backed so the sync and async engines share it)
+TEST_DB_PATH = "./test_corp_ai.db"
+TEST_SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 engine = create_engine(
     TEST_SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 # Override the get_db dependency
 def override_get_db():
@@ -24,15 +33,32 @@ def override_get_db():
     finally:
         db.close()
 
+# Override the get_async_db dependency
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_db():
     Base.metadata.create_all(bind=engine)
-    seed_db(drop_tables=False)
+    db = TestingSessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
     yield
+    principal_cache.clear()
+    tokens.token_cache.clear()
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    if os.path.exists(TEST_DB_PATH):
+        os.remove(TEST_DB_PATH)
 
 def test_register_and_login():
     # Register a new user
@@ -122,3 +148,84 @@ def test_protected_route_access():
     data = response.json()
     assert data["plan"] in ["free", "pro", "enterprise"]
     assert data["active"] is True
+
+def test_me_served_from_principal_cache_until_subscription_changes():
+    client.post("/auth/register", json={
+        "email": "cached@example.com",
+        "password": "Test@123",
+        "confirm_password": "Test@123",
+        "first_name": "Test",
+        "last_name": "User"
+    })
+    response = client.post("/auth/login", json={"email": "cached@example.com", "password": "Test@123"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        # Login cached the principal, so /me needs no queries at all
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["subscription_plan"] == "basic"
+        assert statements == []
+
+        db = TestingSessionLocal()
+        try:
+            plan_id = db.query(SubscriptionPlan).filter_by(name="professional").one().id
+        finally:
+            db.close()
+        response = client.post("/auth/subscribe", headers=headers, json={"plan_id": plan_id})
+        assert response.status_code == 200
+
+        # The subscription invalidated the cache; the reload is a single query
+        statements.clear()
+        response = client.get("/auth/me", headers=headers)
+        assert response.json()["subscription_plan"] == "professional"
+        assert len(statements) == 1
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+def test_refresh_rotates_and_detects_reuse():
+    response = client.post("/auth/login", json={"email": "admin@corpai.com", "password": "Admin@123"})
+    first = response.json()["refresh_token"]
+    assert first
+
+    response = client.post("/auth/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["role"] == "admin"
+    assert data["access_token"]
+    second = data["refresh_token"]
+    assert second != first
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    # Replaying the rotated token revokes the whole session, including its successor
+    assert client.post("/auth/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": second}).status_code == 401
+
+def test_logout_revokes_refresh_token():
+    response = client.post("/auth/login", json={"email": "admin@corpai.com", "password": "Admin@123"})
+    token = response.json()["refresh_token"]
+    assert client.post("/auth/logout", json={"refresh_token": token}).status_code == 204
+    assert client.post("/auth/refresh", json={"refresh_token": token}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": "not-a-token"}).status_code == 401
+
+def test_verified_token_is_cached_and_revocable(monkeypatch):
+    response = client.post("/auth/login", json={"email": "admin@corpai.com", "password": "Admin@123"})
+    data = response.json()
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+
+    decodes = []
+    real_decode = tokens.jwt.decode
+    monkeypatch.setattr(tokens.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+    for _ in range(3):
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+    # Logging out revokes the access token's jti even though it is cached and unexpired
+    response = client.post("/auth/logout", headers=headers, json={"refresh_token": data["refresh_token"]})
+    assert response.status_code == 204
+    assert client.get("/auth/me", headers=headers).status_code == 401
@@ -0,0 +1,129 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app import app
+from auth import tokens
+from auth.authorization import AuthorizationTable, RouteGroupPolicy, authorization
+from auth.principal import principal_cache
+from db.session import get_db, get_async_db, Base
+from db.models import SubscriptionPlan
+from scripts.seed_db import seed_roles, seed_subscription_plans, seed_admin_user
+
+TEST_DB_PATH = "./test_authorization.db"
+engine = create_engine(f"sqlite:///{TEST_DB_PATH}", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture
+def setup_db(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, override_get_async_db)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
+    yield
+    principal_cache.clear()
+    tokens.token_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    if os.path.exists(TEST_DB_PATH):
+        os.remove(TEST_DB_PATH)
+
+def make_table():
+    table = AuthorizationTable(["basic", "professional", "enterprise"])
+    table.register_route_group("finance", RouteGroupPolicy(roles=frozenset({"finance"})))
+    table.register_route_group("social_media", RouteGroupPolicy(min_plan="professional"))
+    table.register_route_group("chat", RouteGroupPolicy())
+    table.register_tools([
+        {"id": "crm-leads", "requiredSubscription": "basic"},
+        {"id": "hr-job-posting", "requiredSubscription": "professional"},
+        {"id": "legal-contract", "requiredSubscription": "enterprise"},
+    ])
+    table.update(["admin", "user", "finance"], ["basic", "professional", "enterprise"])
+    return table
+
+def test_decisions_follow_roles_and_plans():
+    table = make_table()
+    assert table.decide("user", "basic").tools == {"crm-leads"}
+    assert table.decide("user", "professional").tools == {"crm-leads", "hr-job-posting"}
+    assert table.decide("user", "basic").route_groups == {"chat"}
+    assert table.decide("user", "enterprise").route_groups == {"chat", "social_media"}
+    assert table.decide("finance", None).route_groups == {"chat", "finance"}
+    assert table.decide("finance", None).tools == frozenset()
+    admin = table.decide("admin", None)
+    assert admin.tools == {"crm-leads", "hr-job-posting", "legal-contract"}
+    assert admin.route_groups == {"chat", "finance", "social_media"}
+
+def test_table_is_precomputed_and_rebuilt_when_plans_change():
+    table = make_table()
+    entries = len(table._decisions)
+    assert entries == 3 * 4  # roles x (plans + no plan)
+    assert table.decide("user", "basic") is table.decide("user", "basic")
+
+    # A new top tier, and enterprise no longer the most expensive
+    assert table.update(["admin", "user", "finance"], ["basic", "professional", "enterprise", "ultimate"])
+    assert table.decide("user", "ultimate").tools == {"crm-leads", "hr-job-posting", "legal-contract"}
+    assert not table.update(["admin", "user", "finance"], ["basic", "professional", "enterprise", "ultimate"])
+    # Unknown plans get nothing plan-gated
+    assert table.decide("user", "gold").tools == frozenset()
+
+def test_tool_plans_are_enforced_on_routes(setup_db):
+    client.post("/auth/register", json={
+        "email": "basic@example.com", "password": "Test@123", "confirm_password": "Test@123",
+        "first_name": "Basic", "last_name": "User"
+    })
+    token = client.post("/auth/login", json={"email": "basic@example.com", "password": "Test@123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/tools/crm-leads", headers=headers).status_code == 200
+    response = client.get("/tools/legal-contract", headers=headers)
+    assert response.status_code == 403
+    assert "enterprise" in response.json()["detail"]
+    assert client.post("/tools/contract_review", json={"text": "x"}, headers=headers).status_code == 403
+    assert client.post("/tools/contract_review", json={"text": "x"}).status_code == 401
+
+def test_admin_can_reload_the_table(setup_db):
+    token = client.post("/auth/login", json={"email": "admin@corpai.com", "password": "Admin@123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    db = TestingSessionLocal()
+    try:
+        db.add(SubscriptionPlan(name="starter", price=0.0, features="", duration_days=30))
+        db.commit()
+    finally:
+        db.close()
+    previous = authorization.roles, authorization.plans
+    try:
+        response = client.post("/admin/authorization/reload", headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["changed"] is True
+        assert body["plans"][-2:] == ["professional", "enterprise"]
+        assert "starter" in body["plans"]
+        assert "social_media" in client.get("/admin/authorization", headers=headers).json()["route_groups"]
+    finally:
+        authorization.update(*previous)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app import app
+from auth import tokens
+from auth import provisioning
+from auth.principal import principal_cache
+from config import settings
+from db.session import get_db, get_async_db, Base
+from db.models import User, UserSubscription
+from scripts.seed_db import seed_roles, seed_subscription_plans, seed_admin_user
+
+TEST_DB_PATH = "./test_bulk_provisioning.db"
+engine = create_engine(f"sqlite:///{TEST_DB_PATH}", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup_db(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, override_get_async_db)
+    # Small batches and pool so the test exercises more than one of each
+    monkeypatch.setattr(settings, "PROVISIONING_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "PROVISIONING_HASH_WORKERS", 2)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        seed_roles(db)
+        seed_subscription_plans(db)
+        seed_admin_user(db)
+    finally:
+        db.close()
+    yield
+    asyncio.run(provisioning.shutdown_hash_pool())
+    principal_cache.clear()
+    tokens.token_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    if os.path.exists(TEST_DB_PATH):
+        os.remove(TEST_DB_PATH)
+
+def login(email, password):
+    return client.post("/auth/login", json={"email": email, "password": password})
+
+def admin_headers():
+    token = login("admin@corpai.com", "Admin@123").json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_bulk_json_reports_bad_rows_without_aborting():
+    users = [
+        {"email": "one@example.com", "password": "Bulk@1234", "first_name": "One"},
+        {"email": "two@example.com", "password": "weak"},
+        {"email": "three@example.com", "password": "Bulk@1234", "role": "wizard"},
+        {"email": "one@example.com", "password": "Bulk@1234"},
+        {"email": "admin@corpai.com", "password": "Bulk@1234"},
+        {"email": "four@example.com", "password": "Bulk@1234", "plan": "professional"},
+        {"email": "five@example.com", "role": "admin"},
+    ]
+    response = client.post("/admin/users/bulk", json={"users": users}, headers=admin_headers())
+    assert response.status_code == 200
+    report = response.json()
+    assert report["total"] == 7
+    assert report["created"] == 3
+    assert [(e["row"], e["email"]) for e in report["errors"]] == [
+        (2, "two@example.com"),
+        (3, "three@example.com"),
+        (4, "one@example.com"),
+        (5, "admin@corpai.com"),
+    ]
+    assert "Unknown role" in report["errors"][1]["error"]
+
+    assert login("one@example.com", "Bulk@1234").status_code == 200
+    assert login("four@example.com", "Bulk@1234").json()["subscription_plan"] == "professional"
+
+    db = TestingSessionLocal()
+    try:
+        five = db.execute(select(User).where(User.email == "five@example.com")).scalar_one()
+        assert five.hashed_password is None
+        # Every created user gets a subscription; the plan defaults to basic like /auth/register
+        assert db.query(UserSubscription).count() == 3
+    finally:
+        db.close()
+
+def test_bulk_csv_upload():
+    csv_body = (
+        "email,password,first_name,plan\n"
+        "csv1@example.com,Bulk@1234,Csv,\n"
+        "not-an-email,Bulk@1234,Bad,\n"
+        "csv2@example.com,,Oauth,basic\n"
+    )
+    headers = {**admin_headers(), "Content-Type": "text/csv"}
+    response = client.post("/admin/users/bulk", content=csv_body, headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["row"] == 2
+    assert login("csv1@example.com", "Bulk@1234").status_code == 200
+
+def test_existing_emails_match_case_insensitively_and_the_hash_pool_is_reused():
+    users = [{"email": "Admin@CorpAI.com", "password": "Bulk@1234"}, {"email": "six@example.com", "password": "Bulk@1234"}]
+    report = client.post("/admin/users/bulk", json=users, headers=admin_headers()).json()
+    assert report["created"] == 1
+    assert report["errors"][0]["row"] == 1 and report["errors"][0]["error"] == "Email already registered"
+    pool = provisioning.get_hash_pool()
+
+    report = client.post("/admin/users/bulk", json=[{"email": "SIX@example.com", "password": "Bulk@1234"}], headers=admin_headers()).json()
+    assert report["created"] == 0 and report["errors"][0]["error"] == "Email already registered"
+    client.post("/admin/users/bulk", json=[{"email": "seven@example.com", "password": "Bulk@1234"}], headers=admin_headers())
+    assert provisioning.get_hash_pool() is pool
+
+def test_bulk_provisioning_requires_admin_and_limits_rows(monkeypatch):
+    client.post("/auth/register", json={
+        "email": "plain@example.com", "password": "Test@123", "confirm_password": "Test@123",
+        "first_name": "Plain", "last_name": "User"
+    })
+    token = login("plain@example.com", "Test@123").json()["access_token"]
+    response = client.post("/admin/users/bulk", json=[], headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+    monkeypatch.setattr(settings, "PROVISIONING_MAX_ROWS", 1)
+    response = client.post(
+        "/admin/users/bulk", json=[{"email": "a@example.com"}, {"email": "b@example.com"}], headers=admin_headers()
+    )
+    assert response.status_code == 413
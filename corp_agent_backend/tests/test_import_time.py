@@ -0,0 +1,40 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# About 1.1 s here; raise it with IMPORT_TIME_BUDGET_MS on slower machines
+IMPORT_TIME_BUDGET_MS = int(os.getenv("IMPORT_TIME_BUDGET_MS", "2500"))
+
+# Imported on first use only, never by `import app`
+HEAVY_MODULES = {"torch", "transformers", "pandas", "plotly", "reportlab", "langchain", "langchain_core"}
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def test_app_imports_within_budget(tmp_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'import_time.db'}"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    cumulative_us = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            cumulative_us[match.group(4)] = int(match.group(2))
+
+    heavy = sorted(name for name in cumulative_us if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"imported by `import app`: {heavy}"
+
+    slowest = sorted(cumulative_us.items(), key=lambda item: item[1], reverse=True)[1:11]
+    app_ms = cumulative_us["app"] / 1000
+    assert app_ms <= IMPORT_TIME_BUDGET_MS, (
+        f"`import app` took {app_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS} ms); slowest: "
+        + ", ".join(f"{name} {us / 1000:.0f} ms" for name, us in slowest)
+    )
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import gzip
+import zlib
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+from serialization import FastJSONResponse, dumps
+
+LARGE = {"rows": [{"id": i, "value": i * 1.5} for i in range(200)]}
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/large")
+async def large():
+    return LARGE
+
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+
+@app.get("/analysis")
+async def analysis():
+    return FastJSONResponse({
+        "metrics": {"sum": np.int64(12), "mean": np.float32(1.5), "std": float("nan")},
+        "values": np.arange(3),
+        "trend": {np.int64(2024): Decimal("1.25"), datetime.date(2024, 1, 1): {"a", }},
+    })
+
+
+client = TestClient(app)
+
+
+def test_numpy_values_and_non_string_keys_are_serialized():
+    body = client.get("/analysis", headers={"accept-encoding": "identity"}).json()
+    assert body == {
+        "metrics": {"sum": 12, "mean": 1.5, "std": None},
+        "values": [0, 1, 2],
+        "trend": {"2024": 1.25, "2024-01-01": ["a"]},
+    }
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_large_responses_are_compressed_with_the_accepted_encoding(monkeypatch):
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+    response = client.get("/large", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(dumps(LARGE))
+    assert response.json() == LARGE  # httpx decodes it
+
+    raw = client.get("/large", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.content == dumps(LARGE)
+
+
+def test_small_responses_are_sent_as_they_are():
+    response = client.get("/small", headers={"accept-encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+    messages = []
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        for i in range(3):
+            await send({"type": "http.response.body", "body": f"chunk {i}\n".encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(streaming_app, minimum_size=500)(scope, None, send))
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk is flushed, so the client can decode it as soon as it arrives
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(bodies[0]["body"]) == b"chunk 0\n"
+    assert gzip.decompress(b"".join(m["body"] for m in bodies)) == b"chunk 0\nchunk 1\nchunk 2\n"
+
+
+def test_encoding_negotiation(monkeypatch):
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", True)
+    assert negotiate_encoding("gzip, deflate, br") == b"br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0") == b"gzip"
+    assert negotiate_encoding("identity") is None
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+    assert negotiate_encoding("br, *;q=0.1") == b"gzip"
+
+
+def test_brotli_when_installed():
+    pytest.importorskip("brotli")
+    response = client.get("/large", headers={"accept-encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == LARGE  # httpx decodes it with brotli
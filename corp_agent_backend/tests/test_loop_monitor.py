@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from loop_monitor import EventLoopBlockedError, LoopLagMonitor, LoopMonitorMiddleware
+
+
+def build_client(monitor: LoopLagMonitor) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(LoopMonitorMiddleware, monitor=monitor)
+
+    @app.on_event("startup")
+    async def start_monitor():
+        await monitor.start()
+
+    @app.on_event("shutdown")
+    async def stop_monitor():
+        await monitor.stop()
+
+    @app.get("/reports/{report_id}")
+    async def build_report(report_id: str):
+        time.sleep(0.25)  # blocking call inside an async route
+        return {"report_id": report_id}
+
+    @app.get("/fine")
+    async def fine():
+        await asyncio.sleep(0.25)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_blocking_call_is_attributed_to_its_route():
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=50)
+    with build_client(monitor) as client:
+        assert client.get("/fine").status_code == 200
+        assert client.get("/reports/7").status_code == 200
+        wait_for(lambda: monitor.blocks >= 1)
+        stats = monitor.stats()
+
+    assert stats["blocks"] == 1
+    event = stats["recent"][0]
+    assert event["route"] == "/reports/{report_id}"
+    assert event["method"] == "GET" and event["path"] == "/reports/7"
+    assert event["duration_ms"] >= 200
+    assert any("build_report" in frame and "time.sleep(0.25)" in frame for frame in event["stack"])
+    assert stats["max_lag_ms"] >= 200
+
+
+def test_strict_mode_fails_blocking_requests():
+    monitor = LoopLagMonitor(interval_ms=10, threshold_ms=1000, strict_ms=100)
+    with build_client(monitor) as client:
+        assert client.get("/fine").status_code == 200
+        with pytest.raises(EventLoopBlockedError, match=r"GET /reports/\{report_id\} blocked the event loop"):
+            client.get("/reports/8")
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("prometheus_client")
+
+from app import app
+from auth.auth_controller import get_current_user
+from auth.principal import Principal
+from metrics import llm_call, timed_tool
+from tools import create_lead
+
+client = TestClient(app)
+
+
+def scrape() -> str:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return response.text
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """Value of the series with exactly these labels, or 0 if absent."""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f"{name}{{{wanted}}} " if labels else f"{name} "
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_http_metrics_use_route_templates():
+    before = scrape()
+    for tool_id in ("does-not-exist-1", "does-not-exist-2", "does-not-exist-3"):
+        client.get(f"/tools/{tool_id}")
+    client.get("/no/such/path/12345")
+    after = scrape()
+
+    labels = {"method": "GET", "route": "/tools/{tool_id}", "status": "4xx"}
+    assert sample(after, "corp_ai_http_requests_total", **labels) - sample(before, "corp_ai_http_requests_total", **labels) == 3
+    assert "does-not-exist" not in after
+    assert "/no/such/path" not in after
+    assert sample(after, "corp_ai_http_requests_total", method="GET", route="unmatched", status="4xx") >= 1
+    assert 'corp_ai_http_request_duration_seconds_bucket{le="0.001",method="GET",route="/tools/{tool_id}"}' in after
+    assert sample(after, "corp_ai_http_requests_in_progress", method="GET") == 1  # the scrape itself
+
+
+def test_tool_llm_pool_and_cache_metrics():
+    before = scrape()
+    create_lead("Acme", "ops@acme.test")
+
+    @timed_tool
+    async def failing_tool():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(failing_tool())
+
+    with llm_call("test_model", "x" * 400) as call:
+        call.first_token()
+        call.completed("y" * 200)
+    after = scrape()
+
+    def delta(name: str, **labels) -> float:
+        # Other tests feed the same process-wide series, so only this test's increments count
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    assert delta("corp_ai_tool_duration_seconds_count", tool="create_lead") == 1
+    assert sample(after, "corp_ai_tool_errors_total", tool=failing_tool.__qualname__) == 1
+    assert delta("corp_ai_llm_tokens_total", direction="in", model="test_model") == 100
+    assert delta("corp_ai_llm_tokens_total", direction="out", model="test_model") == 50
+    assert sample(after, "corp_ai_llm_queue_depth", model="test_model") == 0
+    assert delta("corp_ai_llm_time_to_first_token_seconds_count", model="test_model") == 1
+    assert delta("corp_ai_llm_tokens_per_second_count", model="test_model") == 1
+    assert 'corp_ai_db_pool_checkouts_total{pool="sync"}' in after
+    assert 'corp_ai_cache_hit_ratio{cache="principal"}' in after
+
+
+def test_db_pool_health_is_admin_only(monkeypatch):
+    def principal(role: str) -> Principal:
+        return Principal(
+            id=1, email=f"{role}@example.com", role_id=1, role=role, subscription_plan="basic",
+            subscription_end_date=None, is_active=True, is_verified=True
+        )
+
+    assert client.get("/health/db").status_code == 401
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal("user"))
+    assert client.get("/health/db").status_code == 403
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal("admin"))
+    response = client.get("/health/db")
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from auth import auth_controller, oauth_routes
+from auth.http_client import close_http_client, get_http_client
+from config import settings
+from db.session import Base, get_db
+from scripts.seed_db import seed_roles
+
+PROVIDER_DELAY = 0.4
+
+
+class MockProvider(BaseHTTPRequestHandler):
+    """Minimal Google/GitHub stand-in; behaviour is driven by the class attributes."""
+    failures_left = 0
+    hits = []
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        MockProvider.hits.append(self.path)
+        if MockProvider.failures_left > 0:
+            MockProvider.failures_left -= 1
+            return self.reply(503, {"error": "unavailable"})
+        time.sleep(PROVIDER_DELAY)
+        if self.path == "/github/user":
+            self.reply(200, {"id": 42, "name": "Octo Cat", "email": None, "avatar_url": "http://avatar"})
+        elif self.path == "/github/emails":
+            self.reply(200, [{"email": "other@example.com"}, {"email": "octo@example.com", "primary": True}])
+        elif self.path == "/google/userinfo":
+            self.reply(200, {"sub": "g-1", "email": "googler@example.com", "name": "Goo Gler"})
+        else:
+            self.reply(404, {})
+
+    def do_POST(self):
+        MockProvider.hits.append(self.path)
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        if form.get("code") == ["good-code"]:
+            self.reply(200, {"access_token": "provider-token"})
+        else:
+            self.reply(400, {"error": "bad_verification_code"})
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockProvider)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setitem(auth_controller.GITHUB_CONFIG, "userinfo_uri", f"{base}/github/user")
+    monkeypatch.setitem(auth_controller.GITHUB_CONFIG, "email_uri", f"{base}/github/emails")
+    monkeypatch.setitem(auth_controller.GOOGLE_CONFIG, "userinfo_uri", f"{base}/google/userinfo")
+    monkeypatch.setitem(auth_controller.GOOGLE_CONFIG, "token_uri", f"{base}/google/token")
+    monkeypatch.setattr(settings, "OAUTH_HTTP_BACKOFF", 0.01)
+    MockProvider.failures_left = 0
+    MockProvider.hits = []
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await close_http_client()
+    return asyncio.run(scenario())
+
+
+def test_github_profile_and_emails_are_fetched_concurrently(provider):
+    started = time.perf_counter()
+    user_data = run(auth_controller.get_github_user_info("token"))
+    elapsed = time.perf_counter() - started
+
+    assert user_data["email"] == "octo@example.com"
+    assert sorted(MockProvider.hits) == ["/github/emails", "/github/user"]
+    # Sequential fetches would take at least two provider delays
+    assert elapsed < PROVIDER_DELAY * 1.9
+
+
+def test_transient_provider_errors_are_retried(provider):
+    MockProvider.failures_left = 2
+    user_data = run(auth_controller.get_google_user_info("token"))
+    assert user_data["email"] == "googler@example.com"
+    assert MockProvider.hits.count("/google/userinfo") == 3
+
+
+def test_google_callback_uses_async_client(provider, tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'oauth.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    seed_roles(db)
+    db.close()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(oauth_routes.router)
+    app.dependency_overrides[get_db] = override_get_db
+    async def accept_state(state, provider):
+        return True
+    monkeypatch.setattr(oauth_routes, "verify_oauth_state", accept_state)
+
+    client = TestClient(app)
+    response = client.get("/auth/google/callback?code=good-code&state=s", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.cookies.get("access_token")
+    assert "/google/token" in MockProvider.hits
+
+    response = client.get("/auth/google/callback?code=bad-code&state=s", follow_redirects=False)
+    assert response.status_code == 400
+    engine.dispose()
+
+
+def test_each_loop_gets_its_own_client_and_closing_closes_them_all():
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+
+    async def get_client():
+        return get_http_client()
+
+    async def scenario():
+        other = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result()
+        client = get_http_client()
+        assert client is not other and get_http_client() is client
+        await close_http_client()
+        return client, other
+
+    try:
+        client, other = asyncio.run(scenario())
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
+    assert client.is_closed and other.is_closed
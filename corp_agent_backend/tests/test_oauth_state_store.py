@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from auth.state_store import MemoryStateStore, RedisStateStore
+
+
+def test_memory_store_is_single_use_and_expires():
+    async def scenario():
+        store = MemoryStateStore(ttl_seconds=0.05)
+        await store.put("a", {"provider": "google"})
+        await store.put("b", {"provider": "github"})
+        first = await store.pop("a")
+        again = await store.pop("a")
+        await asyncio.sleep(0.06)
+        expired = await store.pop("b")
+        return first, again, expired, store
+
+    first, again, expired, store = asyncio.run(scenario())
+    assert first == {"provider": "google"}
+    assert again is None
+    assert expired is None
+    assert store.expired == 1
+
+
+def test_memory_store_evicts_oldest_when_full():
+    async def scenario():
+        store = MemoryStateStore(ttl_seconds=60, max_entries=3)
+        for state in "abcde":
+            await store.put(state, {"provider": "google"})
+        return store, [await store.pop(state) is not None for state in "abcde"]
+
+    store, present = asyncio.run(scenario())
+    assert present == [False, False, True, True, True]
+    assert store.evicted == 2
+
+
+def test_sweeper_removes_abandoned_states():
+    async def scenario():
+        store = MemoryStateStore(ttl_seconds=0.02, sweep_interval=0.05)
+        await store.start()
+        for i in range(100):
+            await store.put(f"abandoned-{i}", {"provider": "github"})
+        await asyncio.sleep(0.12)
+        await store.stop()
+        return store
+
+    store = asyncio.run(scenario())
+    assert len(store) == 0
+    assert store.expired == 100
+
+
+def test_redis_store_is_shared_and_single_use():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        # Two workers, each with its own client to the same Redis
+        worker_a = RedisStateStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), ttl_seconds=60)
+        worker_b = RedisStateStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), ttl_seconds=60)
+        await worker_a.put("s1", {"provider": "google"})
+        ttl = await worker_a.client.ttl(f"{worker_a.prefix}:s1")
+        from_b = await worker_b.pop("s1")
+        again = await worker_a.pop("s1")
+        await worker_a.stop()
+        await worker_b.stop()
+        return ttl, from_b, again
+
+    ttl, from_b, again = asyncio.run(scenario())
+    assert 0 < ttl <= 60
+    assert from_b == {"provider": "google"}
+    assert again is None
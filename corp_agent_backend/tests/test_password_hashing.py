@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from auth.hashing import MIN_BCRYPT_ROUNDS, PasswordHasher, calibrate_bcrypt_rounds, verify_password
+
+
+def test_calibrated_rounds_stay_in_bounds():
+    assert calibrate_bcrypt_rounds(target_ms=1) == MIN_BCRYPT_ROUNDS
+    assert MIN_BCRYPT_ROUNDS <= calibrate_bcrypt_rounds(target_ms=100) <= 16
+
+
+def test_hash_runs_off_loop_and_rejects_when_queue_full():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        # Occupy the only slot with a call that blocks until released
+        blocked = asyncio.ensure_future(hasher._run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as busy:
+            await hasher.hash("Test@123")
+        release.set()
+        await blocked
+        return busy.value, await hasher.hash("Test@123")
+
+    try:
+        error, hashed = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert error.status_code == 503
+    assert hasher.rejected == 1
+    assert verify_password("Test@123", hashed)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from auth.auth_controller import get_current_user
+from auth.principal import Principal
+from profiler import ProfilerBusyError, SamplingProfiler
+
+client = TestClient(app)
+
+
+def principal(role: str) -> Principal:
+    return Principal(
+        id=1, email=f"{role}@example.com", role_id=1, role=role, subscription_plan="basic",
+        subscription_end_date=None, is_active=True, is_verified=True
+    )
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profile_finds_the_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy worker")
+    worker.start()
+    profiler = SamplingProfiler()
+    try:
+        profile = profiler.profile(seconds=0.3, hz=200)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.samples > 10
+    busy = [line for line in profile.collapsed().splitlines() if line.startswith("busy_worker;")]
+    assert busy and all("busy_loop (test_profiler.py:" in line for line in busy)
+    top = profile.top(5)
+    assert any("test_profiler.py" in row["function"] for row in top)
+    assert all(row["self"] <= row["total"] for row in top)
+    assert not profiler.running
+
+    # The main thread spent the whole profile parked in join(), so it's left out by default
+    assert not any(stack.startswith("MainThread;") for stack in profile.stacks)
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    thread, _ = profiler.start(seconds=5, hz=10)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.start(seconds=1, hz=10)
+    finally:
+        profiler.stop()
+        thread.join()
+    assert not profiler.running
+
+
+def test_profile_endpoint_is_admin_only(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal("user"))
+    assert client.get("/debug/profile?seconds=0.1").status_code == 403
+
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal("admin"))
+    assert client.get("/debug/profile?seconds=3600").status_code == 400
+
+    response = client.get("/debug/profile?seconds=0.2&hz=100&top=5")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["samples"] >= 1
+    assert len(body["top"]) <= 5
+
+    response = client.get("/debug/profile?seconds=0.1&format=collapsed&include_idle=true")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="profile.folded"'
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
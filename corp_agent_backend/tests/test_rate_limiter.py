@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import middleware
+from auth.tokens import create_access_token
+from config import settings
+from rate_limiter import MemoryRateLimiter, RateLimit, RateLimitPolicy, RedisRateLimiter, parse_rules
+
+
+def test_gcra_allows_burst_then_steady_rate():
+    limiter = MemoryRateLimiter()
+    limit = RateLimit(times=5, seconds=10)
+    assert [limiter.check("k", limit, now=100.0) for _ in range(5)] == [0.0] * 5
+    assert limiter.check("k", limit, now=100.0) == pytest.approx(2.0)
+    # One request is earned back every seconds / times
+    assert limiter.check("k", limit, now=101.9) > 0
+    assert limiter.check("k", limit, now=102.0) == 0.0
+    assert limiter.check("k", limit, now=102.0) > 0
+    # Other clients are counted separately
+    assert limiter.check("other", limit, now=102.0) == 0.0
+
+
+def test_memory_limiter_stays_bounded():
+    limiter = MemoryRateLimiter(max_keys=100)
+    limit = RateLimit(times=1, seconds=60)
+    for i in range(1000):
+        limiter.check(f"client-{i}", limit, now=0.0)
+    assert len(limiter) <= 100
+    # The most recent client is still limited
+    assert limiter.check("client-999", limit, now=0.0) > 0
+
+
+def test_policy_prefers_the_most_specific_rule():
+    policy = RateLimitPolicy(
+        parse_rules("chat:basic=20/60, chat:*=5/60, default:enterprise=1000/60"),
+        default=RateLimit(100, 3600),
+    )
+    assert policy.limit_for("chat", "basic") == RateLimit(20, 60)
+    assert policy.limit_for("chat", "anonymous") == RateLimit(5, 60)
+    assert policy.limit_for("tools", "enterprise") == RateLimit(1000, 60)
+    assert policy.limit_for("tools", "basic") == RateLimit(100, 3600)
+    with pytest.raises(ValueError):
+        parse_rules("chat=20")
+
+
+def test_redis_limiter_is_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        worker_a = RedisRateLimiter(fakeredis.aioredis.FakeRedis(server=server))
+        worker_b = RedisRateLimiter(fakeredis.aioredis.FakeRedis(server=server))
+        limit = RateLimit(times=4, seconds=3600)
+        results = [await worker.hit("chat:user@example.com", limit) for worker in (worker_a, worker_b) * 3]
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[:4] == [0.0] * 4
+    assert all(wait > 0 for wait in results[4:])
+
+
+def test_redis_outage_falls_back_to_memory():
+    class DownRedis:
+        def pipeline(self, transaction=False):
+            raise ConnectionError("redis is down")
+
+    async def scenario():
+        limiter = RedisRateLimiter(DownRedis())
+        limit = RateLimit(times=2, seconds=60)
+        return [await limiter.hit("k", limit) for _ in range(3)]
+
+    results = asyncio.run(scenario())
+    assert results[:2] == [0.0, 0.0]
+    assert results[2] > 0
+
+
+def test_rate_limit_dependency_uses_the_callers_tier(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(middleware, "rate_limiter", MemoryRateLimiter())
+    monkeypatch.setattr(middleware, "rate_limit_policy", RateLimitPolicy(
+        parse_rules("test:anonymous=1/60,test:enterprise=3/60"), default=RateLimit(100, 60)
+    ))
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(middleware.rate_limit(group="test"))])
+    async def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.get("/limited").status_code == 200
+    response = client.get("/limited")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+
+    token = create_access_token({"sub": "big@example.com", "plan": "enterprise"})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert [client.get("/limited", headers=headers).status_code for _ in range(4)] == [200, 200, 200, 429]
@@ -0,0 +1,98 @@
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+
+import routers.auth
+from app import app
+from auth.auth_controller import get_current_user
+from auth.principal import Principal
+from reference_data import ReferenceData, etag_matches, reference_data
+from routers.tools import TOOLS
+
+client = TestClient(app)
+
+PLANS = [
+    {"id": "1", "name": "basic", "description": None, "price": 0.0, "duration_days": 30, "features": "chat"},
+    {"id": "2", "name": "professional", "description": None, "price": 49.0, "duration_days": 30, "features": "tools"},
+]
+
+
+@pytest.fixture
+def basic_user(monkeypatch):
+    principal = Principal(
+        id=1, email="basic@example.com", role_id=2, role="user", subscription_plan="basic",
+        subscription_end_date=None, is_active=True, is_verified=True
+    )
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal)
+
+
+def test_catalog_is_served_with_an_etag_and_revalidated(basic_user):
+    response = client.get("/tools", headers={"accept-encoding": "identity"})
+    assert response.status_code == 200
+    assert [tool["id"] for tool in response.json()["tools"]] == [tool["id"] for tool in TOOLS]
+    assert response.json()["tools"][0]["fields"][0]["options"] is None  # same shape as the response model gave
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    cached = client.get("/tools", headers={"accept-encoding": "identity", "if-none-match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    assert client.get("/tools", headers={"if-none-match": '"stale"'}).status_code == 200
+
+
+def test_large_bodies_are_served_precompressed(basic_user):
+    identity = client.get("/tools", headers={"accept-encoding": "identity"})
+    response = client.get("/tools", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == identity.content  # httpx decodes it
+    assert gzip.decompress(reference_data.catalog_body.variants[b"gzip"][0]) == identity.content
+
+    # An ETag from any encoding of the current body revalidates
+    revalidated = client.get("/tools", headers={"accept-encoding": "gzip", "if-none-match": identity.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_category_and_tool_lookups_use_the_index(basic_user):
+    crm = client.get("/tools/category/crm").json()["tools"]
+    assert [tool["id"] for tool in crm] == [tool["id"] for tool in TOOLS if tool["category"] == "crm"]
+    assert client.get("/tools/category/nothing").json() == {"tools": []}
+
+    response = client.get("/tools/crm-leads")
+    assert response.json()["id"] == "crm-leads"
+    assert client.get("/tools/crm-leads", headers={"if-none-match": response.headers["etag"]}).status_code == 304
+    assert client.get("/tools/legal-contract").status_code == 403
+    assert client.get("/tools/missing").status_code == 404
+    assert {tool["id"] for tool in reference_data.tools_by_plan["enterprise"]} >= {"legal-contract"}
+
+
+def test_plans_are_cached_until_a_reload_changes_them(monkeypatch):
+    plans = ReferenceData()
+    plans.update([(1, "admin"), (2, "user")], PLANS)
+    monkeypatch.setattr(routers.auth, "reference_data", plans)
+
+    response = client.get("/auth/subscription-plans")
+    assert response.json() == PLANS
+    etag = response.headers["etag"]
+    assert client.get("/auth/subscription-plans", headers={"if-none-match": etag}).status_code == 304
+
+    assert not plans.update([(1, "admin"), (2, "user")], PLANS)
+    assert plans.update([(1, "admin"), (2, "user")], PLANS + [
+        {"id": "3", "name": "enterprise", "description": None, "price": 99.0, "duration_days": 30, "features": "all"}
+    ])
+    refreshed = client.get("/auth/subscription-plans", headers={"if-none-match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert plans.plans_by_name["enterprise"]["id"] == "3" and plans.roles_by_name["user"] == 2
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', ['"b"'])
+    assert etag_matches("*", ['"a"'])
+    assert not etag_matches(None, ['"a"'])
+    assert not etag_matches('"a"', ['"b"'])
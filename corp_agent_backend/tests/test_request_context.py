@@ -0,0 +1,124 @@
+import json
+import logging
+import queue
+import sys
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import logging_config
+from logging_config import BatchingQueueListener, JsonFormatter, RequestContextQueueHandler
+from middleware import RequestContextMiddleware
+
+app = FastAPI()
+app.add_middleware(RequestContextMiddleware)
+route_logger = logging.getLogger("corp_ai.tests.request_context")
+
+
+@app.get("/items/{item_id}")
+async def get_item(item_id: str, request: Request):
+    route_logger.info(f"looking up {item_id}")
+    return {"request_id": request.state.request_id}
+
+
+@app.get("/boom")
+async def boom():
+    raise RuntimeError("boom")
+
+
+client = TestClient(app)
+
+
+def test_one_request_id_per_request():
+    response = client.get("/items/1")
+    request_id = response.headers["x-request-id"]
+    assert response.json() == {"request_id": request_id}
+    assert float(response.headers["x-process-time"]) >= 0
+
+    assert client.get("/items/1").headers["x-request-id"] != request_id
+    # A caller's id is kept when it looks like one, replaced otherwise
+    assert client.get("/items/1", headers={"X-Request-ID": "edge-abc.123"}).headers["x-request-id"] == "edge-abc.123"
+    assert client.get("/items/1", headers={"X-Request-ID": "bad id\nvalue"}).headers["x-request-id"] != "bad id\nvalue"
+
+
+def test_unhandled_exception_returns_500_with_request_id(caplog):
+    with caplog.at_level(logging.INFO, logger="corp_ai.access"):
+        response = client.get("/boom")
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error", "request_id": response.headers["x-request-id"]}
+
+    errors = [r for r in caplog.records if r.name == "corp_ai.access" and r.levelno == logging.ERROR]
+    assert len(errors) == 1 and errors[0].exc_info is not None
+    access = [r for r in caplog.records if r.name == "corp_ai.access" and r.levelno == logging.INFO]
+    assert access[-1].route == "/boom" and access[-1].status == 500
+
+
+def test_queued_records_carry_the_request_id():
+    log_queue = queue.SimpleQueue()
+    handler = RequestContextQueueHandler(log_queue)
+    access_logger = logging.getLogger("corp_ai.access")
+    route_logger.addHandler(handler)
+    access_logger.addHandler(handler)
+    route_logger.setLevel(logging.INFO)
+    access_logger.setLevel(logging.INFO)
+    try:
+        response = client.get("/items/42")
+    finally:
+        route_logger.removeHandler(handler)
+        access_logger.removeHandler(handler)
+
+    records = [log_queue.get_nowait() for _ in range(log_queue.qsize())]
+    assert {r.request_id for r in records} == {response.headers["x-request-id"]}
+    lines = [json.loads(JsonFormatter().format(r)) for r in records]
+    assert lines[0]["message"] == "looking up 42"
+    assert lines[-1]["route"] == "/items/{item_id}"
+    assert lines[-1]["status"] == 200
+    assert lines[-1]["request_id"] == response.headers["x-request-id"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = RequestContextQueueHandler(queue.SimpleQueue(), maxsize=1)
+    record = logging.LogRecord("corp_ai", logging.INFO, __file__, 1, "message %s", ("arg",), None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "message arg"
+
+
+def test_json_formatter_includes_exceptions():
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        record = logging.LogRecord("corp_ai", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+    handler = RequestContextQueueHandler(queue.Queue())
+    entry = json.loads(JsonFormatter().format(handler.prepare(record)))
+    assert entry["level"] == "ERROR"
+    assert "ValueError: bad" in entry["exception"]
+
+
+def test_listener_writes_batches_and_drains_on_stop():
+    import io
+
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(io.StringIO())
+    output.setFormatter(JsonFormatter())
+    listener = BatchingQueueListener(log_queue, output, interval=60)
+    listener.start()
+    handler = RequestContextQueueHandler(log_queue)
+    for i in range(3):
+        handler.handle(logging.LogRecord("corp_ai", logging.INFO, __file__, 1, "line %d", (i,), None))
+    assert output.stream.getvalue() == ""  # nothing written until the next flush
+
+    listener.stop()
+    lines = [json.loads(line) for line in output.stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["line 0", "line 1", "line 2"]
+
+
+def test_logging_restarted_after_a_stop_writes_each_record_once():
+    root = logging.getLogger()
+    logging_config.configure_logging()  # the app module normally has already
+    logging_config.stop_logging()
+    logging_config.configure_logging()
+    # pytest's capture handlers subclass StreamHandler, so compare exact types
+    ours = [handler for handler in root.handlers if type(handler) in (logging.StreamHandler, RequestContextQueueHandler)]
+    assert ours == [logging_config.queue_handler]
@@ -0,0 +1,97 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import server_timing
+from metrics import llm_call
+from middleware import RequestContextMiddleware
+from server_timing import instrument_engine_timing, timed
+
+engine = create_engine("sqlite://")
+instrument_engine_timing(engine)
+async_engine = create_async_engine("sqlite+aiosqlite://")
+instrument_engine_timing(async_engine.sync_engine)
+
+
+@timed("render")
+def render_chart():
+    return b"png"
+
+
+app = FastAPI()
+app.add_middleware(RequestContextMiddleware)
+
+
+@app.get("/report")
+def report():
+    # A sync route: runs in a threadpool worker, in a copy of the request's context
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    with timed("retrieval"):
+        pass
+    with llm_call("test_model", "prompt") as call:
+        call.first_token()
+        call.completed("answer")
+    render_chart()
+    return {"ok": True}
+
+
+@app.get("/async-db")
+async def async_db():
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return {"ok": True}
+
+
+@app.get("/plain")
+async def plain():
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def parse(header: str) -> dict:
+    metrics = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+def test_server_timing_header_breaks_down_the_request(caplog):
+    with caplog.at_level(logging.INFO, logger="corp_ai.access"):
+        response = client.get("/report")
+    metrics = parse(response.headers["server-timing"])
+
+    assert list(metrics) == ["db", "llm", "llm_prefill", "llm_decode", "retrieval", "render", "app"]
+    assert metrics["db"]["desc"] == '"2 queries"'
+    assert all(float(m["dur"]) >= 0 for m in metrics.values())
+    assert float(metrics["app"]["dur"]) >= float(metrics["llm"]["dur"])
+
+    access = [r for r in caplog.records if r.name == "corp_ai.access"][-1]
+    assert access.timings["db"]["count"] == 2
+    assert access.timings["render"]["count"] == 1
+    assert set(access.timings) == set(metrics) - {"app"}
+
+
+def test_async_engine_queries_are_counted():
+    metrics = parse(client.get("/async-db").headers["server-timing"])
+    assert metrics["db"]["desc"] == '"1 query"'
+
+
+def test_requests_without_work_only_report_the_total():
+    assert list(parse(client.get("/plain").headers["server-timing"])) == ["app"]
+
+
+def test_recording_outside_a_request_is_a_noop():
+    assert server_timing.current() is None
+    server_timing.record("db", 1.0)
+    render_chart()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert server_timing.current() is None
@@ -0,0 +1,124 @@
+import asyncio
+
+import httpx
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+import routers.chat
+from app import app
+from auth.auth_controller import get_current_user
+from auth.principal import Principal
+from metrics import in_flight_generations, llm_call
+from shutdown import ShutdownCoordinator, ShutdownMiddleware
+
+
+def build_app(coordinator: ShutdownCoordinator, release: asyncio.Event) -> FastAPI:
+    test_app = FastAPI()
+    test_app.add_middleware(ShutdownMiddleware, coordinator=coordinator)
+
+    @test_app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @test_app.get("/generate")
+    async def generate():
+        with llm_call("test", "prompt") as call:
+            await asyncio.sleep(60)
+            call.completed("never")
+        return {"ok": True}
+
+    @test_app.get("/background")
+    async def background(background_tasks: BackgroundTasks, seconds: float = 0.2):
+        background_tasks.add_task(asyncio.sleep, seconds)
+        return {"ok": True}
+
+    return test_app
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_drain_finishes_in_flight_work_and_turns_new_requests_away():
+    async def scenario():
+        coordinator = ShutdownCoordinator()
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=build_app(coordinator, release))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/slow"))
+            background = asyncio.create_task(client.get("/background"))
+            await wait_for(lambda: coordinator.in_flight == 2)
+            drain = asyncio.create_task(coordinator.drain(grace_period=5))
+            await wait_for(lambda: not coordinator.accepting)
+
+            rejected = await client.get("/slow")
+            release.set()
+            return rejected, await slow, await background, await drain
+
+    rejected, slow, background, report = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1" and rejected.headers["connection"] == "close"
+    assert slow.status_code == 200 and background.status_code == 200
+    assert report["requests"] == {"in_flight": 1, "drained": 1, "cancelled": 0, "notified": 0, "rejected": 1}
+    assert report["background_tasks"] == {"in_flight": 1, "drained": 1, "cancelled": 0}
+
+
+def test_work_past_the_grace_period_is_cancelled_and_clients_told_to_retry():
+    async def scenario():
+        coordinator = ShutdownCoordinator()
+        transport = httpx.ASGITransport(app=build_app(coordinator, asyncio.Event()))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            generation = asyncio.create_task(client.get("/generate"))
+            background = asyncio.create_task(client.get("/background?seconds=60"))
+            await wait_for(lambda: in_flight_generations() == 1 and coordinator.in_flight == 2)
+            report = await coordinator.drain(grace_period=0.1)
+            return await generation, background, report
+
+    response, background, report = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Server is shutting down, please retry"}
+    # Its response had already been sent, so it's cancelled rather than answered with a 503
+    assert background.cancelled()
+    assert report["requests"]["cancelled"] == 1 and report["requests"]["notified"] == 1
+    assert report["background_tasks"]["cancelled"] == 1
+    assert report["llm_generations"] == {"in_flight": 1, "drained": 0, "cancelled": 1}
+    assert in_flight_generations() == 0
+
+
+def test_flush_buffer_counts_the_rows_the_stop_actually_flushed():
+    class Buffer:
+        pending, flushed, dropped = 3, 10, 0
+
+        async def stop(self):
+            # Two more rows were recorded while it stopped, and one was dropped
+            self.pending, self.flushed, self.dropped = 0, 14, 1
+
+    report = asyncio.run(ShutdownCoordinator().flush_buffer("buffer", Buffer(), timeout=1))
+    assert report == {"pending": 3, "flushed": 4, "dropped": 1}
+
+
+def test_app_shutdown_reports_flushed_buffers_and_lost_chats(monkeypatch):
+    monkeypatch.setattr(routers.chat, "user_chats", {})
+    principal = Principal(
+        id=7, email="chat@example.com", role_id=2, role="user", subscription_plan="basic",
+        subscription_end_date=None, is_active=True, is_verified=True
+    )
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: principal)
+
+    with TestClient(app) as client:
+        assert client.post("/query", json={"prompt": "hello"}).status_code == 200
+        coordinator = client.app_state["shutdown_coordinator"]
+        assert coordinator.accepting
+
+    report = coordinator.report
+    assert not coordinator.accepting
+    # The stopped run's coordinator doesn't outlive its lifespan
+    assert TestClient(app).get("/health/worker").status_code == 200
+    assert report["state_dropped"]["user_chats"] == 2
+    assert report["buffers"]["tool_usage"]["dropped"] == 0
+    assert report["buffers"]["write_queue"]["dropped"] == 0
+    assert report["requests"]["cancelled"] == 0
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import app
+from auth.auth_controller import get_current_user
+from db.session import get_async_db
+from db.write_behind import WriteBehindBuffer
+from models.tool_history import ToolHistory
+from routers.tool_history import tool_history_recorder
+
+TEST_DB_PATH = "./test_tool_history.db"
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+def override_get_current_user():
+    return SimpleNamespace(id="1", email="history@example.com")
+
+client = TestClient(app)
+
+async def create_history(rows):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(ToolHistory.__table__.create)
+        await conn.execute(insert(ToolHistory), rows)
+
+@pytest.fixture(autouse=True)
+def setup_history(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, override_get_async_db)
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, override_get_current_user)
+    monkeypatch.setattr(tool_history_recorder, "session_factory", TestingAsyncSessionLocal)
+    base = datetime(2025, 1, 1)
+    rows = [
+        {
+            "id": f"h{i:02d}",
+            "tool_id": "crm-leads",
+            "name": "Lead Generation",
+            "category": "crm" if i % 2 else "finance",
+            # Pairs of rows share a timestamp so the id tie-breaker is exercised
+            "timestamp": base + timedelta(minutes=i // 2),
+            "user_id": "1",
+        }
+        for i in range(7)
+    ]
+    rows.append({**rows[0], "id": "other", "user_id": "2"})
+    asyncio.run(create_history(rows))
+    yield
+    asyncio.run(async_engine.dispose())
+    if os.path.exists(TEST_DB_PATH):
+        os.remove(TEST_DB_PATH)
+
+def fetch_all_pages(**params):
+    ids, cursor = [], None
+    while True:
+        response = client.get("/tools/history", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        data = response.json()
+        ids.extend(item["id"] for item in data["history"])
+        cursor = data["nextCursor"]
+        if cursor is None:
+            return ids
+
+def test_pages_cover_history_newest_first_without_overlap():
+    ids = fetch_all_pages(limit=2)
+    assert ids == ["h06", "h05", "h04", "h03", "h02", "h01", "h00"]
+
+def test_category_and_time_range_filters():
+    ids = fetch_all_pages(limit=1, category="crm", since="2025-01-01T00:01:00")
+    assert ids == ["h05", "h03"]
+
+def test_invalid_cursor_is_rejected():
+    response = client.get("/tools/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_usage_events_are_accepted_and_written_behind():
+    response = client.post("/tools/history", json={"toolId": "hr-job-posting", "name": "Job Posting Creator", "category": "hr"})
+    assert response.status_code == 202
+    assert response.json()["toolId"] == "hr-job-posting"
+
+    events = [{"toolId": f"tool-{i}", "name": "Tool", "category": "hr"} for i in range(3)]
+    response = client.post("/tools/history/batch", json={"events": events})
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 3}
+
+    assert len(fetch_all_pages(category="hr")) == 4
+
+def test_usage_events_are_buffered_flushed_by_size_and_drained_at_shutdown(monkeypatch):
+    # Only the size trigger and the shutdown drain flush during the test
+    monkeypatch.setattr(tool_history_recorder, "flush_interval", 60)
+    monkeypatch.setattr(tool_history_recorder, "batch_size", 4)
+    event = {"toolId": "hr-job-posting", "name": "Job Posting Creator", "category": "hr"}
+
+    with TestClient(app) as running:
+        assert tool_history_recorder.running
+        flushes = tool_history_recorder.flushes
+        assert running.post("/tools/history", json=event).status_code == 202
+        assert tool_history_recorder.pending == 1
+        assert fetch_all_pages(category="hr") == []
+
+        assert running.post("/tools/history/batch", json={"events": [event] * 3}).status_code == 202
+        for _ in range(200):
+            if tool_history_recorder.flushes > flushes:
+                break
+            time.sleep(0.01)
+        assert tool_history_recorder.pending == 0
+        assert len(fetch_all_pages(category="hr")) == 4
+
+        assert running.post("/tools/history", json=event).status_code == 202
+        assert tool_history_recorder.pending == 1
+
+    assert not tool_history_recorder.running and tool_history_recorder.pending == 0
+    assert len(fetch_all_pages(category="hr")) == 5
+
+def test_stop_waits_for_a_blocked_flush_instead_of_losing_it():
+    inserted = []
+
+    class BlockedSession:
+        release = None
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement, rows):
+            await BlockedSession.release.wait()
+            inserted.extend(rows)
+
+        async def commit(self):
+            pass
+
+    async def scenario():
+        BlockedSession.release = asyncio.Event()
+        buffer = WriteBehindBuffer(ToolHistory, BlockedSession, flush_interval_ms=10_000, batch_size=2)
+        await buffer.start()
+        await buffer.add([{"id": "a"}, {"id": "b"}])  # fills a batch, so the flusher starts inserting
+        await asyncio.sleep(0.05)
+        assert buffer.pending == 0  # taken by the blocked insert
+        await buffer.add([{"id": "c"}])
+        stop = asyncio.create_task(buffer.stop())
+        await asyncio.sleep(0.05)
+        assert not stop.done()
+        BlockedSession.release.set()
+        await stop
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert sorted(row["id"] for row in inserted) == ["a", "b", "c"]
+    assert buffer.flushed == 3 and buffer.dropped == 0
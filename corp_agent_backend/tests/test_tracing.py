@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from metrics import llm_call, timed_tool
+from tracing import (
+    BatchSpanProcessor, JsonlSpanExporter, OtlpHttpSpanExporter, TracingMiddleware,
+    instrument_engine_tracing, span, tracer
+)
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Route the tracer's spans into a list, tracing every request."""
+    exporter = ListExporter()
+    monkeypatch.setattr(tracer, "processor", BatchSpanProcessor(exporter, interval=0.01))
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+
+    def finished():
+        tracer.processor.shutdown()
+        return exporter.spans
+    return finished
+
+
+@timed_tool
+def lookup_tool(item_id: str):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT :id"), {"id": item_id}).scalar()
+    with llm_call("test_model", "x" * 40) as call:
+        call.completed("y" * 40)
+    return {"item_id": item_id}
+
+
+engine = create_engine("sqlite://")
+instrument_engine_tracing(engine)
+
+app = FastAPI()
+app.add_middleware(TracingMiddleware)
+
+
+@app.get("/items/{item_id}")
+def get_item(item_id: str):
+    with span("retriever.search", k=3):
+        pass
+    return lookup_tool(item_id)
+
+
+client = TestClient(app)
+
+
+def test_request_spans_are_nested(exported):
+    response = client.get("/items/42")
+    assert response.status_code == 200
+    spans = {s.name: s for s in exported()}
+
+    root = spans["GET /items/{item_id}"]
+    tool = spans["tool lookup_tool"]
+    assert root.parent_id is None
+    assert root.attributes["http.route"] == "/items/{item_id}"
+    assert root.attributes["http.status_code"] == 200
+    assert response.headers["traceparent"] == f"00-{root.trace_id}-{root.span_id}-01"
+
+    assert spans["retriever.search"].parent_id == root.span_id
+    assert tool.parent_id == root.span_id
+    assert spans["db.query"].parent_id == tool.span_id
+    assert spans["db.query"].attributes["db.statement"] == "SELECT ?"
+    assert spans["llm.generate"].parent_id == tool.span_id
+    assert spans["llm.generate"].attributes["llm.completion_tokens"] == 10
+    assert {s.trace_id for s in spans.values()} == {root.trace_id}
+
+
+def test_sampling_and_incoming_traceparent(exported, monkeypatch):
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+    unsampled = client.get("/items/1")
+    assert "traceparent" not in unsampled.headers
+
+    # The caller's sampling decision wins over the local rate
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    client.get("/items/2", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+    client.get("/items/3", headers={"traceparent": f"00-{trace_id}-{parent_id}-00"})
+
+    spans = exported()
+    roots = [s for s in spans if s.name == "GET /items/{item_id}"]
+    assert len(roots) == 1
+    assert roots[0].trace_id == trace_id and roots[0].parent_id == parent_id
+    assert all(s.trace_id == trace_id for s in spans)
+
+
+def test_outside_a_trace_spans_are_noops(exported):
+    assert lookup_tool("7") == {"item_id": "7"}
+    assert exported() == []
+
+
+def test_exporters(exported, tmp_path):
+    client.get("/items/5")
+    spans = exported()
+
+    path = tmp_path / "traces.jsonl"
+    JsonlSpanExporter(str(path)).export(spans)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {line["name"] for line in lines} == {s.name for s in spans}
+    assert all(line["duration_ms"] >= 0 for line in lines)
+
+    payload = OtlpHttpSpanExporter("http://collector.invalid/v1/traces", "corp-ai").encode(spans)
+    otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = next(s for s in otlp_spans if s["parentSpanId"] == "")
+    assert root["kind"] == 2
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import runpy
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import logging_config
+import workers
+from app import app
+from config import settings
+from workers import memory_usage, preload_assets, worker_info
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_worker_reports_startup_time_and_memory():
+    with TestClient(app) as client:
+        stats = client.get("/health/worker").json()
+    assert stats["pid"] == os.getpid()
+    assert stats["startup_seconds"] > 0
+    assert stats["memory"]["rss"] > 0
+    if sys.platform.startswith("linux"):
+        memory = stats["memory_at_startup"]
+        assert memory["shared"] + memory["private"] == memory["rss"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or not os.path.exists("/proc/self/smaps_rollup"), reason="Linux fork")
+def test_forked_worker_shares_preloaded_pages_and_keeps_logging():
+    preloaded = bytearray(32 * 1024 * 1024)  # touched, so it's resident before the fork
+    for offset in range(0, len(preloaded), 4096):
+        preloaded[offset] = 1
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # the "worker"
+        try:
+            logging.getLogger("corp_ai.workers").info("forked worker logging")
+            os.write(write_fd, json.dumps({
+                "pid": worker_info.pid,
+                "forked": worker_info.forked,
+                "memory": memory_usage(),
+                "logging": logging_config._listener._thread.is_alive(),
+            }).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        child = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+
+    assert child["pid"] == pid and child["forked"]
+    assert child["logging"]
+    # The buffer was inherited, not copied
+    assert child["memory"]["shared"] >= len(preloaded)
+    assert child["memory"]["private"] < len(preloaded)
+
+
+def test_preload_assets_skips_unknown_names(monkeypatch):
+    loaded = []
+    monkeypatch.setitem(workers.PRELOADERS, "modules", lambda: loaded.append("modules"))
+    timings = preload_assets("modules, nothing,")
+    assert loaded == ["modules"]
+    assert list(timings) == ["modules"]
+
+
+def test_gunicorn_config_preloads_and_recycles(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)  # --workers may still ask for more
+    monkeypatch.setattr(tempfile, "mkdtemp", lambda prefix: str(tmp_path))
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")  # unset, and restored after the test
+    config = runpy.run_path(str(BACKEND_DIR / "gunicorn.conf.py"))
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == str(tmp_path)
+    assert config["preload_app"] is True
+    assert config["worker_class"].endswith("UvicornWorker")
+    assert config["max_requests"] > 0 and config["max_requests_jitter"] > 0
+    assert config["graceful_timeout"] > 0
+    assert callable(config["when_ready"]) and callable(config["child_exit"])
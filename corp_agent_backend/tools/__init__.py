@@ -1,25 +1,35 @@
 """
 Tool package for CORP AI agent.
 Each module exports one or more tool functions.
+
+Tools are imported on first use (PEP 562 module __getattr__), so importing the
+package - or one tool - doesn't import every tool module and LangChain with it.
 """
-from .crm import create_lead
-from .sales_forecast import forecast_sales
-from .chat_support import handle_customer_query
-from .marketing import send_campaign
-from .social_media import post_social
-from langchain.tools import Tool, BaseTool
-from .analytics import generate_report
-from .hr_assistant import create_job_post
-from .contract_review import review_contract
-from .finance_planner import plan_budget
-from .supply_chain import optimize_inventory
-from .scheduler import schedule_appointment
-from .review_management import respond_review
-from .accounting import generate_invoice
-from .inventory import update_stock
-from .legal_crm import create_case
-from .notification import send_notification
-from .reservation import make_reservation
+import importlib
+
+# Exported name -> the module defining it
+_TOOL_MODULES = {
+    "create_lead": "crm",
+    "forecast_sales": "sales_forecast",
+    "handle_customer_query": "chat_support",
+    "send_campaign": "marketing",
+    "post_social": "social_media",
+    "generate_report": "analytics",
+    "create_job_post": "hr_assistant",
+    "review_contract": "contract_review",
+    "plan_budget": "finance_planner",
+    "optimize_inventory": "supply_chain",
+    "schedule_appointment": "scheduler",
+    "respond_review": "review_management",
+    "generate_invoice": "accounting",
+    "update_stock": "inventory",
+    "create_case": "legal_crm",
+    "send_notification": "notification",
+    "make_reservation": "reservation",
+}
+
+# LangChain's tool classes, still available as tools.Tool / tools.BaseTool
+_LANGCHAIN_NAMES = {"Tool", "BaseTool"}
 
 __all__ = [
     "create_lead", "forecast_sales", "handle_customer_query", "send_campaign",
@@ -27,4 +37,19 @@ __all__ = [
     "plan_budget", "optimize_inventory", "schedule_appointment", "respond_review",
     "generate_invoice", "update_stock", "create_case", "send_notification",
     "make_reservation"
-    ]  # type: ignore
\ No newline at end of file
+    ]  # type: ignore
+
+
+def __getattr__(name):
+    if name in _TOOL_MODULES:
+        value = getattr(importlib.import_module(f".{_TOOL_MODULES[name]}", __name__), name)
+    elif name in _LANGCHAIN_NAMES:
+        value = getattr(importlib.import_module("langchain.tools"), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # later lookups don't come back here
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def generate_invoice(client_id: str, amount: float) -> Dict:
     """Generate an invoice and record payment status."""
     # TODO: integrate with accounting system
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def generate_report(report_type: str, parameters: dict) -> Dict:
     """Generate a business intelligence report."""
     # TODO: run analytics queries and generate dashboard
@@ -1,41 +1,64 @@
 from typing import Dict
 import logging
 import importlib.util
+import threading
 from config import settings
+from metrics import llm_call, timed_tool
+from server_timing import timed
+from tracing import span
 
 # Configure logging
 logger = logging.getLogger("corp_ai.tools.chat_support")
 
-# Check for required dependencies
-support_retriever = None
+# The support knowledge base, created by the first query that needs it
+_support_kb = None
+_support_kb_lock = threading.Lock()
 
-try:
-    # Check if sentence-transformers is available
-    if importlib.util.find_spec("sentence_transformers") is None:
-        logger.warning("sentence-transformers package not found. Support knowledge base will not be available.")
-    else:
-        from langchain.chains import RetrievalQA
+
+class SupportKnowledgeBase:
+    """Embeddings, vector store and retriever for the support documents."""
+
+    def __init__(self):
         from langchain_chroma import Chroma
         from langchain_community.embeddings import HuggingFaceEmbeddings
-        
+
         # Initialize embeddings for support knowledge base
-        support_embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
-        
-        # Initialize support knowledge base
-        try:
-            support_vectordb = Chroma(
-                persist_directory=f"{settings.CHROMA_PERSIST_DIR}/support",
-                embedding_function=support_embeddings
-            )
-            support_retriever = support_vectordb.as_retriever(search_kwargs={"k": 3})
-            logger.info("Support knowledge base initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize support knowledge base: {str(e)}")
-            support_retriever = None
-except Exception as e:
-    logger.error(f"Error setting up support knowledge base: {str(e)}")
-    support_retriever = None
+        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+        self.vectordb = Chroma(
+            persist_directory=f"{settings.CHROMA_PERSIST_DIR}/support",
+            embedding_function=self.embeddings
+        )
+        self.retriever = self.vectordb.as_retriever(search_kwargs={"k": 3})
+
+
+def get_support_kb():
+    """
+    The support knowledge base, or None when sentence-transformers is missing or
+    it fails to load. Loaded on first use rather than at import, since it loads
+    the embedding model; a failure is remembered, not retried on every query.
+    """
+    global _support_kb
+    if _support_kb is None:
+        with _support_kb_lock:
+            if _support_kb is None:
+                _support_kb = _load_support_kb()
+    return _support_kb or None
+
 
+def _load_support_kb():
+    # Check if sentence-transformers is available
+    if importlib.util.find_spec("sentence_transformers") is None:
+        logger.warning("sentence-transformers package not found. Support knowledge base will not be available.")
+        return False
+    try:
+        kb = SupportKnowledgeBase()
+        logger.info("Support knowledge base initialized successfully")
+        return kb
+    except Exception as e:
+        logger.error(f"Failed to initialize support knowledge base: {str(e)}")
+        return False
+
+@timed_tool
 def handle_customer_query(query: str) -> Dict:
     """
     Respond to a customer support query using the LLM and support knowledge base.
@@ -53,16 +76,29 @@ def handle_customer_query(query: str) -> Dict:
         from corp_agent import llm
         
         # If we have a support knowledge base, use it for retrieval
-        if support_retriever:
+        kb = get_support_kb()
+        if kb:
+            from langchain.chains import RetrievalQA
+
             # Create a retrieval chain for support-specific knowledge
             support_qa = RetrievalQA.from_chain_type(
                 llm=llm,
                 chain_type="stuff",
-                retriever=support_retriever
+                retriever=kb.retriever
             )
             
+            # Retrieve step by step so embedding, vector search and generation are timed separately
+            with span("retriever.embed_query", **{"embedding.model": settings.EMBEDDING_MODEL}), timed("retrieval"):
+                query_vector = kb.embeddings.embed_query(query)
+            k = kb.retriever.search_kwargs.get("k", 3)
+            with span("retriever.chroma_search", **{"retriever.k": k}) as search_span, timed("retrieval"):
+                docs = kb.vectordb.similarity_search_by_vector(query_vector, k=k)
+                search_span.set_attribute("retriever.documents", len(docs))
+            
             # Get response from the support knowledge base
-            answer = support_qa.run(query)
+            with llm_call("corp_llm", query) as call:
+                answer = support_qa.combine_documents_chain.run(input_documents=docs, question=query)
+                call.completed(answer)
         else:
             # Fall back to direct LLM response if no knowledge base
             prompt = f"""You are a helpful customer support assistant for a business software platform.
@@ -72,13 +108,15 @@ def handle_customer_query(query: str) -> Dict:
             
             Your Response:"""
             
-            answer = llm(prompt)
+            with llm_call("corp_llm", prompt) as call:
+                answer = llm(prompt)
+                call.completed(answer)
         
         logger.info(f"Generated response for customer query")
         return {
             "query": query,
             "response": answer,
-            "source": "support_kb" if support_retriever else "llm_direct"
+            "source": "support_kb" if kb else "llm_direct"
         }
         
     except Exception as e:
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def review_contract(text: str) -> Dict:
     """Analyze and summarize a contract document."""
     # TODO: run NLP analysis on contract
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def create_lead(name: str, contact: str) -> Dict:
     """Create a new sales lead."""
     # TODO: insert into CRM database
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def plan_budget(month: str, revenue: float, expenses: float) -> Dict:
     """Provide budgeting and cashflow insights."""
     # TODO: implement financial planning logic
@@ -1,24 +1,28 @@
 """
 Finance Tool for CORP AI - Provides spreadsheet analysis, LLM insights, and report generation
+
+pandas, plotly, reportlab and LangChain are imported by the methods that use
+them, so importing this module (and the finance router) stays cheap.
 """
-from typing import Dict, Any, List, Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from pathlib import Path
-import pandas as pd
-from langchain import LLMChain, PromptTemplate
-from langchain.llms import LlamaCpp
 from fastapi import UploadFile
-import plotly.express as px
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
 import json
 import io
+from metrics import llm_call, timed_tool
+from server_timing import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class FinanceTool:
     def __init__(self, model_path: str = "models/llama-2-7b-finance.gguf"):
         try:
             import os
             if os.path.exists(model_path):
+                from langchain.llms import LlamaCpp
                 self.llm = LlamaCpp(
                     model_path=model_path,
                     temperature=0.1,
@@ -35,28 +39,31 @@ class FinanceTool:
             logging.error(f"Error loading LLM model: {str(e)}")
             self.llm = None
         
-        self.insight_prompt = PromptTemplate(
-            template="""Analyze the following financial data and provide insights:
-            
-            {data}
-            
-            Focus on:
-            1. Key trends and patterns
-            2. Notable anomalies
-            3. Forward-looking predictions
-            4. Recommendations
-            
-            Response:""",
-            input_variables=["data"]
-        )
-        
         if self.llm is not None:
+            from langchain import LLMChain, PromptTemplate
+            self.insight_prompt = PromptTemplate(
+                template="""Analyze the following financial data and provide insights:
+                
+                {data}
+                
+                Focus on:
+                1. Key trends and patterns
+                2. Notable anomalies
+                3. Forward-looking predictions
+                4. Recommendations
+                
+                Response:""",
+                input_variables=["data"]
+            )
             self.insight_chain = LLMChain(llm=self.llm, prompt=self.insight_prompt)
         else:
+            self.insight_prompt = None
             self.insight_chain = None
 
+    @timed_tool
     async def analyze_spreadsheet(self, file: UploadFile) -> Dict[str, Any]:
         """Parse uploaded spreadsheet and extract key metrics"""
+        import pandas as pd
         content = await file.read()
         df = pd.read_excel(content) if file.filename.endswith('.xlsx') else pd.read_csv(content)
         
@@ -92,6 +99,7 @@ class FinanceTool:
 
     def _analyze_trends(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Identify trends in time series data"""
+        import pandas as pd
         if 'date' not in df.columns and 'Date' not in df.columns:
             return {"error": "No date column found"}
             
@@ -110,6 +118,7 @@ class FinanceTool:
             
         return trends
 
+    @timed_tool
     async def generate_insights(self, data: Dict[str, Any]) -> str:
         """Generate LLM insights from analyzed data"""
         if self.llm is None:
@@ -117,15 +126,22 @@ class FinanceTool:
             
         try:
             data_str = json.dumps(data, indent=2)
-            response = await self.insight_chain.arun(data=data_str)
+            prompt = self.insight_prompt.format(data=data_str)
+            with llm_call("finance", prompt, count_tokens=self.llm.get_num_tokens) as call:
+                response = await self.insight_chain.arun(data=data_str)
+                call.completed(response)
             return response
         except Exception as e:
             import logging
             logging.error(f"Error generating insights: {str(e)}")
             return f"Error generating insights: {str(e)}"
 
+    @timed_tool
+    @timed("render")
     def create_charts(self, data: Dict[str, Any]) -> List[bytes]:
         """Generate charts from analyzed data"""
+        import pandas as pd
+        import plotly.express as px
         charts = []
         
         # Example: Create trend charts
@@ -140,8 +156,12 @@ class FinanceTool:
         
         return charts
 
+    @timed_tool
+    @timed("render")
     async def create_pdf_report(self, insights: str, charts: List[bytes]) -> bytes:
         """Generate PDF report with insights and charts"""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=letter)
         
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def create_job_post(title: str, description: str) -> Dict:
     """Create a new job posting."""
     # TODO: post to job boards
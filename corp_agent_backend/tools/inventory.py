@@ -1,6 +1,8 @@
 from typing import Dict
+from metrics import timed_tool
 # Tool: manage supermarket inventory
 
+@timed_tool
 def update_stock(product_id: str, quantity: int) -> Dict:
     # TODO: integrate with POS or inventory system
     return {"product_id": product_id, "updated_quantity": quantity}
\ No newline at end of file
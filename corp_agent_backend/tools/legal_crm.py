@@ -1,6 +1,8 @@
 from typing import Dict
+from metrics import timed_tool
 # Tool: track legal cases and generate documents
 
+@timed_tool
 def create_case(client_name: str, case_type: str) -> Dict:
     # TODO: insert into legal CRM system
     case_id = "CASE4321"
@@ -1,6 +1,8 @@
 from typing import Dict
 from typing import List
+from metrics import timed_tool
 
+@timed_tool
 def send_campaign(name: str, audience: List[str], message: str) -> Dict:
     """Schedule a marketing campaign via email/SMS."""
     # TODO: integrate with marketing platform
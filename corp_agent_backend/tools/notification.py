@@ -1,6 +1,8 @@
 from typing import Dict
+from metrics import timed_tool
 # Tool: send email and SMS notifications
 
+@timed_tool
 def send_notification(method: str, recipient: str, message: str) -> Dict:
     # TODO: use email/SMS API
     return {"method": method, "recipient": recipient, "status": "sent"}
\ No newline at end of file
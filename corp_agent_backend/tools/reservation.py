@@ -1,6 +1,8 @@
 from typing import Dict
+from metrics import timed_tool
 # Tool: handle hotel and restaurant reservations
 
+@timed_tool
 def make_reservation(customer: str, date: str, time: str) -> Dict:
     # TODO: insert into reservation system
     reservation_id = "RES6789"
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def respond_review(review_id: str, response: str) -> Dict:
     """Respond to an online customer review."""
     # TODO: integrate with review platform API
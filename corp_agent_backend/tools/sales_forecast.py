@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def forecast_sales(product_id: str, period: int) -> Dict:
     """Forecast sales volume for a product over a period."""
     # TODO: integrate forecasting model
@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def schedule_appointment(name: str, datetime: str) -> Dict:
     """Schedule an appointment and send reminders."""
     # TODO: integrate with calendar API
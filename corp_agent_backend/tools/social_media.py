@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def post_social(channel: str, content: str, schedule_time: str) -> Dict:
     """Schedule a social media post."""
     # TODO: integrate with social media APIs
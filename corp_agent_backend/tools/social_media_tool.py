@@ -3,13 +3,12 @@ Social Media Tool for CORP AI - Provides post scheduling, content generation, an
 """
 from typing import Dict, Any, List, Optional
 import logging
-from langchain import LLMChain, PromptTemplate
-from langchain.llms import LlamaCpp
 from datetime import datetime
 import json
 import os
 from pathlib import Path
 import asyncio
+from metrics import llm_call, timed_tool
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,6 +22,8 @@ class SocialMediaTool:
         # Initialize LLM if model path exists
         try:
             if Path(model_path).exists():
+                # LangChain is only imported when there is a model to run
+                from langchain.llms import LlamaCpp
                 self.llm = LlamaCpp(
                     model_path=model_path,
                     temperature=0.7,
@@ -40,6 +41,7 @@ class SocialMediaTool:
         
         # Initialize prompt templates
         if self.model_loaded:
+            from langchain import LLMChain, PromptTemplate
             self.content_prompt = PromptTemplate(
                 template="""Generate a social media post for {channel} based on the following prompt:
                 
@@ -61,6 +63,7 @@ class SocialMediaTool:
             
             self.content_chain = LLMChain(llm=self.llm, prompt=self.content_prompt)
 
+    @timed_tool
     async def generate_content(self, prompt: str, channel: Optional[str] = None, tone: Optional[str] = None) -> str:
         """Generate social media content using LLM"""
         if not self.model_loaded:
@@ -74,17 +77,21 @@ class SocialMediaTool:
         
         try:
             # Run the LLM chain
-            response = await self.content_chain.arun(
-                channel=channel,
-                prompt=prompt,
-                tone=tone
-            )
+            full_prompt = self.content_prompt.format(channel=channel, prompt=prompt, tone=tone)
+            with llm_call("social_media", full_prompt, count_tokens=self.llm.get_num_tokens) as call:
+                response = await self.content_chain.arun(
+                    channel=channel,
+                    prompt=prompt,
+                    tone=tone
+                )
+                call.completed(response)
             
             return response.strip()
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
             return "Error generating content. Please try again with a different prompt."
 
+    @timed_tool
     async def schedule_post(self, post_id: int, channel: str, content: str, schedule_time: str) -> Dict[str, Any]:
         """Schedule a social media post for publishing"""
         # In a real implementation, this would connect to social media APIs
@@ -103,6 +110,7 @@ class SocialMediaTool:
             "status": "scheduled"
         }
     
+    @timed_tool
     def analyze_engagement(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze engagement metrics for social media posts"""
         # In a real implementation, this would analyze actual metrics
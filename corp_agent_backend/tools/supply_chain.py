@@ -1,5 +1,7 @@
 from typing import Dict
+from metrics import timed_tool
 
+@timed_tool
 def optimize_inventory(product_id: str) -> Dict:
     """Recommend reorder quantities for inventory optimization."""
     # TODO: implement supply chain algorithm
@@ -17,6 +17,7 @@ import logging
 from langchain import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain.llms import LlamaCpp
+from metrics import timed_tool
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -54,6 +55,7 @@ class OptimizationPlan(BaseModel):
     priority: str
 
 # Core functions
+@timed_tool
 def parse_telco_data(path: str) -> pd.DataFrame:
     """Parse CDR, KPI, or equipment log data from CSV/Excel files."""
     try:
@@ -73,6 +75,7 @@ def parse_telco_data(path: str) -> pd.DataFrame:
         logger.error(f"Error parsing telco data: {str(e)}")
         raise
 
+@timed_tool
 def predict_maintenance(df: pd.DataFrame) -> List[Alert]:
     """Predict equipment maintenance needs using historical data."""
     try:
@@ -93,6 +96,7 @@ def predict_maintenance(df: pd.DataFrame) -> List[Alert]:
         logger.error(f"Error in maintenance prediction: {str(e)}")
         raise
 
+@timed_tool
 def score_churn(df: pd.DataFrame) -> float:
     """Calculate customer churn risk score."""
     try:
@@ -114,6 +118,7 @@ def score_churn(df: pd.DataFrame) -> float:
         logger.error(f"Error in churn scoring: {str(e)}")
         raise
 
+@timed_tool
 def detect_fraud(df: pd.DataFrame) -> List[TransactionFlag]:
     """Detect suspicious transactions in real-time."""
     try:
@@ -145,6 +150,7 @@ def detect_fraud(df: pd.DataFrame) -> List[TransactionFlag]:
         logger.error(f"Error in fraud detection: {str(e)}")
         raise
 
+@timed_tool
 def analyze_calls(audio: bytes) -> CallAnalysisResult:
     """Analyze call audio for sentiment and key topics."""
     try:
@@ -163,6 +169,7 @@ def analyze_calls(audio: bytes) -> CallAnalysisResult:
         logger.error(f"Error in call analysis: {str(e)}")
         raise
 
+@timed_tool
 def optimize_network(df: pd.DataFrame) -> OptimizationPlan:
     """Generate network optimization recommendations."""
     try:
@@ -182,6 +189,7 @@ def optimize_network(df: pd.DataFrame) -> OptimizationPlan:
         logger.error(f"Error in network optimization: {str(e)}")
         raise
 
+@timed_tool
 def generate_pdf_report(data: Dict) -> bytes:
     """Generate PDF report with charts and insights."""
     try:
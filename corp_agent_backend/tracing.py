@@ -0,0 +1,463 @@
+"""
+Request tracing - OpenTelemetry-shaped spans for router -> tool -> retriever ->
+LLM -> DB, exported to a local JSONL file or an OTLP/HTTP collector.
+
+TracingMiddleware opens a root span per request (continuing an incoming W3C
+`traceparent` when there is one) and keeps it in a contextvar, so everything
+the request runs - tool functions (@timed_tool), LLM calls (llm_call), retriever
+steps and SQLAlchemy queries - records child spans without passing anything
+around. Only a TRACE_SAMPLE_RATE fraction of requests is traced; for the rest
+`span()` is a contextvar lookup returning a shared no-op.
+
+Finished spans are queued and exported in batches from a background thread;
+when the queue is full spans are dropped (and counted) rather than slowing
+requests down.
+"""
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger("corp_ai.tracing")
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+MAX_ATTRIBUTE_LENGTH = 512
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("corp_ai_current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation. Use as a context manager so it becomes the current span while open."""
+
+    __slots__ = ("tracer", "name", "kind", "trace_id", "span_id", "parent_id", "attributes",
+                 "start_ns", "end_ns", "status", "status_message", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:MAX_ATTRIBUTE_LENGTH]
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.processor.on_end(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_error(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": {"code": self.status, "message": self.status_message},
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned when the current request isn't being traced."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSpanExporter:
+    """Appends one JSON object per span to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpSpanExporter:
+    """Posts spans to an OpenTelemetry collector's OTLP/HTTP JSON endpoint (e.g. http://collector:4318/v1/traces)."""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 10.0):
+        import httpx
+
+        self.endpoint = endpoint
+        self.resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+        self.client = httpx.Client(timeout=timeout)
+
+    def encode(self, spans: List[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": self.resource,
+            "scopeSpans": [{
+                "scope": {"name": "corp_ai"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": span.kind,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": span.status, "message": span.status_message},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        response = self.client.post(self.endpoint, json=self.encode(spans))
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        self.client.close()
+
+
+class BatchSpanProcessor:
+    """
+    Queues finished spans and exports them in batches from a daemon thread,
+    started on the first span so forked workers each get their own.
+    """
+
+    _STOP = object()
+
+    def __init__(self, exporter, max_queue_size: int = 2048, batch_size: int = 512, interval: float = 1.0):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0.001))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+            if stop:
+                return
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Could not export {len(batch)} spans: {str(e)}")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Export whatever is queued and stop the thread."""
+        thread = self._thread
+        if thread is not None:
+            self.queue.put(self._STOP)
+            thread.join(timeout)
+            self._thread = None
+        self.exporter.shutdown()
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "exported": self.exported, "dropped": self.dropped, "failed": self.failed}
+
+
+class Tracer:
+    """Starts root spans (sampled) and child spans under the current one."""
+
+    def __init__(self, processor: Optional[BatchSpanProcessor], sample_rate: float = 1.0):
+        self.processor = processor
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, kind: int = KIND_SERVER,
+                    attributes: Optional[Dict[str, Any]] = None):
+        """A root span - or a child of the caller's span from `traceparent` - if this request is sampled."""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = parse_traceparent(traceparent) if traceparent else None
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = _new_id(128), None, random.random() < self.sample_rate
+        if not sampled:
+            return NOOP_SPAN
+        return Span(self, name, trace_id, parent_id, kind, attributes)
+
+    def span(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        """A child of the current span, or a no-op outside a sampled trace."""
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, kind, attributes)
+
+    def shutdown(self) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+
+    def stats(self) -> dict:
+        stats = {"enabled": self.enabled, "sample_rate": self.sample_rate}
+        if self.processor is not None:
+            stats.update(self.processor.stats())
+        return stats
+
+
+def parse_traceparent(header: str):
+    """(trace_id, parent span_id, sampled) from a W3C traceparent header, or None if malformed."""
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 0x01)
+
+
+def build_tracer() -> Tracer:
+    exporter_name = settings.TRACE_EXPORTER.lower()
+    if exporter_name == "jsonl":
+        exporter = JsonlSpanExporter(settings.TRACE_JSONL_PATH)
+    elif exporter_name == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.TRACE_OTLP_ENDPOINT, settings.APP_NAME)
+    else:
+        if exporter_name not in ("", "none"):
+            logger.warning(f"Unknown TRACE_EXPORTER {settings.TRACE_EXPORTER!r}; tracing is disabled")
+        return Tracer(None, 0.0)
+    processor = BatchSpanProcessor(
+        exporter,
+        max_queue_size=settings.TRACE_EXPORT_QUEUE_SIZE,
+        batch_size=settings.TRACE_EXPORT_BATCH_SIZE,
+    )
+    return Tracer(processor, settings.TRACE_SAMPLE_RATE)
+
+
+tracer = build_tracer()
+
+
+def current_span():
+    """The span the caller is running under, or the no-op span."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Context manager: a child span of the current one (no-op when the request isn't traced)."""
+    return tracer.span(name, kind, attributes)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator recording each call of a sync or async function as a span."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening the root span for each sampled request. The
+    span is named after the matched route template once routing has run, and
+    sampled responses carry its traceparent so a slow request can be found in
+    the export.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if root is NOOP_SPAN:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", root.traceparent.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with root:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    root.name = f"{scope['method']} {route}"
+                    root.set_attribute("http.route", route)
+
+
+def instrument_engine_tracing(engine) -> None:
+    """Record a span per SQL statement executed on a (sync) Engine while a request is traced."""
+    from sqlalchemy import event
+
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_span.get() is None:
+            return
+        db_span = tracer.span("db.query", KIND_CLIENT, {
+            "db.system": system,
+            "db.statement": statement[:MAX_ATTRIBUTE_LENGTH],
+            "db.executemany": executemany,
+        })
+        conn.info.setdefault("corp_ai_spans", []).append(db_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("corp_ai_spans")
+        if spans:
+            db_span = spans.pop()
+            if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+                db_span.set_attribute("db.rowcount", cursor.rowcount)
+            db_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        spans = context.connection.info.get("corp_ai_spans") if context.connection is not None else None
+        if spans:
+            db_span = spans.pop()
+            db_span.record_error(context.original_exception)
+            db_span.end()
+
+
+def setup_tracing(app) -> None:
+    """Add the root-span middleware when an exporter is configured."""
+    if not tracer.enabled:
+        return
+    app.add_middleware(TracingMiddleware)
+    logger.info(
+        f"Tracing {tracer.sample_rate:.0%} of requests to {settings.TRACE_EXPORTER} "
+        f"({settings.TRACE_JSONL_PATH if settings.TRACE_EXPORTER.lower() == 'jsonl' else settings.TRACE_OTLP_ENDPOINT})"
+    )
@@ -0,0 +1,191 @@
+"""
+Worker processes - what each one reports about itself, and the read-only
+assets the gunicorn master loads before forking them (see gunicorn.conf.py).
+
+With preload_app the master imports the app once and the workers are forked
+from it, so module code, the tools catalog and whatever PRELOAD_ASSETS names
+are shared copy-on-write: a page is only copied when a worker writes to it.
+CPython writes to an object whenever its reference count changes, and the
+cyclic GC writes to every object it scans, so freeze_for_fork() moves
+everything loaded so far into the GC's permanent generation just before the
+workers are forked. Model weights loaded from safetensors are mmapped and stay
+shared however they are used.
+
+Each worker logs its startup time (process start or fork to ready to serve)
+and its memory once ready: RSS, and from /proc/self/smaps_rollup how much of
+it is shared with other processes and how much is private to this one. GET
+/health/worker reports the same, live, for the worker that serves it.
+"""
+import gc
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+from metrics import WORKER_MEMORY, WORKER_STARTUP
+
+logger = logging.getLogger("corp_ai.workers")
+
+# smaps_rollup field -> our name (kB values, summed)
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+# Imported by "modules": what the lazily imported tools and agent pull in
+PRELOAD_MODULES = (
+    "langchain", "langchain.chains", "langchain_community", "torch", "transformers",
+    "pandas", "plotly.express", "reportlab.pdfgen.canvas",
+)
+
+
+def memory_usage() -> Dict[str, int]:
+    """
+    Bytes of RSS, PSS, shared and private memory of this process. Off Linux
+    only "rss" is reported, and it is the peak rather than the current value.
+    """
+    usage = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            for line in smaps:
+                key, _, value = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[key]] += int(value.split()[0]) * 1024
+        return usage
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return {"rss": 0}
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"rss": peak if sys.platform == "darwin" else peak * 1024}
+
+
+def _mb(value: int) -> str:
+    return f"{value / (1024 * 1024):.0f} MB"
+
+
+class WorkerInfo:
+    """Start time, readiness and memory of this process; reset in a forked child."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self.forked = False
+        self.startup_memory: Dict[str, int] = {}
+
+    def _after_fork(self) -> None:
+        self.pid = os.getpid()
+        self.started_at = time.monotonic()
+        self.ready_at = None
+        self.forked = True
+        self.startup_memory = {}
+
+    @property
+    def startup_seconds(self) -> Optional[float]:
+        return None if self.ready_at is None else self.ready_at - self.started_at
+
+    def mark_ready(self) -> None:
+        """Called once the app has started; records and logs startup time and memory."""
+        self.ready_at = time.monotonic()
+        self.startup_memory = memory_usage()
+        WORKER_STARTUP.set(self.startup_seconds)
+        for kind, value in self.startup_memory.items():
+            WORKER_MEMORY.labels(kind).set(value)
+        memory = self.startup_memory
+        detail = (
+            f" ({_mb(memory['shared'])} shared, {_mb(memory['private'])} private, PSS {_mb(memory['pss'])})"
+            if "pss" in memory else ""
+        )
+        logger.info(
+            f"Worker {self.pid} ready in {self.startup_seconds * 1000:.0f} ms"
+            f"{' after fork' if self.forked else ''}: RSS {_mb(memory['rss'])}{detail}",
+            extra={"startup_ms": round(self.startup_seconds * 1000, 1), **{f"{k}_bytes": v for k, v in memory.items()}},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "pid": self.pid,
+            "forked": self.forked,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "startup_seconds": None if self.startup_seconds is None else round(self.startup_seconds, 3),
+            "memory_at_startup": self.startup_memory,
+            "memory": memory_usage(),
+        }
+
+
+worker_info = WorkerInfo()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=worker_info._after_fork)
+
+
+# Preloading (gunicorn master, before forking)
+
+def _preload_modules() -> None:
+    for name in PRELOAD_MODULES:
+        if importlib.util.find_spec(name.split(".")[0]) is None:
+            continue
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Could not preload {name}: {str(e)}")
+
+
+def _preload_llm() -> None:
+    import corp_agent
+    corp_agent.llm
+
+
+def _preload_support_kb() -> None:
+    from tools.chat_support import get_support_kb
+    get_support_kb()
+
+
+def _preload_qa_chain() -> None:
+    import corp_agent
+    corp_agent.qa_chain
+
+
+PRELOADERS: Dict[str, Callable[[], None]] = {
+    "modules": _preload_modules,
+    "llm": _preload_llm,
+    "support_kb": _preload_support_kb,
+    "qa_chain": _preload_qa_chain,
+}
+
+
+def preload_assets(names: str) -> Dict[str, float]:
+    """Load the comma-separated assets (PRELOAD_ASSETS); returns the seconds each took."""
+    timings = {}
+    for name in (part.strip() for part in names.split(",")):
+        if not name:
+            continue
+        loader = PRELOADERS.get(name)
+        if loader is None:
+            logger.warning(f"Unknown preload asset {name!r}; expected one of {', '.join(PRELOADERS)}")
+            continue
+        started = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            logger.error(f"Preloading {name} failed: {str(e)}")
+            continue
+        timings[name] = time.perf_counter() - started
+        logger.info(f"Preloaded {name} in {timings[name] * 1000:.0f} ms")
+    return timings
+
+
+def freeze_for_fork() -> None:
+    """Collect garbage, then exempt everything left from GC scans so forked workers keep sharing it."""
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Froze {gc.get_freeze_count()} objects for fork; master RSS {_mb(memory_usage()['rss'])}")